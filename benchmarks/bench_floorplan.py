@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# Interposer floorplanning: recursive_split (ECO-CHIP) vs floorplan_interposer.
+# Usage: python benchmarks/bench_floorplan.py [--max-chiplets N] [--repeat R]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from packager import recursive_split
+from floorplan import floorplan_interposer, _floorplan_cached
+
+
+def time_call(fn, areas, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        _floorplan_cached.cache_clear()
+        start = time.perf_counter()
+        fn(areas)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark interposer floorplanning.")
+    parser.add_argument('--max-chiplets', type=int, default=10000, help="Largest chiplet count to run")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetitions per case (best time is reported)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the random chiplet areas")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print("{:>8} {:>10} {:>14} {:>14} {:>9}  {}".format("chiplets", "areas", "recursive_s", "floorplan_s", "speedup", "match"))
+    for num_chiplets in [10, 100, 1000, 10000]:
+        if num_chiplets > args.max_chiplets:
+            break
+        cases = {"distinct": [rng.uniform(10, 800) for _ in range(num_chiplets)],
+                 "identical": [56.0] * num_chiplets}
+        for name, areas in cases.items():
+            t_ref = time_call(recursive_split, areas, args.repeat)
+            t_new = time_call(floorplan_interposer, areas, args.repeat)
+            (w, h), num_if = recursive_split(areas)
+            fp = floorplan_interposer(areas)
+            match = (fp.width, fp.height) == (w, h) and fp.num_if == int(-(-num_if // 1))
+            print("{:>8} {:>10} {:>14.6f} {:>14.6f} {:>8.1f}x  {}".format(num_chiplets, name, t_ref, t_new, t_ref / t_new, match))
+
+
+if __name__ == '__main__':
+    main()
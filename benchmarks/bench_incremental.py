@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# Edit-to-result latency: incremental Design vs full re-evaluation of the architecture.
+# Usage: python benchmarks/bench_incremental.py [--entries N] [--edits K]
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from design import Design
+from evaluate import evaluate_arch
+from floorplan import _floorplan_cached
+
+TECH_NODES = [28, 20, 14, 10, 7, 5, 3]
+
+
+def make_arch(num_entries, package, rng):
+    chiplets = []
+    for i in range(num_entries):
+        if i % 4 == 3:
+            chiplets.append({"type": "pic-logic", "tech": -1, "area": round(rng.uniform(0.2, 2.0), 3), "num_chiplets": rng.randint(1, 4)})
+        else:
+            chiplets.append({"type": "cmos-logic", "tech": rng.choice(TECH_NODES), "area": round(rng.uniform(0.5, 6.0), 3),
+                             "num_chiplets": rng.randint(1, 4)})
+    return {"name": "bench", "type": "bench", "chiplets": chiplets, "package": package}
+
+
+def random_edit(arch, rng, kind):
+    index = rng.randrange(len(arch["chiplets"]))
+    if kind == "tech" and arch["chiplets"][index]["type"] == "cmos-logic":
+        return index, {"tech": rng.choice(TECH_NODES)}
+    return index, {"area": round(rng.uniform(0.5, 6.0), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental re-evaluation.")
+    parser.add_argument('--entries', type=int, default=64, help="Chiplet entries in the architecture")
+    parser.add_argument('--edits', type=int, default=500, help="Edits per case")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    print("{:>13} {:>5} {:>12} {:>12} {:>9}  {}".format("package", "edit", "full_us", "incr_us", "speedup", "match"))
+    for package in ["2.5D-passive", "3D", "EMIB"]:
+        for kind in ["area", "tech"]:
+            rng = random.Random(args.seed)
+            design = Design(make_arch(args.entries, package, rng))
+            design.evaluate()
+            full, incremental, match = [], [], True
+            for _ in range(args.edits):
+                index, fields = random_edit(design.arch, rng, kind)
+
+                # neither side may reuse the other's floorplan
+                _floorplan_cached.cache_clear()
+                start = time.perf_counter()
+                design.set_chiplet(index, **fields)
+                result = design.evaluate()
+                incremental.append(time.perf_counter() - start)
+
+                _floorplan_cached.cache_clear()
+                start = time.perf_counter()
+                reference = evaluate_arch(design.arch, design.context)
+                full.append(time.perf_counter() - start)
+                match &= reference.breakdown == result.breakdown
+
+            t_full, t_incr = statistics.median(full) * 1e6, statistics.median(incremental) * 1e6
+            print("{:>13} {:>5} {:>12.1f} {:>12.1f} {:>8.1f}x  {}".format(package, kind, t_full, t_incr, t_full / t_incr, match))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# Cold-start regression check for the CLI, based on `python -X importtime`.
+# Exits with status 1 if the import time of a mode exceeds its budget.
+# Usage: python benchmarks/bench_startup.py [--repeat R] [--budget-ocf MS] [--budget-ecf MS]
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+EPICARBON = os.path.join(REPO_DIR, "epicarbon.py")
+ARCH = os.path.join(REPO_DIR, "archs", "adept.json")
+
+# budgets for the total import time in ms (generous: NumPy alone is ~50-100 ms)
+DEFAULT_BUDGETS = {"OCF": 100, "ECF": 250}
+CASES = {
+    "OCF": ["--estimate", "OCF", "--energy", "1e-3"],
+    "ECF": ["--estimate", "ECF", "--arch", ARCH],
+}
+
+
+def parse_importtime(stderr):
+    # returns (total import time in ms, {top-level module: cumulative ms})
+    top_level = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith("  "):
+            continue  # nested import, already counted in its parent
+        top_level[name.strip()] = int(cumulative) / 1000
+    return sum(top_level.values()), top_level
+
+
+def run_case(args):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", EPICARBON] + args,
+                          cwd=REPO_DIR, capture_output=True, text=True)
+    wall = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError("epicarbon.py {} failed:\n{}".format(" ".join(args), proc.stderr[-2000:]))
+    total, top_level = parse_importtime(proc.stderr)
+    return total, wall, top_level
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check CLI cold-start import time against a budget.")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per mode (the median is compared)")
+    parser.add_argument('--budget-ocf', type=float, default=DEFAULT_BUDGETS["OCF"], help="Import budget for --estimate OCF (ms)")
+    parser.add_argument('--budget-ecf', type=float, default=DEFAULT_BUDGETS["ECF"], help="Import budget for --estimate ECF (ms)")
+    parser.add_argument('--top', type=int, default=5, help="Number of slowest top-level imports to list")
+    args = parser.parse_args()
+    budgets = {"OCF": args.budget_ocf, "ECF": args.budget_ecf}
+
+    failed = False
+    for mode, case_args in CASES.items():
+        runs = sorted((run_case(case_args) for _ in range(args.repeat)), key=lambda r: r[0])
+        total, wall, top_level = runs[len(runs) // 2]
+        ok = total <= budgets[mode]
+        failed |= not ok
+        print("{:4s} import {:7.1f} ms (budget {:.0f} ms)  wall {:7.1f} ms  {}".format(
+            mode, total, budgets[mode], wall, "ok" if ok else "OVER BUDGET"))
+        for name, ms in sorted(top_level.items(), key=lambda kv: -kv[1])[:args.top]:
+            print("       {:8.1f} ms  {}".format(ms, name))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
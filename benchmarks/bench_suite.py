@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# Performance suite: latency, throughput and peak memory of the main entry points,
+# saved to a JSON baseline and compared against it.
+#   python benchmarks/bench_suite.py --save benchmarks/baseline.json
+#   python benchmarks/bench_suite.py --compare benchmarks/baseline.json [--threshold 10]
+# --compare exits with status 1 if a case is slower (or uses more memory) than
+# the baseline by more than --threshold percent.
+import argparse
+import csv
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(REPO_DIR)
+sys.path.append(os.path.join(REPO_DIR, "src"))
+
+import epicarbon
+from floorplan import _floorplan_cached
+from packager import recursive_split
+from corpus import evaluate_corpus, write_corpus
+from dnn import evaluate_model_zoo
+from scenarios import evaluate_scenario_matrix
+from breakeven import get_break_even_area, get_break_even_energy, get_crossover_lifetime, get_payback_time
+from utils import parse_arch_file, parse_dnn_model
+
+EPICARBON = os.path.join(REPO_DIR, "epicarbon.py")
+ARCHS = ["lt", "adept"]
+PACKAGES = ["3D", "EMIB", "2.5D-passive", "2.5D-active", "RDL"]
+CHIPLET_COUNTS = [10, 100, 1000, 10000]
+SPLIT_COUNTS = [10, 100, 1000]
+DNN_LAYERS = [1000, 100000]
+ZOO_MODELS = 50                 # models of 1000 layers in the model zoo case
+CORPUS_ARCHS = 10000            # architectures of 1-8 chiplets in the corpus case
+BREAKEVEN_PAIRS = 1000000       # design pairs of the break-even case
+ZOO_ENERGY_TABLE = {"energy_per_mac": {"conv": 2e-12, "fc": 3e-12}, "energy_per_op": {"nonlinear": 1e-12}}
+TECH_NODES = [28, 20, 14, 10, 7, 5, 3]
+CLI_CASES = {
+    "OCF": ["--estimate", "OCF", "--energy", "1e-3"],
+    "ECF": ["--estimate", "ECF", "--arch", os.path.join(REPO_DIR, "archs", "adept.json")],
+}
+
+
+# ------------------------ Workloads ----------------------------
+
+def make_arch(num_chiplets, package, rng):
+    # one entry per chiplet with its own area, so no two chiplets share a model evaluation;
+    # beyond 100 chiplets the dies shrink so the interposer stays within the yield model's range
+    scale = min(1.0, 100 / num_chiplets)
+    chiplets = []
+    for i in range(num_chiplets):
+        if i % 4 == 3:
+            chiplets.append({"type": "pic-logic", "tech": -1, "area": rng.uniform(0.2, 2.0) * scale})
+        else:
+            chiplets.append({"type": "cmos-logic", "tech": rng.choice(TECH_NODES), "area": rng.uniform(0.5, 6.0) * scale})
+    return {"name": "bench", "type": "bench", "chiplets": chiplets, "package": package}
+
+
+def breakeven_case(num_pairs, seed):
+    # crossover, break-even energy and payback of random (ECF, energy) design pairs
+    rng = np.random.default_rng(seed)
+    ecf_a, ecf_b = rng.uniform(1e3, 1e6, (2, num_pairs))
+    energy_a, energy_b = rng.uniform(1e-4, 1e-1, (2, num_pairs))
+
+    def fn():
+        get_crossover_lifetime(ecf_b, energy_b)
+        get_break_even_energy(ecf_a, energy_a, ecf_b)
+        get_payback_time(ecf_b, energy_a, energy_b)
+    return fn
+
+
+def write_dnn_csv(path, num_layers, rng):
+    kinds = ["conv", "conv", "fc", "relu", "pool", "linear"]
+    with open(path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["Layer name", "Channels", "Height", "Width", "Kernel", "Stride", "Filters"])
+        for i in range(num_layers):
+            writer.writerow(["layer{}_{}".format(i, rng.choice(kinds)), rng.choice([3, 64, 128, 256, 512]),
+                             rng.choice([7, 14, 28, 56, 224]), rng.choice([7, 14, 28, 56, 224]),
+                             rng.choice([1, 3, 5]), rng.choice([1, 2]), rng.choice([64, 128, 256, 512])])
+
+
+def embodied_case(arch):
+    def run():
+        # cold floorplan: every repeat sizes the interposer from scratch
+        _floorplan_cached.cache_clear()
+        epicarbon.get_carbon_embodied(arch)
+    return run
+
+
+# runs the CLI in-process and reports its peak RSS: VmHWM is reset by exec, unlike
+# ru_maxrss, which keeps the high-water mark of the forked benchmark process
+PEAK_RSS_WRAPPER = """
+import atexit, runpy, sys
+def report():
+    with open("/proc/self/status") as status:
+        sys.stderr.write("".join(l for l in status if l.startswith("VmHWM:")))
+atexit.register(report)
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def run_cli(command):
+    proc = subprocess.run(command, cwd=REPO_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError("{} failed:\n{}".format(" ".join(command), proc.stderr[-2000:]))
+    return proc.stderr
+
+
+def cli_case(args):
+    def run():
+        run_cli([sys.executable, EPICARBON] + args)
+
+    def peak_kb():
+        # Linux only (None elsewhere)
+        if not os.path.exists("/proc/self/status"):
+            return None
+        stderr = run_cli([sys.executable, "-c", PEAK_RSS_WRAPPER, EPICARBON] + args)
+        return float(stderr.rsplit("VmHWM:", 1)[1].split()[0])
+    run.peak_kb = peak_kb
+    return run
+
+
+def get_cases(tmp_dir, max_chiplets, seed):
+    # [(name, fn, items per call, unit)] in a fixed order
+    rng = random.Random(seed)
+    cases = []
+    for name in ARCHS:
+        arch_file = os.path.join(REPO_DIR, "archs", name + ".json")
+        cases.append(("embodied/{}".format(name), embodied_case(arch_file), 1, "designs"))
+    for package in PACKAGES:
+        for n in CHIPLET_COUNTS:
+            if n <= max_chiplets:
+                cases.append(("embodied/{}/{}".format(package, n), embodied_case(make_arch(n, package, rng)), n, "chiplets"))
+    for n in SPLIT_COUNTS:
+        if n <= max_chiplets:
+            areas = [rng.uniform(10, 800) for _ in range(n)]
+            cases.append(("recursive_split/{}".format(n), lambda areas=areas: recursive_split(areas), n, "chiplets"))
+    for n in [10, max_chiplets]:
+        arch_file = os.path.join(tmp_dir, "arch_{}.json".format(n))
+        with open(arch_file, 'w') as json_file:
+            json.dump(make_arch(n, "2.5D-passive", rng), json_file)
+        cases.append(("parse_arch_file/{}".format(n), lambda f=arch_file: parse_arch_file(f), n, "entries"))
+    for n in DNN_LAYERS:
+        dnn_file = os.path.join(tmp_dir, "dnn_{}.csv".format(n))
+        write_dnn_csv(dnn_file, n, rng)
+        cases.append(("parse_dnn_model/{}".format(n), lambda f=dnn_file: parse_dnn_model(f), n, "layers"))
+    zoo_dir = os.path.join(tmp_dir, "zoo")
+    os.makedirs(zoo_dir)
+    for i in range(ZOO_MODELS):
+        write_dnn_csv(os.path.join(zoo_dir, "model_{}.csv".format(i)), DNN_LAYERS[0], rng)
+    cases.append(("model_zoo/{}x{}".format(ZOO_MODELS, DNN_LAYERS[0]),
+                  lambda: evaluate_model_zoo(zoo_dir, ZOO_ENERGY_TABLE, per_layer=True), ZOO_MODELS, "models"))
+    corpus_dir = os.path.join(tmp_dir, "corpus")
+    write_corpus((make_arch(rng.randint(1, 8), rng.choice(PACKAGES), rng) for _ in range(CORPUS_ARCHS)), corpus_dir)
+    cases.append(("corpus/{}".format(CORPUS_ARCHS), lambda: evaluate_corpus(corpus_dir), CORPUS_ARCHS, "designs"))
+    cases.append(("scenario_matrix/{}".format(CORPUS_ARCHS), lambda: evaluate_scenario_matrix(corpus_dir, energy_per_inf=1e-3),
+                  CORPUS_ARCHS, "designs"))
+    cases.append(("breakeven/{}".format(BREAKEVEN_PAIRS), breakeven_case(BREAKEVEN_PAIRS, seed), BREAKEVEN_PAIRS, "pairs"))
+    budgets = np.random.default_rng(seed).uniform(1e3, 1e5, BREAKEVEN_PAIRS // 10)
+    cases.append(("breakeven_area/{}".format(len(budgets)), lambda: get_break_even_area(budgets, "cmos-logic", 7),
+                  len(budgets), "dies"))
+    for mode, args in CLI_CASES.items():
+        cases.append(("cli_startup/{}".format(mode), cli_case(args), 1, "runs"))
+    return cases
+
+
+# ------------------------ Measurement ----------------------------
+
+def measure(fn, items, repeat, min_seconds):
+    # best and median latency over at least `repeat` runs (and min_seconds); peak
+    # memory is the Python allocations of one extra traced run, or the peak RSS
+    # reported by fn (CLI cases)
+    fn()    # warm up: data tables, imports
+    times = []
+    start = time.perf_counter()
+    while len(times) < repeat or time.perf_counter() - start < min_seconds:
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    if hasattr(fn, "peak_kb"):
+        peak_kb = fn.peak_kb()
+    else:
+        tracemalloc.start()
+        fn()
+        peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    best = min(times)
+    return {"latency_s": best, "median_s": statistics.median(times), "runs": len(times), "items": items,
+            "throughput_per_s": items / best, "peak_kb": peak_kb}
+
+
+def get_metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    import numpy
+    return {"created": datetime.datetime.now().isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "numpy": numpy.__version__, "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine()}
+
+
+def compare(current, baseline, threshold):
+    # [(case, metric, baseline, current, change %)] of the regressions beyond threshold percent
+    regressions = []
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+        for metric in ["latency_s", "peak_kb"]:
+            old, new = baseline[name].get(metric), result[metric]
+            if old and new is not None and new > old * (1 + threshold / 100):
+                regressions.append((name, metric, old, new, (new / old - 1) * 100))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the performance suite, save a baseline or compare against one.")
+    parser.add_argument('--save', metavar="FILE", help="Write the results as a JSON baseline")
+    parser.add_argument('--compare', metavar="FILE", help="Compare against a JSON baseline; exit 1 on regressions")
+    parser.add_argument('--threshold', type=float, default=10, help="Regression threshold in percent (default 10)")
+    parser.add_argument('--filter', default="", help="Only run cases whose name contains this string")
+    parser.add_argument('--repeat', type=int, default=5, help="Minimum timed runs per case (best time is compared)")
+    parser.add_argument('--min-seconds', type=float, default=0.2, help="Minimum timed duration per case")
+    parser.add_argument('--max-chiplets', type=int, default=10000, help="Largest synthetic architecture")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the synthetic workloads")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as json_file:
+            baseline = json.load(json_file)["cases"]
+
+    results = {}
+    print("{:28s} {:>12} {:>12} {:>16} {:>11}  {}".format("case", "best_ms", "median_ms", "throughput/s", "peak_kb",
+                                                             "vs baseline" if baseline else ""))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, fn, items, unit in get_cases(tmp_dir, args.max_chiplets, args.seed):
+            if args.filter not in name:
+                continue
+            result = measure(fn, items, args.repeat, args.min_seconds)
+            result["unit"] = unit
+            results[name] = result
+            change = ""
+            if baseline and name in baseline:
+                change = "{:+.1f}%".format((result["latency_s"] / baseline[name]["latency_s"] - 1) * 100)
+            print("{:28s} {:>12.3f} {:>12.3f} {:>11.0f} {:4s} {:>11.0f}  {}".format(
+                name, result["latency_s"] * 1e3, result["median_s"] * 1e3, result["throughput_per_s"], unit[:4],
+                result["peak_kb"] or 0, change), flush=True)
+
+    if args.save:
+        with open(args.save, 'w') as json_file:
+            json.dump({"meta": get_metadata(), "cases": results}, json_file, indent=2)
+        print("Baseline written to {}".format(args.save))
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for name, metric, old, new, change in regressions:
+            print("REGRESSION {:28s} {:10s} {:.6g} -> {:.6g} ({:+.1f}%)".format(name, metric, old, new, change))
+        print("{} regression(s) above {:g}% ({} case(s) compared)".format(
+            len(regressions), args.threshold, len(set(results) & set(baseline))))
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# Load test of the estimation server: several clients send pipelined requests
+# (embodied ECF of the bundled architectures over a few ci_fab values, plus
+# chiplet lists) and the client-side throughput and latency are printed next
+# to the server's own metrics.
+#   python epicarbon.py --serve unix:/tmp/epicarbon.sock --jobs 4 &
+#   python benchmarks/load_test.py --address unix:/tmp/epicarbon.sock --clients 8 --requests 2000
+# --start runs a server for the duration of the test instead.
+import argparse
+import glob
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(REPO_DIR, "src"))
+
+from client import EpicarbonClient
+
+EPICARBON = os.path.join(REPO_DIR, "epicarbon.py")
+TECH_NODES = [28, 20, 14, 10, 7, 5, 3]
+
+
+def make_requests(num_requests, ci_values, chiplet_share, rng):
+    archs = sorted(glob.glob(os.path.join(REPO_DIR, "archs", "*.json")))
+    requests = []
+    for _ in range(num_requests):
+        if rng.random() < chiplet_share:
+            chiplets = [{"type": "cmos-logic", "tech": rng.choice(TECH_NODES), "area": rng.uniform(0.5, 6.0)}
+                        for _ in range(rng.randint(1, 16))]
+            requests.append({"op": "chiplets", "chiplets": chiplets, "context": {"ci_fab": rng.choice(ci_values)}})
+        else:
+            requests.append({"op": "embodied", "arch": rng.choice(archs), "context": {"ci_fab": rng.choice(ci_values)}})
+    return requests
+
+
+def run_client(address, requests, depth, latencies, errors):
+    with EpicarbonClient(address) as client:
+        for i in range(0, len(requests), depth):
+            start = time.perf_counter()
+            responses = client.request_many(requests[i:i + depth])
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors.extend(r["error"] for r in responses if not r["ok"])
+
+
+def wait_for_server(address, timeout=30):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            with EpicarbonClient(address, timeout=1) as client:
+                client.ping()
+                return
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the epicarbon estimation server.")
+    parser.add_argument("--address", default="127.0.0.1:7733", help="Server address (host:port or unix:/path).")
+    parser.add_argument("--start", action="store_true", help="Start a server on a temporary socket for the test.")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes of the --start server.")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent client connections.")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per client.")
+    parser.add_argument("--depth", type=int, default=16, help="Requests in flight per client.")
+    parser.add_argument("--ci-values", type=int, default=8, help="Distinct ci_fab values (more: fewer cache hits).")
+    parser.add_argument("--chiplet-share", type=float, default=0.5, help="Share of chiplet-list requests.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server, tmp_dir = None, None
+    if args.start:
+        tmp_dir = tempfile.mkdtemp(prefix="epicarbon_load_")
+        args.address = "unix:" + os.path.join(tmp_dir, "server.sock")
+        server = subprocess.Popen([sys.executable, EPICARBON, "--serve", args.address, "--jobs", str(args.workers)],
+                                  stdout=subprocess.DEVNULL)
+    try:
+        wait_for_server(args.address)
+        rng = random.Random(args.seed)
+        ci_values = [200 + 100 * i for i in range(args.ci_values)]
+        workloads = [make_requests(args.requests, ci_values, args.chiplet_share, rng) for _ in range(args.clients)]
+
+        latencies, errors = [], []
+        threads = [threading.Thread(target=run_client, args=(args.address, w, args.depth, latencies, errors))
+                   for w in workloads]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        with EpicarbonClient(args.address) as client:
+            metrics = client.metrics()
+            if server is not None:
+                client.shutdown()
+    finally:
+        if server is not None:
+            server.wait(timeout=30)
+            os.rmdir(tmp_dir)
+
+    total = args.clients * args.requests
+    latencies.sort()
+    print("Requests                    = {} ({} client(s), depth {})".format(total, args.clients, args.depth))
+    print("Errors                      : {}".format(len(errors)))
+    for error in errors[:5]:
+        print("    {}".format(error))
+    print("Elapsed                     : {:.2f} s".format(elapsed))
+    print("Throughput                  : {:.0f} requests/s".format(total / elapsed))
+    print("Round trip per window       : median {:.2f} ms, p99 {:.2f} ms".format(
+        statistics.median(latencies), latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]))
+    print("Server metrics              :")
+    print(json.dumps(metrics, indent=2))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,66 @@
 import os
 import sys
 import argparse
+import contextlib
+import importlib
 
 
 file_dir = os.path.dirname(__file__)
 sys.path.append(file_dir)
 sys.path.append(os.path.join(file_dir, "src"))
 
-from src.utils import parse_arch_file
+from src.evaluate import evaluate_arch, evaluate_embodied_groups, evaluate_many, get_operational_terms, \
+    get_operational_result, load_arch, EmbodiedResult, OperationalResult, FootprintResult
+from src.context import EvalContext
+from src.reporting import Reporter, ConsoleReporter, LoggingReporter
+from src.timing import StageTimer
+
+# Modules that pull in NumPy, pandas, sqlite3 or the chiplet models are only
+# imported by the functions that need them, so e.g. an OCF estimate starts
+# quickly. Their names stay available as attributes of this module.
+LAZY_EXPORTS = {
+    "parse_arch_file"                : "src.utils",
+    "parse_arch_groups"              : "src.utils",
+    "reload_tables"                  : "src.utils",
+    "invalidate_tables"              : "src.utils",
+    "get_manufacturing_carbon_batch" : "src.batch",
+    "run_sweep"                      : "src.sweep",
+    "run_monte_carlo"                : "src.montecarlo",
+    "ResultCache"                    : "src.result_cache",
+    "evaluate_arch_cached"           : "src.result_cache",
+    "evaluate_embodied_cached"       : "src.result_cache",
+    "run_batch"                      : "src.batch_jobs",
+    "load_jobs"                      : "src.batch_jobs",
+    "Design"                         : "src.design",
+    "get_gradients"                  : "src.gradients",
+    "get_gradients_batch"            : "src.gradients",
+    "get_manufacturing_carbon_gradient_batch" : "src.batch",
+    "run_partition_search"           : "src.partition_search",
+    "evaluate_fleet"                 : "src.fleet",
+    "load_inventory"                 : "src.fleet",
+    "EstimationServer"               : "src.server",
+    "EpicarbonClient"                : "src.client",
+    "evaluate_model_zoo"             : "src.dnn",
+    "load_energy_table"              : "src.dnn",
+    "get_yield"                      : "src.yields",
+    "get_dies_per_wafer"             : "src.yields",
+    "evaluate_scenario_matrix"       : "src.scenarios",
+    "evaluate_breakeven"             : "src.breakeven",
+    "get_crossover_lifetime"         : "src.breakeven",
+    "get_break_even_energy"          : "src.breakeven",
+    "get_payback_time"               : "src.breakeven",
+    "get_break_even_area"            : "src.breakeven",
+    "OperationalProfile"             : "src.breakeven",
+    "write_corpus"                   : "src.corpus",
+    "open_corpus"                    : "src.corpus",
+    "evaluate_corpus"                : "src.corpus",
+}
+
+
+def __getattr__(name):
+    if name not in LAZY_EXPORTS:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    return getattr(importlib.import_module(LAZY_EXPORTS[name]), name)
 
 # ---------------------------------------------------------
 # Default Carbon Intensity (CI) values in gCO2/kWh
@@ -31,10 +84,37 @@ def set_ci_op(_ci_op):
     ci_op = _ci_op
 
 
+def current_context(**changes):
+    """Immutable EvalContext snapshot of the module CI values (with optional overrides)."""
+    return EvalContext(ci_fab=ci_fab, ci_op=ci_op).replace(**changes)
+
+
+# ---------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------
+reporter = None     # default Reporter for the get_carbon_* functions (None: no output)
+
+
+def set_reporter(_reporter):
+    """Attach a default reporter (e.g. ConsoleReporter(), LoggingReporter()); None disables output."""
+    global reporter
+    reporter = _reporter
+
+
+def _get_reporter(_reporter, verbose):
+    # explicit reporter, then the module default; verbose alone implies console output
+    if _reporter is not None:
+        return _reporter
+    if reporter is not None:
+        return reporter
+    return ConsoleReporter() if verbose else Reporter()
+
+
 # ---------------------------------------------------------
 # Operational Carbon Footprint (OCF)
 # ---------------------------------------------------------
-def get_carbon_operational(energy_per_inf, num_inf_per_day=1e9, lifetime_days=5*365, verbose=False):
+def get_carbon_operational(energy_per_inf, num_inf_per_day=1e9, lifetime_days=5*365, verbose=False, context=None,
+                           reporter=None, return_result=False):
     """
     Calculate operational carbon footprint (OCF) over device lifetime.
 
@@ -43,37 +123,104 @@ def get_carbon_operational(energy_per_inf, num_inf_per_day=1e9, lifetime_days=5*
         num_inf_per_day (float): Inferences per day (default 1e9).
         lifetime_days (int): Lifetime of the chip in days (default 5 years).
         verbose (bool): Print detailed logs.
+        context (EvalContext): Scenario to use instead of the module CI values.
+        reporter (Reporter): Receives the result (default: set_reporter(); no output if unset).
+        return_result (bool): Return the OperationalResult instead of the total.
+
+    Returns:
+        float or OperationalResult: OCF in grams CO2-equivalent.
+    """
+    if context is None:
+        context = current_context()
+    reporter = _get_reporter(reporter, verbose)
+
+    reporter.start_operational(energy_per_inf, num_inf_per_day, lifetime_days, verbose=verbose)
+    result = get_operational_result(energy_per_inf, context.ci_op, num_inf_per_day=num_inf_per_day,
+                                    lifetime_days=lifetime_days)
+    reporter.report_operational(context, result, verbose=verbose)
+
+    return result if return_result else result.total
+
+
+def get_carbon_operational_trace(energy_per_inf, ci_trace=None, workload_trace=None, location=None, lifetime_days=5*365,
+                                 num_inf_per_day=1e9, step_hours=1.0, cumulative_out=None, verbose=False, context=None,
+                                 reporter=None):
+    """
+    Operational carbon footprint (OCF) from hourly (or finer) CI and workload traces.
+
+    Traces are CSV files, .npy files or raw float64 binaries (memory-mapped), or
+    arrays, and are repeated when shorter than the lifetime. Missing CI values
+    fall back to the location's CI from carbon_intensity/location.json, or to
+    the module ci_op (see src/operational_trace.py).
+
+    Parameters:
+        energy_per_inf (float): Energy per inference in joules.
+        ci_trace (str or array): Grid carbon intensity per step (gCO2/kWh).
+        workload_trace (str or array): Inferences per step (default: num_inf_per_day evenly spread).
+        location (str): Baseline CI location, e.g. "usa" or "europe".
+        lifetime_days (float): Lifetime of the chip in days (default 5 years).
+        num_inf_per_day (float): Inferences per day where no workload trace is given.
+        step_hours (float): Duration of one trace step in hours.
+        cumulative_out (str): Optional .npy file for the cumulative OCF of every step.
+        verbose (bool): Print detailed logs.
+        context (EvalContext): Scenario to use instead of the module CI values.
+        reporter (Reporter): Receives the result (default: set_reporter(); no output if unset).
 
     Returns:
-        float: OCF in grams CO2-equivalent.
+        OperationalTraceResult: Total OCF (gCO2), effective CI and cumulative OCF per day.
     """
-    if verbose:
-        print("\n[Operational Carbon Footprint Calculation]")
-        print(f"Energy per inference       : {energy_per_inf:.2e} J")
-        print(f"Inferences per day         : {num_inf_per_day:.0e}")
-        print(f"Lifetime                   : {lifetime_days} days ({lifetime_days / 365:.1f} years)")
-        print("--------------------------------------------------")
+    from src.operational_trace import run_operational_trace
+    if context is None:
+        context = current_context()
+    reporter = _get_reporter(reporter, verbose)
 
-    # Convert J → kWh
-    energy_per_inf_kWh = energy_per_inf / (1000 * 3600)
-    ocf_per_inf = energy_per_inf_kWh * ci_op
-    ocf_per_day = ocf_per_inf * num_inf_per_day
-    ocf_total = ocf_per_day * lifetime_days
+    result = run_operational_trace(energy_per_inf, ci_trace=ci_trace, workload_trace=workload_trace, location=location,
+                                   context=context, lifetime_days=lifetime_days, num_inf_per_day=num_inf_per_day,
+                                   step_hours=step_hours, cumulative_out=cumulative_out)
+    reporter.report_operational_trace(context, result, verbose=verbose)
+    return result
 
-    if verbose:
-        print(f"Energy per inference (kWh) : {energy_per_inf_kWh:.2e} kWh")
-        print(f"Carbon per inference       : {ocf_per_inf:.2e} gCO2")
-        print(f"Carbon per day             : {ocf_per_day:.2e} gCO2")
-    print("--------------------------------------------------")
-    print(f"Total OCF                  = {ocf_total:.2e} gCO2")
 
-    return ocf_total
+def get_carbon_operational_zoo(models, energy_table, num_inf_per_day=1e9, lifetime_days=5*365, per_layer=False,
+                               verbose=False, context=None, reporter=None):
+    """
+    Energy per inference and OCF of a zoo of DNN models from their layer CSVs.
+
+    A single model is reported through get_carbon_operational(); several
+    models are listed in a table.
+
+    Parameters:
+        models (str, list or dict): Directory or glob of layer CSVs, list of CSVs, or {name: csv}.
+        energy_table (str or dict): Accelerator energy table (see src/dnn.py).
+        num_inf_per_day (float): Inferences per day (default 1e9).
+        lifetime_days (int): Lifetime of the chip in days (default 5 years).
+        per_layer (bool): Also compute the energy and OCF of every layer.
+        verbose (bool): Print detailed logs.
+        context (EvalContext): Scenario to use instead of the module CI values.
+        reporter (Reporter): Receives the result (default: set_reporter(); console output with verbose).
+
+    Returns:
+        ModelZooResult: Layer counts, energy per inference (J) and OCF (g) per model.
+    """
+    if context is None:
+        context = current_context()
+    from src.dnn import evaluate_model_zoo
+    result = evaluate_model_zoo(models, energy_table, per_layer=per_layer,
+                                context=context.replace(num_inf_per_day=num_inf_per_day, lifetime_days=lifetime_days))
+
+    if len(result.models) == 1:
+        get_carbon_operational(float(result.energy_per_inf[0]), num_inf_per_day=num_inf_per_day,
+                               lifetime_days=lifetime_days, verbose=verbose, context=context, reporter=reporter)
+        return result
+    _get_reporter(reporter, verbose).report_operational_zoo(context, result, verbose=verbose)
+    return result
 
 
 # ---------------------------------------------------------
 # Embodied Carbon Footprint (ECF)
 # ---------------------------------------------------------
-def get_carbon_embodied(arch_file, verbose=False, return_breakdown=False):
+def get_carbon_embodied(arch_file, verbose=False, return_breakdown=False, context=None, cache=None,
+                        reporter=None, return_result=False):
     """
     Calculate embodied carbon footprint (ECF) for chip fabrication and packaging.
 
@@ -81,43 +228,143 @@ def get_carbon_embodied(arch_file, verbose=False, return_breakdown=False):
         arch_file (str): Path to architecture JSON file.
         verbose (bool): Print detailed logs.
         return_breakdown (bool): Return component-wise breakdown.
+        context (EvalContext): Scenario to use instead of the module CI values.
+        cache (ResultCache): Reuse breakdowns of previously evaluated architectures
+            (see open_result_cache(); ignored with verbose, which always evaluates). A cache
+            hit returns only the breakdown: result.cached is set, groups and packaging are
+            empty, and the timings hold the "cache" lookup stage.
+        reporter (Reporter): Receives the result (default: set_reporter(); no output if unset).
+        return_result (bool): Return the EmbodiedResult (breakdown, per-chiplet yields and
+            carbon/area, packaging and interposer, per-stage timings).
 
     Returns:
-        float or (float, dict): ECF in grams CO2, optionally with breakdown.
+        float, (float, dict) or EmbodiedResult: ECF in grams CO2, optionally with breakdown.
     """
-    if verbose:
-        print(f"\n[Embodied Carbon Footprint Calculation]")
-        print(f"Architecture file          : {arch_file}")
-        print(f"Fabrication CI              : {ci_fab} g/kWh")
-        print("--------------------------------------------------")
-        print("Building chip model...")
+    if context is None:
+        context = current_context()
+    reporter = _get_reporter(reporter, verbose)
+
+    reporter.start_embodied(arch_file, context, verbose=verbose)
+    if cache is not None and not verbose:
+        from src.result_cache import evaluate_embodied_cached
+        result, _ = evaluate_embodied_cached(load_arch(arch_file), context, cache, timer=StageTimer())
+    else:
+        # Parse the architecture into (chiplet, count) groups, then calculate ECF
+        # once per unique chiplet (scaled by its count), plus packaging carbon
+        result = evaluate_arch(arch_file, context, verbose=verbose, timer=StageTimer())
+    reporter.report_embodied(arch_file, context, result, verbose=verbose)
 
-    # Parse architecture file into components
-    chiplets, packager, _ = parse_arch_file(arch_file, verbose=verbose)
+    if return_result:
+        return result
+    return (result.total, result.breakdown) if return_breakdown else result.total
 
-    # Calculate ECF per chiplet type
-    ecf_breakdown = {}
-    for chiplet in chiplets:
-        ecf_chiplet = chiplet.get_manufacturing_carbon(ci_fab=ci_fab, ghg_abatement=95, verbose=verbose)
-        ecf_breakdown[chiplet.chiplet_type] = ecf_breakdown.get(chiplet.chiplet_type, 0) + ecf_chiplet
 
-    # Add packaging carbon
-    ecf_breakdown["package"] = packager.get_packaging_carbon(chiplets, ci_fab, verbose=verbose)
+def open_design(arch_file, context=None):
+    """
+    Open a mutable design handle with incremental re-evaluation.
+
+    After design.set_chiplet(i, area=...), set_package(...) or set_context(...),
+    design.breakdown() / design.evaluate() only recompute the affected chiplets,
+    floorplan and packaging terms (see src/design.py).
 
-    ecf_total = sum(ecf_breakdown.values())
+    Parameters:
+        arch_file (str or dict): Architecture JSON file or dict.
+        context (EvalContext): Scenario (default: module CI values).
 
-    print("--------------------------------------------------")
-    print(f"Total ECF                   = {ecf_total:.2f} gCO2")
-    for comp, value in ecf_breakdown.items():
-        print(f"{comp:15s}\t\t    : {value:.2f} gCO2")
+    Returns:
+        Design: Handle with evaluate() -> EmbodiedResult and breakdown() -> dict.
+    """
+    from src.design import Design
+    return Design(arch_file, context if context is not None else current_context())
 
-    return (ecf_total, ecf_breakdown) if return_breakdown else ecf_total
+
+def open_result_cache(path=None, max_entries=4096):
+    """
+    Open a result cache for get_carbon_embodied(cache=...).
+
+    Entries are keyed by the canonical architecture JSON, the EvalContext and a
+    hash of src/data/, so editing a data file never returns stale results.
+
+    Parameters:
+        path (str): SQLite file shared across runs (None: in-process only).
+        max_entries (int): Size limit of the in-process LRU layer.
+
+    Returns:
+        ResultCache: Cache with hit/miss counters in .stats.
+    """
+    from src.result_cache import ResultCache
+    return ResultCache(path, max_entries=max_entries)
+
+
+def profile(cold=False, memory=True):
+    """
+    Context manager that profiles the evaluations made inside it.
+
+        with epicarbon.profile() as prof:
+            epicarbon.get_carbon_embodied("archs/adept.json")
+        print(prof.format_table())
+
+    Parameters:
+        cold (bool): Drop the in-memory data tables and floorplan cache first.
+        memory (bool): Record peak allocations (tracemalloc; slows the run).
+
+    Returns:
+        Profiler: Per-function calls/total/self time, file opens, JSON parses, data table
+        loads, chiplet evaluations per spec and peak allocations; format_table(),
+        to_dict(), write_json() and write_chrome_trace().
+    """
+    from src.profiling import Profiler
+    return Profiler(cold=cold, memory=memory)
+
+
+def get_carbon_embodied_batch(chiplet_types, tech_nodes, areas, actuation_types="default",
+                              ci_fab_values=None, ghg_abatement=95, exact=True):
+    """
+    Vectorized ECF of many logic chiplets in one call (no chiplet objects are built).
+
+    Parameters:
+        chiplet_types (array of str): "cmos-logic" or "pic-logic" per row.
+        tech_nodes (array of int): Technology node in nm (use -1 for pic-logic).
+        areas (array of float): Chiplet areas in cm2.
+        actuation_types (array of str): PIC actuation type per row (default "default").
+        ci_fab_values (array of float): Fabrication CI per row (default: module ci_fab).
+        ghg_abatement (array of int): GHG abatement level per row, 95 or 99.
+        exact (bool): Bit-identical to the scalar chiplet models (slightly slower).
+
+    Returns:
+        dict: Arrays "ecf" (gCO2), "yield" and "carbon_per_area" (gCO2/cm2).
+    """
+    if ci_fab_values is None:
+        ci_fab_values = ci_fab
+    from src.batch import get_manufacturing_carbon_batch
+    return get_manufacturing_carbon_batch(chiplet_types, tech_nodes, areas, actuation_types=actuation_types,
+                                          ci_fab=ci_fab_values, ghg_abatement=ghg_abatement, exact=exact)
+
+
+def get_carbon_embodied_many(arch_context_pairs, jobs=None, use_processes=False):
+    """
+    Evaluate ECF for many (architecture, EvalContext) pairs concurrently, without printing.
+
+    Each evaluation only uses its own context and freshly built models, so
+    pairs with different scenarios can run side by side in threads.
+
+    Parameters:
+        arch_context_pairs (iterable): (arch file path or dict, EvalContext or None) pairs.
+        jobs (int): Number of worker threads/processes.
+        use_processes (bool): Use a process pool instead of threads.
+
+    Returns:
+        list: EmbodiedResult (total, breakdown, chiplets, packaging) per pair, in input order.
+    """
+    pairs = [(arch, context if context is not None else current_context()) for arch, context in arch_context_pairs]
+    return evaluate_many(pairs, jobs=jobs, use_processes=use_processes)
 
 
 # ---------------------------------------------------------
 # Combined Carbon Footprint (CF)
 # ---------------------------------------------------------
-def get_carbon_footprint(arch_file, energy_per_inf, verbose=False):
+def get_carbon_footprint(arch_file, energy_per_inf, verbose=False, context=None, cache=None,
+                         reporter=None, return_result=False):
     """
     Calculate total carbon footprint (CF) = ECF + OCF.
 
@@ -125,23 +372,376 @@ def get_carbon_footprint(arch_file, energy_per_inf, verbose=False):
         arch_file (str): Path to architecture JSON file.
         energy_per_inf (float): Energy per inference in joules.
         verbose (bool): Print detailed logs.
+        context (EvalContext): Scenario to use instead of the module CI values.
+        cache (ResultCache): Result cache for the ECF (see get_carbon_embodied()).
+        reporter (Reporter): Receives the results (default: set_reporter(); no output if unset).
+        return_result (bool): Return the FootprintResult instead of the totals.
 
     Returns:
-        tuple: (CF total, ECF, OCF) in grams CO2.
+        tuple or FootprintResult: (CF total, ECF, OCF) in grams CO2.
+    """
+    if context is None:
+        context = current_context()
+    reporter = _get_reporter(reporter, verbose)
+
+    embodied = get_carbon_embodied(arch_file, verbose=verbose, context=context, cache=cache,
+                                   reporter=reporter, return_result=True)
+    operational = get_carbon_operational(energy_per_inf, verbose=verbose, context=context,
+                                         reporter=reporter, return_result=True)
+    result = FootprintResult(embodied.total + operational.total, embodied, operational)
+    reporter.report_footprint(context, result, verbose=verbose)
+
+    return result if return_result else (result.total, embodied.total, operational.total)
+
+
+# ---------------------------------------------------------
+# Gradients
+# ---------------------------------------------------------
+def get_carbon_gradients(arch_file, energy_per_inf=0, context=None):
     """
+    Exact partial derivatives of ECF, OCF and CF (see src/gradients.py).
 
-    ecf = get_carbon_embodied(arch_file, verbose=verbose)
-    ocf = get_carbon_operational(energy_per_inf, verbose=verbose)
-    cf_total = ecf + ocf
+    Derivatives are taken w.r.t. every chiplet entry's area and ci_fab, defect_rate,
+    interposer_defect_rate, bonding_yield, ci_op, energy_per_inf, num_inf_per_day and
+    lifetime_days. TSV/EMIB counts are held at their current step; result.margins
+    gives the distance to the next step.
 
-    print("--------------------------------------------------")
-    print(f"Total CF                    = {cf_total:.2f} gCO2")
-    print(f"  - Operational (OCF)       : {ocf:.2f} gCO2")
-    print(f"  - Embodied (ECF)          : {ecf:.2f} gCO2")
+    Parameters:
+        arch_file (str, dict or list): Architecture JSON file or dict, or a list of them
+            (differentiated in one batch).
+        energy_per_inf (float or list): Energy per inference in joules.
+        context (EvalContext or list): Scenario (default: module CI values).
 
-    return cf_total, ecf, ocf
+    Returns:
+        GradientResult or list: .d_ecf, .d_ocf and .d_cf dicts of partial derivatives.
+    """
+    from src.gradients import get_gradients_batch
+    if context is None:
+        context = current_context()
+    if isinstance(arch_file, list):
+        return get_gradients_batch(arch_file, context, energy_per_inf)
+    return get_gradients_batch([arch_file], [context], [energy_per_inf])[0]
 
 
+# ---------------------------------------------------------
+# Fleet
+# ---------------------------------------------------------
+def get_carbon_fleet(inventory, context=None, reporter=None):
+    """
+    Embodied and operational carbon of a fleet of accelerators, DRAM, SSDs and HDDs.
+
+    Parameters:
+        inventory (str or list): Inventory file (JSON, JSONL or CSV) or list of rows of
+            (component spec, count, region) (see src/fleet.py).
+        context (EvalContext): Scenario (default: module CI values; ci_op is the CI of
+            rows without a region).
+        reporter (Reporter): Receives the result (default: set_reporter(); no output if unset).
+
+    Returns:
+        FleetResult: ECF, OCF and their totals per component type, region and component.
+    """
+    if context is None:
+        context = current_context()
+    from src.fleet import evaluate_fleet
+    result = evaluate_fleet(inventory, context)
+
+    _get_reporter(reporter, False).report_fleet(context, result)
+    return result
+
+
+# ---------------------------------------------------------
+# Architecture corpora
+# ---------------------------------------------------------
+def make_corpus(source, out_dir, reporter=None):
+    """
+    Convert architecture JSON files (or dicts) into a columnar corpus directory.
+
+    Parameters:
+        source (str or iterable): Directory or glob of architecture JSON files, or an
+            iterable of architecture dicts / paths.
+        out_dir (str): Corpus directory.
+        reporter (Reporter): Receives the summary (default: set_reporter(); no output if unset).
+
+    Returns:
+        int: Number of architectures written.
+    """
+    from src.corpus import write_corpus
+    num_archs = write_corpus(source, out_dir)
+    _get_reporter(reporter, False).report_corpus_written(out_dir, num_archs)
+    return num_archs
+
+
+def get_carbon_corpus(corpus, out_path=None, context=None, reporter=None):
+    """
+    ECF of every architecture of a corpus (see src/corpus.py).
+
+    Parameters:
+        corpus (str): Corpus directory written by make_corpus().
+        out_path (str): Optional per-arch results, .csv or .npz.
+        context (EvalContext): Scenario (default: module CI values).
+        reporter (Reporter): Receives the result (default: set_reporter(); no output if unset).
+
+    Returns:
+        CorpusResult: Total ECF and breakdown arrays per architecture.
+    """
+    if context is None:
+        context = current_context()
+    import time
+    from src.corpus import evaluate_corpus
+    start = time.perf_counter()
+    result = evaluate_corpus(corpus, context)
+    seconds = time.perf_counter() - start
+
+    if out_path is not None:
+        if out_path.endswith(".npz"):
+            import numpy as np
+            np.savez(out_path, names=np.array(result.names), ecf=result.ecf, interposer_area=result.interposer_area,
+                     num_if=result.num_if, **{"ecf_" + key: values for key, values in result.breakdown.items()})
+        else:
+            import csv
+            with open(out_path, 'w', newline='') as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerow(["name", "ecf"] + ["ecf_" + key for key in result.breakdown])
+                columns = [result.ecf.tolist()] + [values.tolist() for values in result.breakdown.values()]
+                writer.writerows([name] + list(row) for name, row in zip(result.names, zip(*columns)))
+
+    _get_reporter(reporter, False).report_corpus(context, result, seconds, out_path=out_path)
+    return result
+
+
+# ---------------------------------------------------------
+# Scenario matrix
+# ---------------------------------------------------------
+def get_carbon_scenarios(archs, fab=None, op=None, energy_per_inf=None, out_path=None, context=None,
+                         reporter=None):
+    """
+    ECF, OCF and CF of every fab CI x deployment CI x architecture combination.
+
+    Parameters:
+        archs: Architecture file, dict or list of them, directory or glob of JSON files,
+            or a corpus directory.
+        fab, op (list or str): Regions / energy sources / CI values of the fab and
+            deployment axes, as a list or "a,b,c" (default: all regions and sources).
+        energy_per_inf (float or list): Energy per inference (J); None for ECF only.
+        out_path (str): Optional result file: .npz arrays, or .csv with one row per combination.
+        context (EvalContext): Other scenario parameters (default: module values).
+        reporter (Reporter): Receives the result (default: set_reporter(); no output if unset).
+
+    Returns:
+        ScenarioMatrixResult: ecf (arch x fab), ocf (arch x op) and cf (arch x fab x op).
+    """
+    if context is None:
+        context = current_context()
+    import time
+    from src.scenarios import evaluate_scenario_matrix
+    start = time.perf_counter()
+    result = evaluate_scenario_matrix(archs, fab=fab, op=op, energy_per_inf=energy_per_inf, context=context)
+    seconds = time.perf_counter() - start
+
+    if out_path is not None:
+        if out_path.endswith(".npz"):
+            import numpy as np
+            np.savez(out_path, archs=np.array(result.archs), fab=np.array(result.fab), op=np.array(result.op),
+                     ci_fab=result.ci_fab, ci_op=result.ci_op, ecf=result.ecf, ocf=result.ocf, cf=result.cf)
+        else:
+            import csv
+            with open(out_path, 'w', newline='') as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerow(["arch", "fab", "op", "ci_fab", "ci_op", "ecf", "ocf", "cf"])
+                for i, arch in enumerate(result.archs):
+                    for j, fab_label in enumerate(result.fab):
+                        for k, op_label in enumerate(result.op):
+                            writer.writerow([arch, fab_label, op_label, result.ci_fab[j], result.ci_op[k],
+                                             result.ecf[i, j], result.ocf[i, k], result.cf[i, j, k]])
+
+    _get_reporter(reporter, False).report_scenarios(context, result, seconds, out_path=out_path)
+    return result
+
+
+# ---------------------------------------------------------
+# Break-even and crossover
+# ---------------------------------------------------------
+def get_carbon_breakeven(archs, energy_per_inf, reference=None, reference_energy=None, ci_trace=None,
+                         workload_trace=None, location=None, step_hours=1.0, out_path=None, context=None,
+                         reporter=None):
+    """
+    When OCF overtakes ECF for each architecture and, against a reference (deployed)
+    design, the break-even energy per inference and the payback time of replacing it.
+
+    Parameters:
+        archs: Architecture file, dict or list of them, directory or glob of JSON files,
+            or a corpus directory.
+        energy_per_inf (float or list): Energy per inference (J), one value or one per architecture.
+        reference (str or dict): Reference architecture (None: crossover lifetimes only).
+        reference_energy (float): Energy per inference of the reference (J).
+        ci_trace, workload_trace, location, step_hours: Time-varying deployment, as in
+            get_carbon_operational_trace() (default: constant module ci_op).
+        out_path (str): Optional result file: .npz arrays or .csv with one row per architecture.
+        context (EvalContext): Scenario to use instead of the module CI values.
+        reporter (Reporter): Receives the result (default: set_reporter(); no output if unset).
+
+    Returns:
+        BreakEvenResult: ECF, crossover days, break-even energy (J) and payback days per architecture.
+    """
+    if context is None:
+        context = current_context()
+    import time
+    from src.breakeven import OperationalProfile, evaluate_breakeven
+    start = time.perf_counter()
+    profile = OperationalProfile(context, ci_trace=ci_trace, workload_trace=workload_trace, location=location,
+                                 step_hours=step_hours)
+    result = evaluate_breakeven(archs, energy_per_inf, reference=reference, reference_energy=reference_energy,
+                                profile=profile, context=context)
+    seconds = time.perf_counter() - start
+
+    columns = ["ecf", "energy_per_inf", "crossover_days"]
+    if result.reference is not None:
+        columns += ["break_even_energy", "payback_days"]
+    if out_path is not None:
+        if out_path.endswith(".npz"):
+            import numpy as np
+            np.savez(out_path, names=np.array(result.names), **{column: getattr(result, column) for column in columns})
+        else:
+            import csv
+            with open(out_path, 'w', newline='') as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerow(["arch"] + columns)
+                for i, name in enumerate(result.names):
+                    writer.writerow([name] + [getattr(result, column)[i] for column in columns])
+
+    _get_reporter(reporter, False).report_breakeven(context, result, seconds, out_path=out_path)
+    return result
+
+
+# ---------------------------------------------------------
+# Estimation server
+# ---------------------------------------------------------
+def serve(address=None, workers=1, context=None, verbose=False):
+    """
+    Run the estimation server until a shutdown request or SIGINT/SIGTERM.
+
+    Parameters:
+        address (str): "host:port" (localhost) or "unix:/path" (default 127.0.0.1:7733).
+        workers (int): Worker processes for architecture evaluation.
+        context (EvalContext): Base scenario of the requests (default: module CI values).
+        verbose (bool): Print connections and batches.
+
+    Returns:
+        dict: Final server metrics.
+    """
+    if context is None:
+        context = current_context()
+    from src.server import EstimationServer
+    from src.client import DEFAULT_ADDRESS
+    server = EstimationServer(address or DEFAULT_ADDRESS, context=context, workers=workers, verbose=verbose)
+    server.run()
+    return server.get_metrics()
+
+
+# ---------------------------------------------------------
+# Partition search
+# ---------------------------------------------------------
+def get_carbon_pareto(spec, jobs=1, out_path=None, verbose=False, context=None, reporter=None):
+    """
+    Pareto front of ECF, CF and chiplet count over chiplet partitions, nodes and packages.
+
+    Parameters:
+        spec (str or dict): Search spec JSON file or dict (see src/partition_search.py).
+        jobs (int): Number of worker processes.
+        out_path (str): Write the front (with the architecture of every design) as JSON (optional).
+        verbose (bool): Print search progress.
+        context (EvalContext): Base scenario (default: module CI values).
+        reporter (Reporter): Receives the front (default: set_reporter(); console output with verbose).
+
+    Returns:
+        dict: "front" (list of designs sorted by chiplet count and ECF) and "stats".
+    """
+    if context is None:
+        context = current_context()
+    from src.partition_search import run_partition_search
+    result = run_partition_search(spec, jobs=jobs, context=context, verbose=verbose)
+    if out_path is not None:
+        import json
+        with open(out_path, 'w') as json_file:
+            json.dump(result, json_file, indent=2)
+
+    _get_reporter(reporter, verbose).report_pareto(context, result, out_path=out_path, verbose=verbose)
+    return result
+
+
+# ---------------------------------------------------------
+# Batch evaluation
+# ---------------------------------------------------------
+def get_carbon_batch(source, out_path="-", out_format="jsonl", energy_per_inf=None, jobs=1, ordered=True,
+                     verbose=False, context=None, reporter=None):
+    """
+    Evaluate many (architecture, scenario) jobs in one process and stream one record per job.
+
+    Parameters:
+        source (str or list): Directory, glob pattern or JSONL manifest of jobs
+            (see src/batch_jobs.py), or a list of job dicts from load_jobs().
+        out_path (str): Output file ("-" for stdout).
+        out_format (str): "jsonl" or "csv".
+        energy_per_inf (float): Energy per inference (J) for jobs that do not set one.
+        jobs (int): Number of worker processes.
+        ordered (bool): Write results in input order; otherwise as they complete.
+        verbose (bool): Print progress.
+        context (EvalContext): Base scenario (default: module CI values).
+        reporter (Reporter): Receives the summary (default: set_reporter(); console output with verbose).
+
+    Returns:
+        dict: Job/error counts, elapsed seconds, jobs per second and latency summary (ms).
+    """
+    if context is None:
+        context = current_context()
+    from src.batch_jobs import run_batch, load_jobs
+    if isinstance(source, str):
+        source = load_jobs(source, energy_per_inf=energy_per_inf)
+    stats = run_batch(source, out_path=out_path, out_format=out_format, workers=jobs, ordered=ordered,
+                      context=context, verbose=verbose)
+
+    _get_reporter(reporter, verbose).report_batch(context, stats, out_path=out_path, verbose=verbose)
+
+    return stats
+
+
+# ---------------------------------------------------------
+# Uncertainty (Monte Carlo)
+# ---------------------------------------------------------
+def get_carbon_uncertainty(arch_file, energy_per_inf=None, num_samples=1000000, seed=0, jobs=1,
+                           uncertainty=None, verbose=False, context=None, reporter=None):
+    """
+    Monte Carlo confidence intervals of ECF, and of OCF/CF when energy_per_inf is given.
+
+    Defect rate, per-node EPA, PIC process energy, bonding yield and CI values
+    are sampled around their nominal values (see src/montecarlo.py).
+
+    Parameters:
+        arch_file (str): Path to architecture JSON file.
+        energy_per_inf (float): Energy per inference in joules (optional).
+        num_samples (int): Number of Monte Carlo samples.
+        seed (int): Random seed; same seed gives the same result for any jobs.
+        jobs (int): Number of worker processes.
+        uncertainty (dict): Relative spreads overriding UNCERTAINTY_DEFAULTS.
+        verbose (bool): Print detailed logs.
+        context (EvalContext): Nominal scenario (default: module CI values).
+        reporter (Reporter): Receives the summary (default: set_reporter(); console output with verbose).
+
+    Returns:
+        dict: {"ecf", "ocf", "cf"} summaries with mean, std, min, max and percentiles (gCO2).
+    """
+    if context is None:
+        context = current_context()
+    from src.montecarlo import run_monte_carlo
+    results = run_monte_carlo(arch_file, energy_per_inf=energy_per_inf, num_samples=num_samples, seed=seed,
+                              jobs=jobs, context=context, uncertainty=uncertainty, verbose=verbose)
+    metrics = ["ecf"] if energy_per_inf is None else ["ecf", "ocf", "cf"]
+    summary = {m: results[m].to_dict() for m in metrics}
+
+    _get_reporter(reporter, verbose).report_uncertainty(context, summary, num_samples, seed, verbose=verbose)
+
+    return summary
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Calculate the carbon footprint of an electro-photonic system.")
@@ -150,24 +750,170 @@ if __name__ == "__main__":
     parser.add_argument("--arch", default="archs/default_arch.json",
                         help="Path to architecture description file (JSON).")
     parser.add_argument("--energy", type=float,
-                        help="Energy per inference in joules (required for OCF or CF).")
+                        help="Energy per inference in joules (required for OCF or CF unless --dnn is given).")
+    parser.add_argument("--dnn",
+                        help="DNN layer CSV, directory or glob of CSVs; OCF of each model from --energy-table.")
+    parser.add_argument("--energy-table",
+                        help="Accelerator energy table (JSON): energy per inference per model and/or per-layer coefficients.")
     parser.add_argument("--verbose", action="store_true", default=False,
                         help="Enable detailed logging.")
+    parser.add_argument("--sweep",
+                        help="Path to a sweep spec (JSON); evaluates every design point instead of --estimate.")
+    parser.add_argument("--batch",
+                        help="Directory, glob pattern or JSONL manifest of jobs (arch, energy_per_inf, ci_fab, ci_op) to evaluate in one run.")
+    parser.add_argument("--search",
+                        help="Path to a partition search spec (JSON); prints the Pareto front of ECF, CF and chiplet count.")
+    parser.add_argument("--fleet",
+                        help="Inventory of (component spec, count, region) rows (JSON, JSONL or CSV); totals ECF and OCF of the fleet.")
+    parser.add_argument("--scenarios", action="store_true", default=False,
+                        help="CF of --arch (file, directory, glob or corpus) for every fab x deployment CI scenario; --energy adds OCF.")
+    parser.add_argument("--fab-ci", metavar="LIST",
+                        help="Fab scenarios for --scenarios: comma-separated regions, energy sources or CI values (default: all).")
+    parser.add_argument("--op-ci", metavar="LIST",
+                        help="Deployment scenarios for --scenarios, as --fab-ci (default: all).")
+    parser.add_argument("--breakeven", action="store_true", default=False,
+                        help="Days until OCF overtakes ECF for --arch (file, directory, glob or corpus) at --energy; "
+                             "with --vs-arch also break-even energy and upgrade payback time.")
+    parser.add_argument("--vs-arch", metavar="FILE",
+                        help="Reference (deployed) architecture for --breakeven.")
+    parser.add_argument("--vs-energy", type=float,
+                        help="Energy per inference (J) of the --vs-arch design.")
+    parser.add_argument("--make-corpus", metavar="SOURCE",
+                        help="Convert a directory or glob of architecture JSON files into a columnar corpus at --out.")
+    parser.add_argument("--corpus", metavar="DIR",
+                        help="Corpus directory (see --make-corpus); ECF of every architecture, per-arch results to --out (.csv or .npz).")
+    parser.add_argument("--serve", nargs="?", const="127.0.0.1:7733", metavar="ADDRESS",
+                        help="Run the estimation server on host:port or unix:/path (default 127.0.0.1:7733); see src/client.py.")
+    parser.add_argument("--unordered", action="store_true", default=False,
+                        help="Write --batch results as they complete instead of in input order.")
+    parser.add_argument("--out",
+                        help="Sweep output: CSV file, or directory of chunks for --out-format npz (default sweep_results.csv). "
+                             "Batch output file, '-' for stdout (default). Search output JSON file (optional).")
+    parser.add_argument("--out-format", choices=['csv', 'npz', 'jsonl'],
+                        help="Output format: csv (sweep default) or npz for --sweep, jsonl (batch default) or csv for --batch.")
+    parser.add_argument("--jobs", type=int,
+                        help="Number of worker processes for --sweep (default: CPU count), --batch, --search, --serve or --monte-carlo (default: 1).")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Design points per scheduled sweep chunk.")
+    parser.add_argument("--monte-carlo", type=int, metavar="N",
+                        help="Estimate confidence intervals with N Monte Carlo samples (ECF, or CF with --energy).")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed for --monte-carlo.")
+    parser.add_argument("--ci-trace",
+                        help="CI trace for --estimate OCF (gCO2/kWh per step; .csv, .npy or raw float64 binary).")
+    parser.add_argument("--workload-trace",
+                        help="Workload trace for --estimate OCF (inferences per step; .csv, .npy or raw float64 binary).")
+    parser.add_argument("--location",
+                        help="Baseline CI location from carbon_intensity/location.json for time-series OCF.")
+    parser.add_argument("--step-hours", type=float, default=1.0,
+                        help="Duration of one trace step in hours.")
+    parser.add_argument("--timings", action="store_true", default=False,
+                        help="Report per-stage timing (parse, data, chiplets, floorplan, packaging) for ECF/CF.")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="SQLite result cache for --estimate ECF/CF (reused across runs).")
+    parser.add_argument("--profile", action="store_true", default=False,
+                        help="Profile the run: time per function, file opens, JSON parses, chiplet evaluations per spec, peak allocations.")
+    parser.add_argument("--profile-out", metavar="PATH",
+                        help="Write the profile to PATH (implies --profile), as JSON or a Chrome trace (see --profile-format).")
+    parser.add_argument("--profile-format", choices=['json', 'chrome'], default="json",
+                        help="Format of --profile-out: json (default) or chrome (chrome://tracing, Perfetto).")
+    parser.add_argument("--gradients", action="store_true", default=False,
+                        help="Also report the partial derivatives of --estimate ECF/CF w.r.t. areas and scenario parameters.")
     args = parser.parse_args()
 
     if args.verbose:
-        print("[INFO] Verbose mode enabled.")
-    else:
-        print("[INFO] Verbose mode disabled.")
-
-    # Execute chosen estimation
-    if args.estimate == "ECF":
-        get_carbon_embodied(args.arch, verbose=args.verbose)
-    elif args.estimate == "OCF":
-        if args.energy is None:
-            raise ValueError("Energy per inference (--energy) must be provided for OCF calculation.")
-        get_carbon_operational(energy_per_inf=args.energy, verbose=args.verbose)
-    elif args.estimate == "CF":
-        if args.energy is None:
-            raise ValueError("Energy per inference (--energy) must be provided for CF calculation.")
-        get_carbon_footprint(args.arch, args.energy, verbose=args.verbose)
+        # stderr, so records streamed to stdout (e.g. --batch) stay parseable
+        print("[INFO] Verbose mode enabled.", file=sys.stderr)
+    set_reporter(ConsoleReporter(timings=args.timings))
+
+    profiler = profile() if args.profile or args.profile_out else contextlib.nullcontext()
+    with profiler:
+        # Execute chosen estimation
+        if args.sweep is not None:
+            out = args.out or "sweep_results.csv"
+            from src.sweep import run_sweep
+            stats = run_sweep(args.sweep, out, out_format=args.out_format or "csv", jobs=args.jobs,
+                              chunk_size=args.chunk_size, verbose=args.verbose)
+            print("--------------------------------------------------")
+            print(f"Sweep points                = {stats['points']}")
+            print(f"Elapsed                     : {stats['seconds']:.2f} s")
+            print(f"Throughput                  : {stats['points_per_sec']:.0f} points/s")
+            print(f"Results                     : {out}")
+        elif args.batch is not None:
+            get_carbon_batch(args.batch, out_path=args.out or "-", out_format=args.out_format or "jsonl",
+                             energy_per_inf=args.energy, jobs=args.jobs or 1, ordered=not args.unordered,
+                             verbose=args.verbose)
+        elif args.scenarios:
+            get_carbon_scenarios(args.arch, fab=args.fab_ci, op=args.op_ci, energy_per_inf=args.energy, out_path=args.out)
+        elif args.breakeven:
+            if args.energy is None or (args.vs_arch is not None and args.vs_energy is None):
+                raise ValueError("--breakeven needs --energy (and --vs-energy with --vs-arch).")
+            get_carbon_breakeven(args.arch, args.energy, reference=args.vs_arch, reference_energy=args.vs_energy,
+                                 ci_trace=args.ci_trace, workload_trace=args.workload_trace, location=args.location,
+                                 step_hours=args.step_hours, out_path=args.out)
+        elif args.make_corpus is not None:
+            if args.out is None:
+                raise ValueError("A corpus directory (--out) must be provided with --make-corpus.")
+            make_corpus(args.make_corpus, args.out)
+        elif args.corpus is not None:
+            get_carbon_corpus(args.corpus, out_path=args.out)
+        elif args.serve is not None:
+            serve(args.serve, workers=args.jobs or 1, verbose=args.verbose)
+        elif args.fleet is not None:
+            get_carbon_fleet(args.fleet)
+        elif args.search is not None:
+            get_carbon_pareto(args.search, jobs=args.jobs or 1, out_path=args.out, verbose=args.verbose)
+        elif args.monte_carlo is not None:
+            get_carbon_uncertainty(args.arch, energy_per_inf=args.energy, num_samples=args.monte_carlo,
+                                   seed=args.seed, jobs=args.jobs or 1, verbose=args.verbose)
+        elif args.estimate == "ECF":
+            cache = open_result_cache(args.cache) if args.cache else None
+            get_carbon_embodied(args.arch, verbose=args.verbose, cache=cache)
+            if cache is not None:
+                print(f"Result cache                : {cache.stats['hits']} hit(s), {cache.stats['misses']} miss(es) ({args.cache})")
+        elif args.estimate == "OCF" and args.dnn is not None:
+            if args.energy_table is None:
+                raise ValueError("An accelerator energy table (--energy-table) must be provided with --dnn.")
+            get_carbon_operational_zoo(args.dnn, args.energy_table, verbose=args.verbose)
+        elif args.estimate == "OCF":
+            if args.energy is None:
+                raise ValueError("Energy per inference (--energy) must be provided for OCF calculation.")
+            if args.ci_trace or args.workload_trace or args.location:
+                get_carbon_operational_trace(args.energy, ci_trace=args.ci_trace, workload_trace=args.workload_trace,
+                                             location=args.location, step_hours=args.step_hours, verbose=args.verbose)
+            else:
+                get_carbon_operational(energy_per_inf=args.energy, verbose=args.verbose)
+        elif args.estimate == "CF":
+            if args.energy is None:
+                raise ValueError("Energy per inference (--energy) must be provided for CF calculation.")
+            cache = open_result_cache(args.cache) if args.cache else None
+            get_carbon_footprint(args.arch, args.energy, verbose=args.verbose, cache=cache)
+            if cache is not None:
+                print(f"Result cache                : {cache.stats['hits']} hit(s), {cache.stats['misses']} miss(es) ({args.cache})")
+        if args.gradients and args.estimate in ("ECF", "CF") and args.sweep is None and args.batch is None \
+                and args.search is None and args.fleet is None and args.monte_carlo is None \
+                and args.make_corpus is None and args.corpus is None and not args.scenarios \
+                and not args.breakeven:
+            gradients = get_carbon_gradients(args.arch, energy_per_inf=args.energy or 0)
+            partials = gradients.d_cf if args.estimate == "CF" else gradients.d_ecf
+            print("--------------------------------------------------")
+            print(f"d{args.estimate} / d parameter")
+            for i, value in enumerate(partials["area"]):
+                print(f"{'area[' + str(i) + ']':15s}\t\t    : {value:.4g} gCO2/cm2")
+            for name, value in partials.items():
+                if name != "area":
+                    print(f"{name:15s}\t\t    : {value:.4g}")
+            for name, margin in gradients.margins.items():
+                print(f"{name.upper() + ' step margin':15s}\t\t    : {margin:.4g} {'cm2' if name == 'tsv' else 'mm'}")
+
+    if args.profile or args.profile_out:
+        # keep stdout clean for batch records written there
+        log = sys.stderr if args.batch is not None and (args.out or "-") == "-" else sys.stdout
+        print("--------------------------------------------------", file=log)
+        print(profiler.format_table(), file=log)
+        if args.profile_out:
+            if args.profile_format == "chrome":
+                profiler.write_chrome_trace(args.profile_out)
+            else:
+                profiler.write_json(args.profile_out)
+            print(f"Profile                     : {args.profile_out}", file=log)
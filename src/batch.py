@@ -0,0 +1,151 @@
+import numpy as np
+
+from chiplet_models.pic_logic_chiplet import PIC_CMOS_EQUIV_NODE, PIC_SENSITIVE_AREA
+from context import EvalContext
+from data_store import get_table, get_gpa_table, node_key
+from yields import EDGE_EXCLUSION, NB_CLUSTERING, get_die_ecf, get_node_defect_rates, get_yield
+
+
+# ------------------------ Batch ECF ----------------------------
+# Array version of CMOS_logic_chiplet / PIC_logic_chiplet.get_manufacturing_carbon.
+# Each row is one chiplet; the arithmetic follows the scalar models operation
+# by operation so that both paths produce bit-identical results.
+
+BATCH_CHIPLET_TYPES = ["cmos-logic", "pic-logic"]
+
+
+def _lookup_rows(table, values, table_name, to_key=str):
+    # one dict lookup per distinct value, then a gather over all rows
+    if values.size == 0:
+        return np.zeros(values.shape, dtype=np.float64)
+    uniq, inverse = np.unique(values, return_inverse=True)
+    uniq_values = np.empty(len(uniq), dtype=np.float64)
+    for i, value in enumerate(uniq.tolist()):
+        key = to_key(value)
+        if key not in table:
+            raise ValueError("Key '{}' not found in data table '{}'.".format(key, table_name))
+        uniq_values[i] = table[key]
+    return uniq_values[inverse.reshape(values.shape)]
+
+
+def _node_key(tech_node):
+    return node_key(int(tech_node))
+
+
+def _per_area_terms(chiplet_types, tech_nodes, actuation_types, ghg_abatement):
+    # energy (kWh/cm2), gas and materials (g/cm2) per row of broadcast arrays
+    is_cmos = chiplet_types == "cmos-logic"
+    is_pic = chiplet_types == "pic-logic"
+    if not np.all(is_cmos | is_pic):
+        unsupported = sorted(set(chiplet_types[~(is_cmos | is_pic)].tolist()))
+        raise ValueError("Chiplet types {} not supported in batch mode (use one of {}).".format(unsupported, BATCH_CHIPLET_TYPES))
+
+    epa = np.zeros(chiplet_types.shape, dtype=np.float64)
+    carbon_gas = np.zeros(chiplet_types.shape, dtype=np.float64)
+    carbon_materials = np.zeros(chiplet_types.shape, dtype=np.float64)
+
+    # Energy per unit area
+    cmos_nodes = tech_nodes[is_cmos]
+    epa[is_cmos] = _lookup_rows(get_table("cmos_epa"), cmos_nodes, "cmos_epa", _node_key)
+    epa[is_pic] = _lookup_rows(get_table("pic_epa"), actuation_types[is_pic], "pic_epa")
+
+    # Raw materials per unit area
+    materials_config = get_table("materials")
+    carbon_materials[is_cmos] = _lookup_rows(materials_config, cmos_nodes, "materials", _node_key)
+    carbon_materials[is_pic] = materials_config[node_key(PIC_CMOS_EQUIV_NODE)]
+
+    # Gasses per unit area
+    for abatement in np.unique(ghg_abatement).tolist():
+        gpa_config = get_gpa_table(abatement)
+        if gpa_config is None:
+            raise ValueError("Unsupported GHG abatement percentage value: {}".format(abatement))
+        rows = ghg_abatement == abatement
+        carbon_gas[rows & is_cmos] = _lookup_rows(gpa_config, tech_nodes[rows & is_cmos], "gpa", _node_key)
+        carbon_gas[rows & is_pic] = gpa_config[node_key(PIC_CMOS_EQUIV_NODE)]
+
+    return epa, carbon_gas, carbon_materials, is_pic
+
+
+def get_manufacturing_carbon_batch(chiplet_types, tech_nodes, areas, actuation_types="default",
+                                   ci_fab=820, ghg_abatement=95, defect_rate=EvalContext.defect_rate, exact=True,
+                                   yield_model="poisson", clustering=NB_CLUSTERING, wafer_diameter=np.nan,
+                                   edge_exclusion=EDGE_EXCLUSION):
+    """
+    Vectorized manufacturing carbon of logic chiplets.
+
+    All arguments broadcast against each other, so scalars can be mixed with
+    per-row arrays.
+
+    Parameters:
+        chiplet_types (array of str): "cmos-logic" or "pic-logic" per row.
+        tech_nodes (array of int): Technology node in nm (ignored for pic-logic).
+        areas (array of float): Chiplet area in cm2.
+        actuation_types (array of str): PIC actuation type (ignored for cmos-logic).
+        ci_fab (array of float): Fabrication carbon intensity (gCO2/kWh).
+        ghg_abatement (array of int): GHG abatement level, 95 or 99.
+        defect_rate (array of float or "node"): Defect density per cm2, or "node" for the
+            per-node table (65 nm for pic-logic).
+        exact (bool): Match the scalar models bit for bit (slower exp).
+        yield_model (array of str): Yield model per row (see yields.YIELD_MODELS).
+        clustering (array of float): Clustering parameter of the negative binomial yield.
+        wafer_diameter (array of float): Wafer diameter in mm to count edge loss (NaN: none).
+        edge_exclusion (array of float): Unusable ring at the wafer edge in mm.
+
+    Returns:
+        dict: "ecf" (g), "yield" and "carbon_per_area" (g/cm2) arrays, one value per row.
+    """
+    node_defect_rate = isinstance(defect_rate, str) and defect_rate == "node"
+    chiplet_types, tech_nodes, areas, actuation_types, ci_fab, ghg_abatement, defect_rate = np.broadcast_arrays(
+        np.asarray(chiplet_types, dtype=object), np.asarray(tech_nodes), np.asarray(areas, dtype=np.float64),
+        np.asarray(actuation_types, dtype=object), np.asarray(ci_fab, dtype=np.float64),
+        np.asarray(ghg_abatement), np.asarray(np.nan if node_defect_rate else defect_rate, dtype=np.float64))
+
+    epa, carbon_gas, carbon_materials, is_pic = _per_area_terms(chiplet_types, tech_nodes, actuation_types, ghg_abatement)
+    carbon_energy = ci_fab * epa
+    carbon_per_area = carbon_energy + carbon_gas + carbon_materials
+
+    if node_defect_rate:
+        defect_rate = get_node_defect_rates(np.where(is_pic, PIC_CMOS_EQUIV_NODE, tech_nodes))
+    fab_yield = get_yield(yield_model, areas, defect_rate, np.where(is_pic, PIC_SENSITIVE_AREA, 1.0), clustering, exact)
+    ecf = get_die_ecf(carbon_per_area, areas, fab_yield, wafer_diameter, edge_exclusion)
+
+    return {"ecf": ecf, "yield": fab_yield, "carbon_per_area": carbon_per_area}
+
+
+def get_manufacturing_carbon_gradient_batch(chiplet_types, tech_nodes, areas, actuation_types="default",
+                                            ci_fab=820, ghg_abatement=95, defect_rate=EvalContext.defect_rate, cpa_scaling=1.0):
+    """
+    Vectorized manufacturing carbon of logic chiplets and its partial derivatives.
+
+    With k = defect_rate (x0.2 for pic-logic) and cpa the carbon per area,
+    ecf = cpa * area * exp(k * area), so
+        d ecf / d area        = cpa * exp(k * area) * (1 + k * area)
+        d ecf / d ci_fab      = epa * cpa_scaling * area * exp(k * area)
+        d ecf / d defect_rate = ecf * area (x0.2 for pic-logic)
+
+    Parameters:
+        Same as get_manufacturing_carbon_batch(), plus
+        cpa_scaling (array of float): Carbon-per-area scaling factor (e.g. BEOL/FEOL
+            scaling of interposers), as Chiplet.set_cpa_scaling_factor().
+
+    Returns:
+        dict: "ecf" (g), "d_area" (g/cm2), "d_ci_fab" (g per gCO2/kWh) and
+        "d_defect_rate" (g cm2) arrays, one value per row.
+    """
+    chiplet_types, tech_nodes, areas, actuation_types, ci_fab, ghg_abatement, defect_rate, cpa_scaling = np.broadcast_arrays(
+        np.asarray(chiplet_types, dtype=object), np.asarray(tech_nodes), np.asarray(areas, dtype=np.float64),
+        np.asarray(actuation_types, dtype=object), np.asarray(ci_fab, dtype=np.float64),
+        np.asarray(ghg_abatement), np.asarray(defect_rate, dtype=np.float64), np.asarray(cpa_scaling, dtype=np.float64))
+
+    epa, carbon_gas, carbon_materials, is_pic = _per_area_terms(chiplet_types, tech_nodes, actuation_types, ghg_abatement)
+    carbon_per_area = (ci_fab * epa + carbon_gas + carbon_materials) * cpa_scaling
+
+    sensitive = np.where(is_pic, PIC_SENSITIVE_AREA, 1.0)
+    k = sensitive * defect_rate
+    inv_yield = np.exp(k * areas)
+    ecf = carbon_per_area * areas * inv_yield
+
+    return {"ecf": ecf,
+            "d_area": carbon_per_area * inv_yield * (1 + k * areas),
+            "d_ci_fab": epa * cpa_scaling * areas * inv_yield,
+            "d_defect_rate": ecf * areas * sensitive}
@@ -0,0 +1,235 @@
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import fields
+
+import numpy as np
+
+from context import EvalContext, check_context_overrides
+from evaluate import evaluate_arch, evaluate_operational, load_arch
+from streaming_stats import StreamingSummary
+
+
+# ------------------------ Batch jobs ----------------------------
+# A batch is a list of jobs, each one architecture evaluated under one
+# scenario. Jobs come from
+#   - a directory       (every *.json file in it, sorted by name),
+#   - a glob pattern    ("archs/*.json"),
+#   - a JSONL manifest  (one job object per line):
+#       {"id": "adept-coal", "arch": "archs/adept.json", "energy_per_inf": 1e-3, "ci_fab": 820, "ci_op": 11}
+# Manifest jobs may set any EvalContext field (ci_fab, ci_op, ghg_abatement,
+# lifetime_days, ...); unset fields come from the base context. Relative arch
+# paths are resolved against the current directory, then the manifest's. A job
+# with invalid context values is kept and reported as an error record.
+
+OUTPUT_FORMATS = ["jsonl", "csv"]
+CONTEXT_FIELDS = [f.name for f in fields(EvalContext)]
+BREAKDOWN_COLUMNS = ["cmos-logic", "pic-logic", "dram", "package"]
+CSV_COLUMNS = (["id", "arch", "energy_per_inf", "ci_fab", "ci_op", "ecf"] + ["ecf_" + c for c in BREAKDOWN_COLUMNS]
+               + ["ocf", "cf", "latency_ms", "error"])
+
+
+def _resolve_arch(arch, manifest_dir):
+    if os.path.isabs(arch) or os.path.exists(arch):
+        return arch
+    return os.path.join(manifest_dir, arch)
+
+
+def _read_manifest(manifest_file, energy_per_inf):
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_file))
+    jobs = []
+    with open(manifest_file, 'r') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line)
+            if "arch" not in entry:
+                raise ValueError("Batch manifest {} line {} has no 'arch'.".format(manifest_file, line_no))
+            unknown = set(entry) - set(CONTEXT_FIELDS) - {"id", "arch", "energy_per_inf", "energy"}
+            if unknown:
+                raise ValueError("Batch manifest {} line {} has unknown field(s): {}.".format(
+                    manifest_file, line_no, ", ".join(sorted(unknown))))
+
+            job = {"id": str(entry.get("id", len(jobs))),
+                   "energy_per_inf": entry.get("energy_per_inf", entry.get("energy", energy_per_inf)),
+                   "context": {k: v for k, v in entry.items() if k in CONTEXT_FIELDS}, "error": None}
+            try:
+                check_context_overrides(job["context"])
+            except ValueError as e:
+                job["error"] = "ValueError: {}".format(e)
+            arch = entry["arch"]
+            job["arch"] = _resolve_arch(arch, manifest_dir) if isinstance(arch, str) else arch
+            jobs.append(job)
+    return jobs
+
+
+def load_jobs(source, energy_per_inf=None):
+    """
+    Expand a directory, glob pattern or JSONL manifest into a list of jobs.
+
+    Parameters:
+        source (str): Directory of architecture files, glob pattern or .jsonl manifest.
+        energy_per_inf (float): Energy per inference (J) for jobs that do not set one.
+
+    Returns:
+        list: Job dicts with "id", "arch", "energy_per_inf", "context" (EvalContext overrides)
+        and "error" (why the job cannot be evaluated, or None).
+    """
+    if os.path.isfile(source) and source.endswith(".jsonl"):
+        return _read_manifest(source, energy_per_inf)
+    if os.path.isdir(source):
+        paths = sorted(glob.glob(os.path.join(source, "*.json")))
+    else:
+        paths = sorted(glob.glob(source))
+    if len(paths) == 0:
+        raise ValueError("No architecture files found for batch source '{}'.".format(source))
+    return [{"id": os.path.splitext(os.path.basename(p))[0], "arch": p, "energy_per_inf": energy_per_inf, "context": {},
+             "error": None} for p in paths]
+
+
+# ------------------------ Job evaluation ----------------------------
+
+def evaluate_job(job, base_context):
+    # returns one output record; errors are reported in the record, not raised
+    start = time.perf_counter()
+    energy_per_inf = job["energy_per_inf"]
+    record = {"id": job["id"], "arch": job["arch"] if isinstance(job["arch"], str) else None,
+              "energy_per_inf": energy_per_inf, "ci_fab": job["context"].get("ci_fab", base_context.ci_fab),
+              "ci_op": job["context"].get("ci_op", base_context.ci_op),
+              "ecf": None, "breakdown": None, "ocf": None, "cf": None, "error": job.get("error")}
+    if record["error"] is not None:
+        record["latency_ms"] = (time.perf_counter() - start) * 1000
+        return record
+    try:
+        context = base_context.replace(**job["context"])
+        result = evaluate_arch(load_arch(job["arch"]), context)
+        record["ecf"] = result.total
+        record["breakdown"] = result.breakdown
+        if energy_per_inf is not None:
+            record["ocf"] = evaluate_operational(energy_per_inf, context)
+            record["cf"] = record["ecf"] + record["ocf"]
+    except (Exception, SystemExit) as e:
+        record["error"] = "{}: {}".format(type(e).__name__, e)
+    record["latency_ms"] = (time.perf_counter() - start) * 1000
+    return record
+
+
+def _iter_records(jobs, base_context, workers, ordered):
+    if workers == 1:
+        for job in jobs:
+            yield evaluate_job(job, base_context)
+        return
+
+    # at most 4*workers jobs in flight
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for job in jobs:
+            pending.append(pool.submit(evaluate_job, job, base_context))
+            if len(pending) >= 4 * workers:
+                yield from _pop_done(pending, ordered)
+        while pending:
+            yield from _pop_done(pending, ordered)
+
+
+def _pop_done(pending, ordered):
+    # oldest result when ordered, otherwise every result that is ready
+    if ordered:
+        return [pending.popleft().result()]
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+    return [future.result() for future in done]
+
+
+# ------------------------ Output writers ----------------------------
+
+class JSONLRecordWriter:
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, record):
+        self.f.write(json.dumps(record) + "\n")
+        self.f.flush()
+
+
+class CSVRecordWriter:
+    def __init__(self, f):
+        self.f = f
+        self.writer = csv.writer(f)
+        self.writer.writerow(CSV_COLUMNS)
+
+    def write(self, record):
+        breakdown = record["breakdown"] or {}
+        row = dict(record, **{"ecf_" + c: breakdown.get(c) for c in BREAKDOWN_COLUMNS})
+        self.writer.writerow(["" if row[c] is None else row[c] for c in CSV_COLUMNS])
+        self.f.flush()
+
+
+def _make_writer(f, out_format):
+    if out_format == "jsonl":
+        return JSONLRecordWriter(f)
+    elif out_format == "csv":
+        return CSVRecordWriter(f)
+    raise ValueError("Unsupported batch output format '{}' (use one of {}).".format(out_format, OUTPUT_FORMATS))
+
+
+# ------------------------ Batch driver ----------------------------
+
+def run_batch(jobs, out_path="-", out_format="jsonl", workers=1, ordered=True, context=None, verbose=False):
+    """
+    Evaluate a batch of jobs in one process (or worker pool) and stream the results.
+
+    Parameters:
+        jobs (str or list): Batch source for load_jobs(), or a list of job dicts.
+        out_path (str): Output file ("-" for stdout).
+        out_format (str): "jsonl" or "csv".
+        workers (int): Number of worker processes (1 evaluates in-process).
+        ordered (bool): Write results in input order; otherwise as they complete.
+        context (EvalContext): Base scenario for all jobs.
+        verbose (bool): Print progress.
+
+    Returns:
+        dict: Number of jobs and errors, elapsed seconds, jobs per second and
+        per-job latency summary (ms).
+    """
+    log_key = "batch"
+    if isinstance(jobs, str):
+        jobs = load_jobs(jobs)
+    if len(jobs) == 0:
+        raise ValueError("Batch has no jobs.")
+    if context is None:
+        context = EvalContext()
+    workers = workers or os.cpu_count() or 1
+
+    if verbose:
+        print("INFO {} \t Evaluating {} job(s) on {} worker(s)...".format(log_key, len(jobs), workers), file=sys.stderr)
+
+    f = sys.stdout if out_path == "-" else open(out_path, 'w', newline='')
+    latency = StreamingSummary()
+    num_errors = 0
+    start = time.perf_counter()
+    try:
+        writer = _make_writer(f, out_format)
+        for record in _iter_records(jobs, context, workers, ordered):
+            writer.write(record)
+            latency.add(np.array([record["latency_ms"]]))
+            if record["error"] is not None:
+                num_errors += 1
+    finally:
+        if f is not sys.stdout:
+            f.close()
+    elapsed = time.perf_counter() - start
+
+    stats = {"jobs": len(jobs), "errors": num_errors, "seconds": elapsed,
+             "jobs_per_sec": len(jobs) / elapsed if elapsed > 0 else float("inf"),
+             "latency_ms": latency.to_dict(percentiles=(50, 95, 99))}
+    if verbose:
+        print("INFO {} \t {} job(s) in {:.2f} s ({} error(s))".format(log_key, len(jobs), elapsed, num_errors),
+              file=sys.stderr)
+    return stats
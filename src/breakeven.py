@@ -0,0 +1,263 @@
+import numpy as np
+
+from batch import get_manufacturing_carbon_batch
+from chiplet_models.pic_logic_chiplet import PIC_CMOS_EQUIV_NODE, PIC_SENSITIVE_AREA
+from context import EvalContext
+from results import BreakEvenResult
+from yields import NB_CLUSTERING, get_node_defect_rates, get_yield
+
+
+# ------------------------ Break-even solver ----------------------------
+# When does operational carbon overtake embodied carbon, and which energy per
+# inference (or die area) pays for extra embodied carbon? All solvers take
+# arrays of designs and broadcast their arguments.
+#
+# The OCF of a design after L days is E x K(L): E is the energy per inference
+# in kWh and K(L) is the cumulative (inferences x gCO2/kWh) of the deployment.
+#   - Constant CI and workload: K(L) = ci_op x num_inf_per_day x L, so every
+#     answer is closed form.
+#   - CI/workload traces (see operational_trace.py): K is shared by all
+#     designs, monotone and piecewise linear. It is integrated once over the
+#     horizon, and K^-1 is a searchsorted plus interpolation within the step.
+# Then
+#   crossover lifetime    K^-1(ECF / E)                       (OCF = ECF)
+#   break-even energy     E_a + (ECF_a - ECF_b) / K(L)        (CF_b = CF_a at lifetime L)
+#   payback time          K^-1(ECF_new / (E_old - E_new))     (upgrade saves its own ECF)
+# Times are inf where the OCF never catches up within the horizon.
+#
+# The break-even die area (largest die whose ECF fits a carbon budget) is not
+# linear: the yield falls with area. It is found by vectorized bisection on
+# ECF(area) = carbon_per_area x area / yield(area), which grows monotonically
+# for every yield model.
+
+J_PER_KWH = 1000 * 3600
+BISECT_ITERATIONS = 64
+
+
+class OperationalProfile:
+    """
+    Cumulative inferences x CI of a deployment, K(days), and its inverse.
+
+    Parameters:
+        context (EvalContext): ci_op and num_inf_per_day of the constant profile.
+        ci_op, num_inf_per_day (array of float): Override the context (broadcast per design).
+        ci_trace, workload_trace, location, step_hours: Time-varying deployment, as in
+            run_operational_trace(); the traces are integrated once up to max_days.
+        max_days (float): Horizon of trace profiles (default: 10 x context.lifetime_days).
+    """
+    def __init__(self, context=None, ci_op=None, num_inf_per_day=None, ci_trace=None, workload_trace=None,
+                 location=None, step_hours=1.0, max_days=None):
+        if context is None:
+            context = EvalContext()
+        self.rate = None
+        if ci_trace is None and workload_trace is None:
+            # constant deployment: K(L) = rate x L
+            ci = context.ci_op if ci_op is None else ci_op
+            if location is not None:
+                from operational_trace import get_baseline_ci
+                ci = get_baseline_ci(location, context)
+            self.rate = np.asarray(ci, dtype=np.float64) * np.asarray(
+                context.num_inf_per_day if num_inf_per_day is None else num_inf_per_day, dtype=np.float64)
+            return
+        from operational_trace import run_operational_trace
+        trace = run_operational_trace(J_PER_KWH, ci_trace=ci_trace, workload_trace=workload_trace, location=location,
+                                      context=context, num_inf_per_day=num_inf_per_day,
+                                      lifetime_days=max_days if max_days is not None else 10 * context.lifetime_days,
+                                      step_hours=step_hours, report_every_hours=step_hours)
+        self.days = np.concatenate([[0.0], trace.cumulative_days])
+        self.cumulative = np.concatenate([[0.0], trace.cumulative])
+
+    def factor(self, days):
+        # K(days)
+        days = np.asarray(days, dtype=np.float64)
+        if self.rate is not None:
+            return self.rate * days
+        return np.interp(days, self.days, self.cumulative, right=np.nan)
+
+    def inverse(self, values):
+        # first time (days) at which K reaches values; inf where it never does
+        values = np.asarray(values, dtype=np.float64)
+        if self.rate is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                days = values / self.rate
+            return np.where(values <= 0, 0.0, np.where(np.isnan(days), np.inf, days))
+        index = np.searchsorted(self.cumulative, values, side="left")
+        inside = (index > 0) & (index < len(self.cumulative))
+        i = np.where(inside, index, 1)
+        k0, k1 = self.cumulative[i - 1], self.cumulative[i]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fraction = np.where(k1 > k0, (values - k0) / (k1 - k0), 1.0)
+        days = self.days[i - 1] + fraction * (self.days[i] - self.days[i - 1])
+        return np.where(values <= 0, 0.0, np.where(inside, days, np.inf))
+
+
+def _profile(profile, context):
+    return profile if profile is not None else OperationalProfile(context)
+
+
+def get_crossover_lifetime(ecf, energy_per_inf, profile=None, context=None):
+    """
+    Days after which the OCF of each design equals its ECF.
+
+    Parameters:
+        ecf (array of float): Embodied carbon (g).
+        energy_per_inf (array of float): Energy per inference (J).
+        profile (OperationalProfile): Deployment (default: constant, from the context).
+        context (EvalContext): Scenario of the default profile.
+
+    Returns:
+        ndarray: Crossover lifetime in days (inf if the OCF never reaches the ECF).
+    """
+    energy_kWh = np.asarray(energy_per_inf, dtype=np.float64) / J_PER_KWH
+    with np.errstate(divide="ignore", invalid="ignore"):
+        target = np.asarray(ecf, dtype=np.float64) / energy_kWh
+    return _profile(profile, context).inverse(np.where(np.isnan(target), np.inf, target))
+
+
+def get_break_even_energy(ecf_a, energy_a, ecf_b, lifetime_days=None, profile=None, context=None):
+    """
+    Energy per inference at which design b has the same CF as design a over the lifetime.
+
+    Parameters:
+        ecf_a, energy_a (array of float): ECF (g) and energy per inference (J) of design a.
+        ecf_b (array of float): ECF (g) of design b.
+        lifetime_days (array of float): Lifetime (default: context.lifetime_days).
+        profile (OperationalProfile): Deployment (default: constant, from the context).
+
+    Returns:
+        ndarray: Energy per inference of b in J (b has a lower CF below it); NaN where b
+            cannot break even, even at zero energy.
+    """
+    if context is None:
+        context = EvalContext()
+    if lifetime_days is None:
+        lifetime_days = context.lifetime_days
+    factor = _profile(profile, context).factor(lifetime_days)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        energy_b = np.asarray(energy_a, dtype=np.float64) + (
+            np.asarray(ecf_a, dtype=np.float64) - np.asarray(ecf_b, dtype=np.float64)) / factor * J_PER_KWH
+    return np.where(energy_b >= 0, energy_b, np.nan)
+
+
+def get_payback_time(ecf_new, energy_old, energy_new, profile=None, context=None):
+    """
+    Days until replacing a deployed design saves the embodied carbon of its replacement.
+
+    The old design's ECF is already spent; the upgrade pays back once its OCF
+    savings reach its own ECF.
+
+    Parameters:
+        ecf_new (array of float): ECF of the new design (g).
+        energy_old, energy_new (array of float): Energy per inference (J) of both designs.
+        profile (OperationalProfile): Deployment (default: constant, from the context).
+
+    Returns:
+        ndarray: Payback time in days (inf if the upgrade saves no carbon).
+    """
+    savings_kWh = (np.asarray(energy_old, dtype=np.float64) - np.asarray(energy_new, dtype=np.float64)) / J_PER_KWH
+    with np.errstate(divide="ignore", invalid="ignore"):
+        target = np.where(savings_kWh > 0, np.asarray(ecf_new, dtype=np.float64) / savings_kWh, np.inf)
+    return _profile(profile, context).inverse(target)
+
+
+def bisect_increasing(f, targets, lo, hi, iterations=BISECT_ITERATIONS):
+    """
+    Vectorized bisection: the x in [lo, hi] with f(x) = targets for increasing f.
+
+    f maps an array of x to an array of values of the same shape; rows where
+    f(hi) < targets return hi.
+    """
+    targets = np.asarray(targets, dtype=np.float64)
+    lo, hi = np.broadcast_arrays(np.asarray(lo, dtype=np.float64), np.asarray(hi, dtype=np.float64))
+    lo, hi = lo * np.ones(targets.shape), hi * np.ones(targets.shape)
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        below = f(mid) < targets
+        lo, hi = np.where(below, mid, lo), np.where(below, hi, mid)
+        if np.all(hi - lo <= np.spacing(hi)):
+            break
+    return hi
+
+
+def get_break_even_area(ecf_budget, chiplet_types, tech_nodes, actuation_types="default", context=None,
+                        yield_model="poisson", defect_rate=None, clustering=NB_CLUSTERING):
+    """
+    Largest die area whose ECF fits a carbon budget, e.g. the ECF of a smaller die
+    plus the OCF its larger successor saves over the lifetime.
+
+    Parameters:
+        ecf_budget (array of float): ECF budget per die (g).
+        chiplet_types, tech_nodes, actuation_types: As get_manufacturing_carbon_batch().
+        context (EvalContext): ci_fab, ghg_abatement and defect_rate.
+        yield_model, defect_rate, clustering: Yield of the die (see yields.py); defect_rate
+            "node" uses the per-node table (default: context.defect_rate).
+
+    Returns:
+        ndarray: Die area in cm2.
+    """
+    if context is None:
+        context = EvalContext()
+    chiplet_types, tech_nodes, budget = np.broadcast_arrays(
+        np.asarray(chiplet_types, dtype=object), np.asarray(tech_nodes), np.asarray(ecf_budget, dtype=np.float64))
+    carbon_per_area = get_manufacturing_carbon_batch(chiplet_types, tech_nodes, 1.0, actuation_types, context.ci_fab,
+                                                     context.ghg_abatement, exact=False)["carbon_per_area"]
+    is_pic = chiplet_types == "pic-logic"
+    if defect_rate is None:
+        defect_rate = context.defect_rate
+    elif isinstance(defect_rate, str) and defect_rate == "node":
+        defect_rate = get_node_defect_rates(np.where(is_pic, PIC_CMOS_EQUIV_NODE, tech_nodes))
+    sensitive_area = np.where(is_pic, PIC_SENSITIVE_AREA, 1.0)
+
+    def ecf(areas):
+        return carbon_per_area * areas / get_yield(yield_model, areas, defect_rate, sensitive_area, clustering, exact=False)
+    # yield <= 1 bounds the area from above; the yield at that bound (the lowest one) from below
+    hi = np.maximum(budget, 0) / carbon_per_area
+    lo = hi * get_yield(yield_model, hi, defect_rate, sensitive_area, clustering, exact=False)
+    return bisect_increasing(ecf, budget, lo, hi)
+
+
+# ------------------------ Architectures ----------------------------
+
+def _per_design(values, num_designs, what):
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 0:
+        return np.full(num_designs, float(values))
+    if values.shape != (num_designs,):
+        raise ValueError("Expected one {} or {} (one per architecture), got {}.".format(what, num_designs, values.size))
+    return values
+
+
+def evaluate_breakeven(archs, energy_per_inf, reference=None, reference_energy=None, profile=None, context=None):
+    """
+    Crossover lifetime of each architecture and, against a reference (deployed) design,
+    break-even energy per inference and upgrade payback time.
+
+    Parameters:
+        archs: Architecture file, dict, list of them, directory or glob of JSON files,
+            or a corpus directory (see scenarios.py).
+        energy_per_inf (float or list): Energy per inference (J), one value or one per architecture.
+        reference: Architecture file or dict of the reference design (None: crossover only).
+        reference_energy (float): Energy per inference of the reference (J).
+        profile (OperationalProfile): Deployment (default: constant, from the context).
+        context (EvalContext): Scenario (ci_fab, lifetime_days, ...).
+
+    Returns:
+        BreakEvenResult: Per-architecture ECF, crossover, break-even energy and payback.
+    """
+    from scenarios import get_ecf
+    if context is None:
+        context = EvalContext()
+    if profile is None:
+        profile = OperationalProfile(context)
+    names, (ecf,) = get_ecf(archs, [context])
+    energy = _per_design(energy_per_inf, len(names), "energy per inference")
+    crossover = get_crossover_lifetime(ecf, energy, profile)
+    if reference is None:
+        return BreakEvenResult(names, ecf, energy, crossover)
+    if reference_energy is None:
+        raise ValueError("The energy per inference of the reference design must be provided.")
+    (reference_name,), (reference_ecf,) = get_ecf([reference], [context])
+    return BreakEvenResult(names, ecf, energy, crossover, reference=reference_name, reference_energy=reference_energy,
+                           break_even_energy=get_break_even_energy(reference_ecf[0], reference_energy, ecf,
+                                                                   context.lifetime_days, profile, context),
+                           payback_days=get_payback_time(ecf, reference_energy, energy, profile))
@@ -1,9 +1,14 @@
+from results import ChipletResult
+
+
 class Chiplet:
     def __init__(self, chiplet_type, tech_node, verbose = False):
       self.chiplet_type = chiplet_type
       self.tech_node = tech_node
       self.log_key = "chiplet"
       self.cpa_scaling_factor = 1
+      self.tier = 0     # tier of a 3D stack
+      self.yield_model = None   # yields.YieldModel; None: the model's own Poisson yield
       
       if self.tech_node != -1:
           self.str_val = f"Chiplet ({self.chiplet_type}, {self.tech_node}nm)"
@@ -21,6 +26,33 @@ class Chiplet:
     def set_cpa_scaling_factor (self, scaling_factor):
         self.cpa_scaling_factor = scaling_factor
     
+    def set_tier (self, tier):
+        self.tier = tier
+    
+    def set_yield_model (self, yield_model):
+        self.yield_model = yield_model
+    
+    def evaluate(self, context, verbose=False):
+        # Side-effect-free evaluation under an EvalContext, returning a ChipletResult.
+        # Chiplets that only implement get_manufacturing_carbon() fall back to it here.
+        ecf = self.get_manufacturing_carbon(context.ci_fab, ghg_abatement=context.ghg_abatement, verbose=verbose)
+        return ChipletResult(self.chiplet_type, ecf, getattr(self, "fab_yield", 1),
+                             carbon_per_area=getattr(self, "carbon_per_area", None), area=getattr(self, "area", None))
+    
     def get_manufacturing_carbon(self, ci_fab, ghg_abatement=95, verbose=False):
         # To be implemented by child node
         raise NotImplementedError("get_manufacturing_carbon must be inplemented in child class.")
+
+
+
+def group_chiplets(chiplets):
+    # [(chiplet, count)] for a flat chiplet list, grouping repeated references
+    # to the same object (as produced for num_chiplets > 1), in order of first appearance
+    groups = {}
+    for chiplet in chiplets:
+        key = id(chiplet)
+        if key in groups:
+            groups[key][1] += 1
+        else:
+            groups[key] = [chiplet, 1]
+    return [(chiplet, count) for chiplet, count in groups.values()]
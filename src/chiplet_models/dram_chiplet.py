@@ -1,13 +1,11 @@
-import json
 import sys
 import os
 import math 
 
-curr_file_path = os.path.realpath(__file__)
-curr_dir = os.path.dirname(curr_file_path)
-data_dir = curr_dir + "/../data/"
-
 from chiplet import Chiplet
+from context import EvalContext
+from data_store import get_table
+from results import ChipletResult
 
 
 class DRAM_chiplet(Chiplet):
@@ -22,24 +20,32 @@ class DRAM_chiplet(Chiplet):
     #     return math.exp (- self.area * defect_rate)
         
     
-    def get_manufacturing_carbon(self, ci_fab, ghg_abatement=95, verbose=False):
+    def evaluate(self, context, verbose=False):
+        # side-effect free; DRAM carbon does not depend on the context
         if verbose:
             print("\nINFO", self.log_key, "\t", "Calculating manufacturing carbon of", self, "...\n")
        
         
-        with open(data_dir + "dram/dram_hynix.json", 'r') as f:
-            dram_config = json.load(f)
+        dram_config = get_table("dram")
         
         assert self.dram_type in dram_config.keys() and "DRAM configuration not found"
         
-        self.fab_yield = 0.875
+        fab_yield = 0.875
         
-        self.carbon_per_gb = dram_config[self.dram_type] / self.fab_yield        
-        self.ecf = self.carbon_per_gb * self.size_gb / self.fab_yield
+        carbon_per_gb = dram_config[self.dram_type] / fab_yield        
+        ecf = carbon_per_gb * self.size_gb / fab_yield
         
         if verbose:
-            print("INFO {} \t Carbon/GB for {} is {:.2f}".format(self.log_key, self.dram_type, self.carbon_per_gb))
+            print("INFO {} \t Carbon/GB for {} is {:.2f}".format(self.log_key, self.dram_type, carbon_per_gb))
             print("INFO", self.log_key, "\t", "--------------------------------")
-            print("INFO", self.log_key, "\t", self, "manufacturing carbon:", round(self.ecf, 2), "g")
+            print("INFO", self.log_key, "\t", self, "manufacturing carbon:", round(ecf, 2), "g")
             print("INFO", self.log_key, "\t", "--------------------------------")         
+        return ChipletResult(self.chiplet_type, ecf, fab_yield, details={"carbon_per_gb": carbon_per_gb})
+
+
+    def get_manufacturing_carbon(self, ci_fab, ghg_abatement=95, verbose=False):
+        result = self.evaluate(EvalContext(ci_fab=ci_fab, ghg_abatement=ghg_abatement), verbose=verbose)
+        self.fab_yield = result.fab_yield
+        self.carbon_per_gb = result.details["carbon_per_gb"]
+        self.ecf = result.ecf
         return self.ecf
\ No newline at end of file
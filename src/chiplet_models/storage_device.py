@@ -0,0 +1,54 @@
+from chiplet import Chiplet
+from context import EvalContext
+from data_store import get_table
+from results import ChipletResult
+
+
+# SSD and HDD embodied carbon per GB (gCO2/GB), by device or NAND process,
+# from the vendor tables under src/data/ssd and src/data/hdd
+STORAGE_TABLES = {
+    "ssd": ["ssd_hynix", "ssd_seagate", "ssd_western"],
+    "hdd": ["hdd_consumer", "hdd_enterprise"],
+}
+
+
+def get_storage_models(device_type):
+    # {model: table} for "ssd" or "hdd"
+    return {model: name for name in STORAGE_TABLES[device_type] for model in get_table(name)}
+
+
+class Storage_device(Chiplet):
+    def __init__(self, chiplet_type, model, size_gb, verbose=False):
+        if chiplet_type not in STORAGE_TABLES:
+            raise ValueError("Unsupported storage type '{}' (use {}).".format(chiplet_type, ", ".join(STORAGE_TABLES)))
+        self.model = model
+        self.size_gb = size_gb
+        Chiplet.__init__(self, chiplet_type, -1, verbose=verbose)
+        self.str_val = f"Chiplet ({self.chiplet_type}, {self.model}, {self.size_gb}GB)"
+
+
+    def evaluate(self, context, verbose=False):
+        # side-effect free; per-GB device carbon does not depend on the context
+        if verbose:
+            print("\nINFO", self.log_key, "\t", "Calculating manufacturing carbon of", self, "...\n")
+
+        models = get_storage_models(self.chiplet_type)
+        if self.model not in models:
+            raise ValueError("Unknown {} model '{}' (use {}).".format(self.chiplet_type, self.model, ", ".join(sorted(models))))
+        carbon_per_gb = get_table(models[self.model])[self.model]
+        ecf = carbon_per_gb * self.size_gb
+
+        if verbose:
+            print("INFO {} \t Carbon/GB for {} is {:.2f}".format(self.log_key, self.model, carbon_per_gb))
+            print("INFO", self.log_key, "\t", "--------------------------------")
+            print("INFO", self.log_key, "\t", self, "manufacturing carbon:", round(ecf, 2), "g")
+            print("INFO", self.log_key, "\t", "--------------------------------")
+        return ChipletResult(self.chiplet_type, ecf, 1, details={"carbon_per_gb": carbon_per_gb})
+
+
+    def get_manufacturing_carbon(self, ci_fab, ghg_abatement=95, verbose=False):
+        result = self.evaluate(EvalContext(ci_fab=ci_fab, ghg_abatement=ghg_abatement), verbose=verbose)
+        self.fab_yield = result.fab_yield
+        self.carbon_per_gb = result.details["carbon_per_gb"]
+        self.ecf = result.ecf
+        return self.ecf
@@ -0,0 +1,122 @@
+import itertools
+import json
+import os
+import socket
+
+
+# ------------------------ Estimation server client ----------------------------
+# Client of the estimation server (server.py). The protocol is one JSON object
+# per line in each direction:
+#   request:  {"id": 7, "op": "embodied", "arch": "/abs/path.json" or {...}, "context": {"ci_fab": 41}}
+#   response: {"id": 7, "ok": true, "result": {...}}   or   {"id": 7, "ok": false, "error": "..."}
+# Responses carry the id of their request and may arrive out of order when
+# several requests are in flight (request_many()). Only the standard library
+# is used, so tools can import this module without NumPy.
+#
+# Addresses are "unix:/path/to/socket" or "host:port" (localhost).
+
+DEFAULT_ADDRESS = "127.0.0.1:7733"
+
+
+def parse_address(address):
+    # ("unix", path) or ("tcp", (host, port))
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError("Invalid server address '{}' (use host:port or unix:/path).".format(address))
+    return "tcp", (host, int(port))
+
+
+class EstimationError(RuntimeError):
+    # error reported by the server for one request
+    pass
+
+
+class EpicarbonClient:
+    """
+    Blocking client of a running estimation server (epicarbon.py --serve).
+
+    Parameters:
+        address (str): "host:port" or "unix:/path" of the server.
+        timeout (float): Socket timeout in seconds.
+    """
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=60):
+        kind, target = parse_address(address)
+        family = socket.AF_UNIX if kind == "unix" else socket.AF_INET
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(target)
+        self._file = self._socket.makefile("rwb")
+        self._ids = itertools.count()
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # ------------------------ Requests ----------------------------
+
+    def _prepare(self, request):
+        request = dict(request, id=next(self._ids))
+        arch = request.get("arch")
+        if isinstance(arch, str):
+            # the server may run in another directory
+            request["arch"] = os.path.abspath(arch)
+        return request
+
+    def request_many(self, requests):
+        """
+        Send requests without waiting for each response (the server batches them).
+
+        Returns:
+            list: Response dicts ({"ok", "result" or "error"}), in request order.
+        """
+        requests = [self._prepare(r) for r in requests]
+        for request in requests:
+            self._file.write(json.dumps(request).encode() + b"\n")
+        self._file.flush()
+        responses = {}
+        while len(responses) < len(requests):
+            line = self._file.readline()
+            if not line:
+                raise ConnectionError("Estimation server closed the connection.")
+            response = json.loads(line)
+            responses[response["id"]] = response
+        return [responses[r["id"]] for r in requests]
+
+    def request(self, op, **fields):
+        response = self.request_many([dict(fields, op=op)])[0]
+        if not response["ok"]:
+            raise EstimationError(response["error"])
+        return response["result"]
+
+    def embodied(self, arch, **context):
+        # {"ecf", "breakdown", "cached"} of an architecture file or dict
+        return self.request("embodied", arch=arch, context=context)
+
+    def footprint(self, arch, energy_per_inf, **context):
+        # {"ecf", "ocf", "cf", "breakdown", "cached"}
+        return self.request("footprint", arch=arch, energy_per_inf=energy_per_inf, context=context)
+
+    def operational(self, energy_per_inf, **context):
+        return self.request("operational", energy_per_inf=energy_per_inf, context=context)
+
+    def chiplets(self, chiplets, **context):
+        # ECF per chiplet of [{"type", "tech", "area", "actuation_type"}] (logic chiplets only)
+        return self.request("chiplets", chiplets=chiplets, context=context)["ecf"]
+
+    def metrics(self):
+        return self.request("metrics")
+
+    def ping(self):
+        return self.request("ping")
+
+    def shutdown(self):
+        return self.request("shutdown")
@@ -0,0 +1,49 @@
+import math
+from dataclasses import dataclass, fields, replace
+
+
+# ------------------------ Evaluation context ----------------------------
+# Immutable bundle of every scenario parameter a carbon evaluation depends on.
+# Models take a context explicitly instead of reading module globals, so
+# evaluations for different scenarios can run concurrently. Derive variants
+# with context.replace(ci_fab=...).
+
+GHG_ABATEMENT_LEVELS = (95, 99)     # % levels with a gas-per-area table (gpa_95, gpa_99)
+
+@dataclass(frozen=True)
+class EvalContext:
+    ci_fab: float = 820                 # gCO2/kWh, manufacturing (coal-based electricity)
+    ci_op: float = 11                   # gCO2/kWh, operation (wind-based electricity)
+    ghg_abatement: int = 95             # %, 95 or 99
+    defect_rate: float = 0.1            # per cm2, logic chiplets
+    interposer_defect_rate: float = 0.2/4   # per cm2, interposers
+    bonding_yield: float = 0.99
+    num_inf_per_day: float = 1e9
+    lifetime_days: float = 5*365
+
+    def __post_init__(self):
+        if self.ghg_abatement not in GHG_ABATEMENT_LEVELS:
+            raise ValueError("Unsupported GHG abatement percentage value: {} (use one of {}).".format(
+                self.ghg_abatement, GHG_ABATEMENT_LEVELS))
+
+    def replace(self, **changes):
+        return replace(self, **changes)
+
+
+def check_context_overrides(overrides):
+    """
+    Validate EvalContext overrides (field name -> value) read from a request or manifest.
+
+    Raises:
+        ValueError: For unknown fields, values that are not non-negative numbers
+        and unsupported GHG abatement levels.
+    """
+    if not isinstance(overrides, dict):
+        raise ValueError("Context overrides must be an object of EvalContext fields.")
+    unknown = set(overrides) - {f.name for f in fields(EvalContext)}
+    if unknown:
+        raise ValueError("Unknown context field(s): {}.".format(", ".join(sorted(unknown))))
+    for name, value in overrides.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+            raise ValueError("Context field '{}' must be a non-negative number (got {!r}).".format(name, value))
+    EvalContext(**overrides)
@@ -0,0 +1,337 @@
+import glob
+import json
+import math
+import os
+
+import numpy as np
+
+from batch import BATCH_CHIPLET_TYPES, PIC_SENSITIVE_AREA, get_manufacturing_carbon_batch
+from context import EvalContext
+from data_store import get_table, load_tables
+from evaluate import evaluate_arch, load_arch
+from floorplan import floorplan_interposer_groups
+from packager import DEFAULT_PACKAGING_CARBON, NUM_BEOL, RDL_LAYERS, ROUTER_AREA, Packager, get_tsv_overhead_ecf
+from results import CorpusResult
+from utils import get_chiplet_spec_key
+
+
+# ------------------------ Architecture corpus ----------------------------
+# Columnar storage for large sets of architectures (generated design
+# variants). A corpus is a directory of .npy columns plus meta.json:
+#
+#   meta.json        format/version, counts, string dictionaries, arch names
+#                    and chip types, "stack" of the archs that have one,
+#                    "yield" entries of chiplet rows (arch -> row position -> entry)
+#   offsets.npy      int64 [num_archs + 1]; chiplet rows of arch i are
+#                    offsets[i]:offsets[i+1]
+#   package.npy      uint8 [num_archs], code into dictionaries["package"]
+#   type.npy         uint8 [num_rows], code into dictionaries["type"]
+#   actuation.npy    uint8 [num_rows], code into dictionaries["actuation_type"]
+#   dram_type.npy    uint8 [num_rows], code into dictionaries["dram-type"]
+#   tech.npy         int16 [num_rows]
+#   area.npy         float64 [num_rows] (NaN for DRAM)
+#   size_gb.npy      float64 [num_rows] (NaN for logic)
+#   count.npy        int64 [num_rows], num_chiplets
+#   tier.npy         int16 [num_rows], 3D stack tier
+#
+# Rows are stored merged like parse_arch_groups() (one row per unique
+# chiplet spec of an arch, counts summed, empty groups dropped). Columns are
+# opened memory-mapped, so opening a corpus reads only meta.json and a
+# slice touches only the pages it needs.
+#
+# evaluate_corpus() computes the ECF breakdown of every architecture from the
+# columns without building Chiplet or Packager objects: one vectorized
+# get_manufacturing_carbon_batch() call over all logic rows, DRAM and
+# packaging terms as array expressions, and per-arch sums accumulated in the
+# order of evaluate_arch(). Only the interposer floorplan runs per arch
+# (memoized on the area multiset), and only for interposer and EMIB packages.
+# Archs with a multi-tier 3D stack, a "yield" model on a chiplet or chiplet
+# types the batch model does not cover are evaluated with evaluate_arch().
+
+FORMAT = "epicarbon-corpus"
+VERSION = 1
+ROW_COLUMNS = {"type": np.uint8, "actuation": np.uint8, "dram_type": np.uint8, "tech": np.int16,
+               "area": np.float64, "size_gb": np.float64, "count": np.int64, "tier": np.int16}
+ARCH_COLUMNS = {"offsets": np.int64, "package": np.uint8}
+DICTIONARIES = ["type", "package", "actuation_type", "dram-type"]
+DRAM_YIELD = 0.875      # as in DRAM_chiplet
+INTERPOSER_PACKAGES = ["2.5D-passive", "2.5D-active", "RDL"]
+
+
+def _iter_sources(source):
+    # architecture dicts or files from a directory, glob pattern, list or iterable
+    if isinstance(source, str):
+        pattern = os.path.join(source, "*.json") if os.path.isdir(source) else source
+        paths = sorted(glob.glob(pattern))
+        if not paths:
+            raise ValueError("No architecture files match '{}'.".format(pattern))
+        source = paths
+    for arch in source:
+        yield arch
+
+
+def write_corpus(source, out_dir):
+    """
+    Convert architectures (archs/*.json schema) into a columnar corpus.
+
+    Parameters:
+        source (str or iterable): Directory or glob of JSON files, or an iterable of
+            architecture dicts / file paths (e.g. straight from a generator).
+        out_dir (str): Corpus directory (created).
+
+    Returns:
+        int: Number of architectures written.
+    """
+    codes = {name: {} for name in DICTIONARIES}
+
+    def code(dictionary, value):
+        return codes[dictionary].setdefault(value, len(codes[dictionary]))
+
+    columns = {name: [] for name in list(ROW_COLUMNS) + list(ARCH_COLUMNS)}
+    columns["offsets"].append(0)
+    names, chip_types, stacks, yields = [], [], {}, {}
+    for i, arch in enumerate(_iter_sources(source)):
+        path = arch if isinstance(arch, str) else None
+        arch = load_arch(arch)
+        if "package" not in arch or "chiplets" not in arch:
+            raise ValueError("Architecture {} has no 'package' or 'chiplets'.".format(path or i))
+        names.append(arch.get("name", os.path.splitext(os.path.basename(path))[0] if path else str(i)))
+        chip_types.append(arch.get("type"))
+        columns["package"].append(code("package", arch["package"]))
+        if "stack" in arch:
+            stacks[str(i)] = arch["stack"]
+
+        groups = {}
+        for chiplet_info in arch["chiplets"]:
+            key = get_chiplet_spec_key(chiplet_info)
+            if key in groups:
+                groups[key][1] += chiplet_info.get("num_chiplets", 1)
+            else:
+                groups[key] = [chiplet_info, chiplet_info.get("num_chiplets", 1)]
+        for chiplet_info, count in groups.values():
+            if count <= 0:
+                continue
+            if "yield" in chiplet_info:
+                yields.setdefault(str(i), {})[str(len(columns["type"]) - columns["offsets"][-1])] = chiplet_info["yield"]
+            is_dram = chiplet_info["type"] == "dram"
+            columns["type"].append(code("type", chiplet_info["type"]))
+            columns["actuation"].append(code("actuation_type", chiplet_info.get("actuation_type", "default")))
+            columns["dram_type"].append(code("dram-type", chiplet_info.get("dram-type") if is_dram else None))
+            columns["tech"].append(chiplet_info.get("tech", -1))
+            columns["area"].append(math.nan if is_dram else chiplet_info["area"])
+            columns["size_gb"].append(chiplet_info["size-gb"] if is_dram else math.nan)
+            columns["count"].append(count)
+            columns["tier"].append(chiplet_info.get("tier", 0))
+        columns["offsets"].append(len(columns["type"]))
+
+    for dictionary in codes.values():
+        if len(dictionary) > 256:
+            raise ValueError("Too many distinct values for a uint8 dictionary column.")
+    os.makedirs(out_dir, exist_ok=True)
+    for name, dtype in {**ROW_COLUMNS, **ARCH_COLUMNS}.items():
+        np.save(os.path.join(out_dir, name + ".npy"), np.asarray(columns[name], dtype=dtype))
+    meta = {"format": FORMAT, "version": VERSION, "num_archs": len(names), "num_rows": len(columns["type"]),
+            "dictionaries": {name: list(values) for name, values in codes.items()},
+            "names": names, "chip_types": chip_types, "stacks": stacks, "yields": yields}
+    with open(os.path.join(out_dir, "meta.json"), 'w') as json_file:
+        json.dump(meta, json_file)
+    return len(names)
+
+
+class ArchCorpus:
+    """
+    Memory-mapped, read-only view of a corpus written by write_corpus().
+
+    Columns are attributes (corpus.area, corpus.offsets, ...); corpus[i] is the
+    architecture dict of arch i.
+    """
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), 'r') as json_file:
+            meta = json.load(json_file)
+        if meta.get("format") != FORMAT or meta.get("version") != VERSION:
+            raise ValueError("{} is not an architecture corpus (version {}).".format(path, VERSION))
+        self.path = path
+        self.meta = meta
+        self.names = meta["names"]
+        self.dictionaries = meta["dictionaries"]
+        for name in list(ROW_COLUMNS) + list(ARCH_COLUMNS):
+            setattr(self, name, np.load(os.path.join(path, name + ".npy"), mmap_mode="r"))
+
+    def __len__(self):
+        return self.meta["num_archs"]
+
+    def __getitem__(self, i):
+        # architecture dict (archs/*.json schema, merged chiplet entries)
+        types, actuations = self.dictionaries["type"], self.dictionaries["actuation_type"]
+        chiplets = []
+        yields = self.meta["yields"].get(str(i), {})
+        for r in range(self.offsets[i], self.offsets[i + 1]):
+            entry = {"type": types[self.type[r]], "tech": int(self.tech[r]), "num_chiplets": int(self.count[r])}
+            if entry["type"] == "dram":
+                entry.update({"dram-type": self.dictionaries["dram-type"][self.dram_type[r]],
+                              "size-gb": float(self.size_gb[r])})
+            else:
+                entry["area"] = float(self.area[r])
+                if entry["type"] == "pic-logic":
+                    entry["actuation_type"] = actuations[self.actuation[r]]
+            if self.tier[r]:
+                entry["tier"] = int(self.tier[r])
+            if str(r - self.offsets[i]) in yields:
+                entry["yield"] = yields[str(r - self.offsets[i])]
+            chiplets.append(entry)
+        arch = {"name": self.names[i], "type": self.meta["chip_types"][i],
+                "package": self.dictionaries["package"][self.package[i]], "chiplets": chiplets}
+        if str(i) in self.meta["stacks"]:
+            arch["stack"] = self.meta["stacks"][str(i)]
+        return arch
+
+
+def open_corpus(path):
+    return ArchCorpus(path)
+
+
+def _lookup(values, dictionary):
+    return np.asarray(dictionary, dtype=object)[values] if len(dictionary) else np.zeros(len(values), dtype=object)
+
+
+def _segment_sums(values, arch_of_row, position, num_archs):
+    # per-arch sums of row values, added in row order (as the scalar loop of evaluate_arch does)
+    sums = np.zeros(num_archs)
+    order = np.argsort(position, kind="stable")
+    bounds = np.searchsorted(position[order], np.arange(position.max() + 2 if len(position) else 1))
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        rows = order[start:end]     # at most one row per arch
+        sums[arch_of_row[rows]] += values[rows]
+    return sums
+
+
+def evaluate_corpus(corpus, context=None, exact=True):
+    """
+    ECF breakdown of every architecture of a corpus, computed on the columns.
+
+    Parameters:
+        corpus (str or ArchCorpus): Corpus directory or opened corpus.
+        context (EvalContext): Scenario (default: EvalContext()).
+        exact (bool): Match evaluate_arch() in the last bit where possible (slower exp).
+
+    Returns:
+        CorpusResult: Total ECF, ECF per chiplet type and package, interposer area
+            and EMIB interfaces per arch.
+    """
+    if context is None:
+        context = EvalContext()
+    if isinstance(corpus, str):
+        corpus = open_corpus(corpus)
+    load_tables()
+    num_archs = len(corpus)
+    offsets = np.asarray(corpus.offsets)
+    num_rows = int(offsets[-1])
+    arch_of_row = np.repeat(np.arange(num_archs), np.diff(offsets))
+    position = np.arange(num_rows) - offsets[arch_of_row]
+    type_names = _lookup(np.asarray(corpus.type), corpus.dictionaries["type"])
+    packages = _lookup(np.asarray(corpus.package), corpus.dictionaries["package"])
+    counts = np.asarray(corpus.count, dtype=np.float64)
+    areas = np.asarray(corpus.area)
+
+    # archs the column model does not cover
+    is_logic = np.isin(type_names, BATCH_CHIPLET_TYPES)
+    is_dram = type_names == "dram"
+    unsupported = np.zeros(num_archs, dtype=bool)
+    unsupported[arch_of_row[~(is_logic | is_dram)]] = True
+    unsupported[arch_of_row[np.asarray(corpus.tier) != 0]] = True
+    unsupported[[int(i) for i in list(corpus.meta["stacks"]) + list(corpus.meta["yields"])]] = True
+
+    # chiplet ECF per row
+    row_ecf = np.zeros(num_rows)
+    logic = np.flatnonzero(is_logic)
+    batch = get_manufacturing_carbon_batch(type_names[logic], np.asarray(corpus.tech)[logic], areas[logic],
+                                           _lookup(np.asarray(corpus.actuation)[logic], corpus.dictionaries["actuation_type"]),
+                                           ci_fab=context.ci_fab, ghg_abatement=context.ghg_abatement,
+                                           defect_rate=context.defect_rate, exact=exact)
+    row_ecf[logic] = batch["ecf"]
+    dram = np.flatnonzero(is_dram)
+    if len(dram):
+        dram_table = get_table("dram")
+        dram_types = _lookup(np.asarray(corpus.dram_type)[dram], corpus.dictionaries["dram-type"])
+        per_gb = np.array([dram_table[t] for t in dram_types.tolist()]) / DRAM_YIELD
+        row_ecf[dram] = per_gb * np.asarray(corpus.size_gb)[dram] / DRAM_YIELD
+
+    breakdown = {}
+    for type_name in np.unique(type_names[is_logic | is_dram]).tolist():
+        mask = type_names == type_name
+        breakdown[type_name] = _segment_sums(np.where(mask, row_ecf * counts, 0.0), arch_of_row, position, num_archs)
+
+    # packaging
+    logic_counts = np.where(is_logic, counts, 0.0)
+    num_chiplets = np.bincount(arch_of_row, weights=logic_counts, minlength=num_archs).astype(np.int64)
+    bonding_yield = context.bonding_yield
+    package_carbon = np.full(num_archs, float(DEFAULT_PACKAGING_CARBON))
+    package_carbon[packages == "monolithic"] = 0.0
+
+    is_3d = packages == "3D"
+    if np.any(is_3d):
+        rows = logic[is_3d[arch_of_row[logic]]]
+        overhead = np.zeros(num_rows)
+        overhead[rows] = counts[rows] * get_tsv_overhead_ecf(
+            batch["carbon_per_area"][is_3d[arch_of_row[logic]]], areas[rows], context.defect_rate,
+            np.where(type_names[rows] == "pic-logic", PIC_SENSITIVE_AREA, 1.0), exact=exact)
+        stack = _segment_sums(overhead, arch_of_row, position, num_archs)
+        package_carbon[is_3d] = stack[is_3d] / bonding_yield ** num_chiplets[is_3d]
+
+    interposer_area = np.zeros(num_archs)
+    num_if = np.zeros(num_archs, dtype=np.int64)
+    uses_floorplan = np.isin(packages, INTERPOSER_PACKAGES + ["EMIB"]) & ~unsupported
+    row_areas, row_counts = areas.tolist(), np.asarray(corpus.count).tolist()
+    for i in np.flatnonzero(uses_floorplan).tolist():
+        groups = [(row_areas[r] * 100, row_counts[r]) for r in range(offsets[i], offsets[i + 1]) if is_logic[r]]
+        floorplan = floorplan_interposer_groups(groups)
+        interposer_area[i], num_if[i] = floorplan.area_cm2, floorplan.num_if
+
+    is_interposer = np.isin(packages, INTERPOSER_PACKAGES)
+    if np.any(is_interposer):
+        # interposer ECF: carbon per area of the interposer node (scaled BEOL) / Poisson yield
+        packager = Packager("2.5D-passive")
+        interposer_cpa = packager.get_interposer_carbon(1.0, context.replace(interposer_defect_rate=0))
+        a = interposer_area[is_interposer]
+        exp_terms = np.fromiter(map(math.exp, (-a * context.interposer_defect_rate).tolist()), dtype=np.float64, count=len(a)) \
+            if exact else np.exp(-a * context.interposer_defect_rate)
+        interposer_carbon = interposer_cpa * a / exp_terms
+        carbon = np.where(packages[is_interposer] == "RDL", interposer_carbon * RDL_LAYERS / NUM_BEOL, interposer_carbon)
+        active = packages[is_interposer] == "2.5D-active"
+        router_carbon = interposer_carbon * (ROUTER_AREA * num_chiplets[is_interposer]) / np.where(a > 0, a, 1.0)
+        carbon = np.where(active, interposer_carbon - router_carbon, carbon)
+        package_carbon[is_interposer] = carbon / bonding_yield
+
+    is_emib = packages == "EMIB"
+    if np.any(is_emib):
+        emib_carbon = Packager("EMIB").get_emib_carbon(context)
+        package_carbon[is_emib] = emib_carbon * num_if[is_emib] / bonding_yield
+
+    # total in the key order of evaluate_arch(): chiplet types by first appearance, then package
+    total = np.zeros(num_archs)
+    type_list = list(breakdown)
+    if type_list:
+        first = np.full((num_archs, len(type_list)), np.iinfo(np.int64).max)
+        for j, type_name in enumerate(type_list):
+            rows = np.flatnonzero(type_names == type_name)
+            np.minimum.at(first[:, j], arch_of_row[rows], position[rows])
+        values = np.stack([breakdown[type_name] for type_name in type_list], axis=1)
+        ranked = np.argsort(first, axis=1, kind="stable")
+        archs = np.arange(num_archs)
+        for j in ranked.T:
+            total += np.where(first[archs, j] != np.iinfo(np.int64).max, values[archs, j], 0.0)
+    total += package_carbon
+
+    # the rest through the object model
+    for i in np.flatnonzero(unsupported).tolist():
+        result = evaluate_arch(corpus[i], context)
+        total[i] = result.total
+        for type_name, value in result.breakdown.items():
+            if type_name == "package":
+                package_carbon[i] = value
+            else:
+                breakdown.setdefault(type_name, np.zeros(num_archs))[i] = value
+        interposer_area[i], num_if[i] = result.packaging.interposer_area, result.packaging.num_if
+
+    breakdown["package"] = package_carbon
+    return CorpusResult(list(corpus.names), total, breakdown, interposer_area, num_if, int(unsupported.sum()))
@@ -0,0 +1,177 @@
+import csv
+import hashlib
+import json
+import os
+import threading
+
+curr_file_path = os.path.realpath(__file__)
+curr_dir = os.path.dirname(curr_file_path)
+data_dir = curr_dir + "/data/"
+
+
+# ------------------------ Coefficient tables ----------------------------
+# Every table shipped under src/data/ is parsed once per process and kept in
+# memory. Chiplet models and the packager look values up here instead of
+# opening the JSON files on each get_manufacturing_carbon() call.
+
+TABLE_FILES = {
+    "cmos_epa"          : "cmos_logic/epa.json",
+    "gpa_95"            : "cmos_logic/gpa_95.json",
+    "gpa_99"            : "cmos_logic/gpa_99.json",
+    "materials"         : "cmos_logic/materials.json",
+    "beol_feol_scaling" : "cmos_logic/beol_feol_scaling.json",
+    "defect_density"    : "cmos_logic/defect_density.json",
+    "pic_epa"           : "pic_logic/epa.json",
+    "dram"              : "dram/dram_hynix.json",
+    "ssd_hynix"         : "ssd/ssd_hynix.json",
+    "ssd_seagate"       : "ssd/ssd_seagate.json",
+    "ssd_western"       : "ssd/ssd_western.json",
+    "hdd_consumer"      : "hdd/hdd_consumer.json",
+    "hdd_enterprise"    : "hdd/hdd_enterprise.json",
+    "ci_location"       : "carbon_intensity/location.json",
+    "ci_source"         : "carbon_intensity/source.json",
+}
+
+# per-step process energy of the photonic flow (source of the PIC EPA values)
+PROCESS_ENERGY_FILE = "pic_logic/epa-data-pic.csv"
+
+# tables that must cover the same process nodes
+NODE_TABLES = ["cmos_epa", "gpa_95", "gpa_99", "materials", "defect_density"]
+
+_tables = None
+_lock = threading.Lock()
+_data_hash = None       # (file signature, sha256 of src/data/)
+
+
+def _load_table(name):
+    with open(data_dir + TABLE_FILES[name], 'r') as f:
+        table = json.load(f)
+
+    if not isinstance(table, dict) or len(table) == 0:
+        raise ValueError("Data table '{}' ({}) is empty or not a JSON object.".format(name, TABLE_FILES[name]))
+    for key, value in table.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError("Data table '{}' has invalid value {!r} for key '{}'.".format(name, value, key))
+    return table
+
+
+def _parse_number(value):
+    value = value.strip()
+    return float(value) if value else None
+
+
+def _load_process_energy_table():
+    # list of {"process", "details", "min", "max", "avg"} energy/wafer (kWh/wafer);
+    # min and max are None where the source does not report a range
+    with open(data_dir + PROCESS_ENERGY_FILE, 'r', newline='') as f:
+        rows = list(csv.reader(f))
+
+    steps = []
+    for row in rows[2:]:  # two header rows
+        if not row[0].strip():
+            continue  # totals and notes at the bottom
+        step = {"process": row[0].strip(), "details": row[1].strip(),
+                "min": _parse_number(row[8]), "max": _parse_number(row[9]), "avg": _parse_number(row[10])}
+        if step["avg"] is None or step["avg"] < 0:
+            raise ValueError("Process step '{}' in {} has no valid average energy/wafer.".format(step["process"], PROCESS_ENERGY_FILE))
+        if (step["min"] is not None and step["min"] > step["avg"]) or (step["max"] is not None and step["max"] < step["avg"]):
+            raise ValueError("Process step '{}' in {} has an invalid min/max range.".format(step["process"], PROCESS_ENERGY_FILE))
+        steps.append(step)
+    return steps
+
+
+def _validate(tables):
+    nodes = set(tables[NODE_TABLES[0]].keys())
+    for name in NODE_TABLES[1:]:
+        if set(tables[name].keys()) != nodes:
+            raise ValueError("Data table '{}' does not cover the same process nodes as '{}'.".format(name, NODE_TABLES[0]))
+    for key in tables["beol_feol_scaling"]:
+        if key not in nodes:
+            raise ValueError("BEOL/FEOL scaling given for unknown process node '{}'.".format(key))
+
+
+def load_tables():
+    """Parse and validate all data tables, returning the process-wide store."""
+    global _tables
+    tables = _tables
+    if tables is None:
+        with _lock:
+            if _tables is None:
+                loaded = {name: _load_table(name) for name in TABLE_FILES}
+                loaded["pic_process_energy"] = _load_process_energy_table()
+                _validate(loaded)
+                _tables = loaded
+            tables = _tables
+    return tables
+
+
+def invalidate_tables():
+    """Drop the in-memory tables; they are re-read on the next lookup."""
+    global _tables
+    with _lock:
+        _tables = None
+
+
+def reload_tables():
+    """Re-read all data tables from disk (call after editing files in src/data/)."""
+    invalidate_tables()
+    return load_tables()
+
+
+# ------------------------ Data fingerprint ----------------------------
+
+def _data_signature():
+    # (relative path, mtime, size) of every file under src/data/
+    signature = []
+    for root, dirs, files in os.walk(data_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            st = os.stat(path)
+            signature.append((os.path.relpath(path, data_dir), st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def data_tables_hash():
+    """
+    SHA-256 of the contents of every file under src/data/.
+
+    The files are only re-hashed when their mtime/size signature changes. A
+    change also invalidates the in-memory tables, so results computed after
+    an edit always use (and are keyed by) the new data.
+    """
+    global _data_hash
+    signature = _data_signature()
+    cached = _data_hash
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    for rel_path, _, _ in signature:
+        digest.update(rel_path.encode())
+        with open(os.path.join(data_dir, rel_path), 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    data_hash = digest.hexdigest()
+    if cached is not None and cached[1] != data_hash:
+        invalidate_tables()
+    _data_hash = (signature, data_hash)
+    return data_hash
+
+
+# ------------------------ Lookups ----------------------------
+
+def node_key(tech_node):
+    return str(tech_node) + "nm"
+
+
+def get_table(name):
+    return load_tables()[name]
+
+
+def get_gpa_table(ghg_abatement):
+    # None for unsupported abatement levels; callers report the error
+    if ghg_abatement == 95:
+        return get_table("gpa_95")
+    elif ghg_abatement == 99:
+        return get_table("gpa_99")
+    return None
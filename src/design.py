@@ -0,0 +1,177 @@
+import copy
+
+from context import EvalContext
+from evaluate import load_arch
+from floorplan import floorplan_interposer_groups
+from packager import Packager, get_logic_groups
+from results import ChipletGroupResult, EmbodiedResult, PackagingResult
+from utils import build_chiplet, get_chiplet_spec_key
+
+
+# ------------------------ Incremental evaluation ----------------------------
+# A Design is a mutable handle on one architecture. Its ECF is evaluated as a
+# graph of cached nodes:
+#
+#   chiplet spec --> chiplet ECF (2D; 3D TSV overhead in closed form) -+
+#   logic (area, count) multiset --> floorplan --> interposer ECF ------+--> package --> breakdown
+#   context --> EMIB ECF ----------------------------------------------+
+#
+# Each node remembers the inputs it was computed from. An edit only changes
+# inputs, and the next evaluate() recomputes exactly the nodes whose inputs
+# changed: editing one chiplet entry evaluates only that chiplet spec (if it
+# was not seen before), the floorplan/interposer only if the logic areas or
+# counts changed, and the package total. Floorplans of successive edits share
+# their unchanged sub-problems. Results are identical to evaluate_arch() on
+# the edited architecture.
+
+EDITABLE_FIELDS = ["area", "tech", "actuation_type", "num_chiplets", "dram-type", "size-gb", "type", "tier", "yield"]
+MAX_CACHED_SPECS = 4096     # chiplet specs kept across edits (cheap undo of recent edits)
+MAX_FLOORPLAN_MEMO = 1 << 16    # floorplan sub-problems shared across edits
+
+
+class Design:
+    """
+    Mutable architecture handle with incremental ECF evaluation.
+
+    Parameters:
+        arch (str or dict): Architecture JSON file or dict (copied).
+        context (EvalContext): Scenario (default: EvalContext()).
+    """
+    def __init__(self, arch, context=None):
+        self.arch = copy.deepcopy(load_arch(arch))
+        self.context = context if context is not None else EvalContext()
+        self.packager = Packager(self.arch["package"], stack=self.arch.get("stack"))
+        self.stats = {"chiplets": 0, "floorplan": 0, "interposer": 0, "emib": 0, "package": 0}
+
+        self._entry_keys = [get_chiplet_spec_key(c) for c in self.arch["chiplets"]]
+        self._chiplets = {}         # spec key -> Chiplet (built once per spec)
+        self._chiplet_ecf = {}      # spec key -> ChipletResult
+        self._group_results = {}    # (spec key, count) -> ChipletGroupResult
+        self._floorplan = (None, None)      # (logic areas/counts, Floorplan)
+        self._floorplan_memo = {}           # sub-problems of recent floorplans
+        self._interposer = (None, None)     # (interposer area, ECF)
+        self._emib = None
+        self._result = None
+
+    # ------------------------ Edits ----------------------------
+
+    def set_chiplet(self, index, **fields):
+        # e.g. design.set_chiplet(0, area=4.2, tech=7); "dram-type"/"size-gb" via **{"size-gb": 16}
+        unknown = set(fields) - set(EDITABLE_FIELDS)
+        if unknown:
+            raise ValueError("Unknown chiplet field(s) {} (use {}).".format(", ".join(sorted(unknown)), ", ".join(EDITABLE_FIELDS)))
+        if not 0 <= index < len(self.arch["chiplets"]):
+            raise ValueError("Chiplet entry {} is not in the architecture.".format(index))
+        self.arch["chiplets"][index].update(fields)
+        self._entry_keys[index] = get_chiplet_spec_key(self.arch["chiplets"][index])
+        self._result = None
+
+    def set_package(self, package_type):
+        self.arch["package"] = package_type
+        self.packager = Packager(package_type, stack=self.arch.get("stack"))
+        self._result = None
+
+    def set_context(self, context=None, **changes):
+        # new scenario: every model node depends on it, only the floorplan survives
+        self.context = (context if context is not None else self.context).replace(**changes)
+        self._chiplet_ecf.clear()
+        self._group_results.clear()
+        self._interposer = (None, None)
+        self._emib = None
+        self._result = None
+
+    # ------------------------ Evaluation ----------------------------
+
+    def get_groups(self):
+        # [(spec key, chiplet, count)], merged like parse_arch_groups()
+        if len(self._chiplets) > MAX_CACHED_SPECS:
+            self._chiplets.clear()
+            self._chiplet_ecf.clear()
+            self._group_results.clear()
+        groups = {}
+        for key, chiplet_info in zip(self._entry_keys, self.arch["chiplets"]):
+            count = chiplet_info.get("num_chiplets", 1)
+            if key in groups:
+                groups[key][1] += count
+            else:
+                if key not in self._chiplets:
+                    self._chiplets[key] = build_chiplet(chiplet_info)
+                groups[key] = [self._chiplets[key], count]
+        return [(key, chiplet, count) for key, (chiplet, count) in groups.items() if count > 0]
+
+    def _chiplet_result(self, key, chiplet):
+        if key not in self._chiplet_ecf:
+            self._chiplet_ecf[key] = chiplet.evaluate(self.context)
+            self.stats["chiplets"] += 1
+        return self._chiplet_ecf[key]
+
+    def _get_floorplan(self, logic_groups):
+        # the floorplan only depends on the multiset of logic areas
+        counts = {}
+        for c, count in logic_groups:
+            counts[c.area*100] = counts.get(c.area*100, 0) + count
+        area_counts = sorted(counts.items())
+        if self._floorplan[0] != area_counts:
+            if len(self._floorplan_memo) > MAX_FLOORPLAN_MEMO:
+                self._floorplan_memo.clear()
+            self._floorplan = (area_counts, floorplan_interposer_groups(area_counts, memo=self._floorplan_memo))
+            self.stats["floorplan"] += 1
+        return self._floorplan[1]
+
+    def _get_interposer_carbon(self, interposer_area):
+        if self._interposer[0] != interposer_area:
+            self._interposer = (interposer_area, self.packager.get_interposer_carbon(interposer_area, self.context))
+            self.stats["interposer"] += 1
+        return self._interposer[1]
+
+    def _get_emib_carbon(self):
+        if self._emib is None:
+            self._emib = self.packager.get_emib_carbon(self.context)
+            self.stats["emib"] += 1
+        return self._emib
+
+    def _packaging(self, groups):
+        self.stats["package"] += 1
+        if self.packager.package_type == "monolithic":
+            return PackagingResult(self.packager.package_type, 0)
+
+        keys = {id(chiplet): key for key, chiplet, _ in groups}
+        logic_groups = get_logic_groups([(chiplet, count) for _, chiplet, count in groups])
+        counts = [count for _, count in logic_groups]
+        floorplan = self._get_floorplan(logic_groups)
+        interposer_carbon = self._get_interposer_carbon(floorplan.area_cm2)
+
+        stack_carbon, emib_carbon = None, None
+        if self.packager.package_type == "3D":
+            results = [self._chiplet_result(keys[id(c)], c) for c, _ in logic_groups]
+            stack_carbon = self.packager.get_stack_carbon(logic_groups, results, self.context)
+        elif self.packager.package_type == "EMIB":
+            emib_carbon = self._get_emib_carbon()
+
+        carbon = self.packager.combine(self.context, counts, floorplan.area_cm2, interposer_carbon, floorplan.num_if,
+                                       stack_carbon=stack_carbon, emib_carbon=emib_carbon)
+        return PackagingResult(self.packager.package_type, carbon, interposer_area=floorplan.area_cm2,
+                               interposer_carbon=interposer_carbon, num_if=floorplan.num_if, floorplan=floorplan)
+
+    def evaluate(self):
+        """EmbodiedResult of the current design (cached until the next edit)."""
+        if self._result is not None:
+            return self._result
+        groups = self.get_groups()
+        ecf_breakdown = {}
+        group_results = []
+        for key, chiplet, count in groups:
+            if (key, count) not in self._group_results:
+                result = self._chiplet_result(key, chiplet)
+                self._group_results[(key, count)] = ChipletGroupResult(result, count, result.ecf * count)
+            group = self._group_results[(key, count)]
+            group_results.append(group)
+            ecf_breakdown[chiplet.chiplet_type] = ecf_breakdown.get(chiplet.chiplet_type, 0) + group.ecf
+
+        packaging = self._packaging(groups)
+        ecf_breakdown["package"] = packaging.carbon
+        self._result = EmbodiedResult(sum(ecf_breakdown.values()), ecf_breakdown, tuple(group_results), packaging)
+        return self._result
+
+    def breakdown(self):
+        return dict(self.evaluate().breakdown)
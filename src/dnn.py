@@ -0,0 +1,201 @@
+import glob
+import json
+import os
+import threading
+
+import numpy as np
+
+from context import EvalContext
+from evaluate import get_operational_terms
+from results import ModelZooResult
+
+
+# ------------------------ DNN ingestion ----------------------------
+# Energy and OCF of DNN models from their layer CSVs ("Layer name", Channels,
+# Height, Width, Kernel, Stride, Filters), for a whole model zoo at once.
+#   - Layers are classified by name suffix with vectorized string ops, like
+#     parse_dnn_model(): *fc / *linear -> fc, *conv -> conv, else nonlinear.
+#   - CSVs are read in chunks of CHUNK_ROWS layers; per model only the layer
+#     counts and the work per layer type are kept (and the per-layer energy
+#     when asked for), so large files stream in bounded memory.
+#   - Work per layer: MACs for conv (ceil(H/S) x ceil(W/S) x K^2 x C x F) and
+#     fc (C x H x W x F), element operations for nonlinear layers (C x H x W).
+#
+# Accelerator energy tables (JSON) are parsed once and cached until the file
+# changes. Two formats are accepted:
+#   {"resnet50": 1.2e-3, ...}                       energy per inference (J) per model
+#   {"models": {...}, "energy_per_mac": {"conv": 2e-12, "fc": 3e-12},
+#    "energy_per_op": {"nonlinear": 1e-12}}          plus per-layer coefficients (J)
+# A model listed in "models" uses that energy per inference (its layers share
+# it in proportion to their work); other models use the coefficients.
+
+LAYER_TYPES = ["fc", "conv", "nonlinear"]
+FC, CONV, NONLINEAR = range(len(LAYER_TYPES))
+SHAPE_COLUMNS = ["Channels", "Height", "Width", "Kernel", "Stride", "Filters"]
+CHUNK_ROWS = 1 << 16
+
+_energy_tables = {}     # absolute path -> (mtime_ns, size, table)
+_lock = threading.Lock()
+
+
+def classify_layers(names):
+    # LAYER_TYPES index per layer name (array of int8)
+    names = np.asarray(names).astype(str)
+    codes = np.full(names.shape, NONLINEAR, dtype=np.int8)
+    codes[np.char.endswith(names, "conv")] = CONV
+    codes[np.char.endswith(names, "fc") | np.char.endswith(names, "linear")] = FC
+    return codes
+
+
+def get_layer_work(codes, layers):
+    # MACs (fc, conv) or element operations (nonlinear) per layer of a DataFrame chunk
+    c, h, w, k, s, f = (layers[column].to_numpy(dtype=np.float64) for column in SHAPE_COLUMNS)
+    elements = c * h * w
+    conv_macs = np.ceil(h / s) * np.ceil(w / s) * k * k * c * f
+    return np.where(codes == CONV, conv_macs, np.where(codes == FC, elements * f, elements))
+
+
+def read_layers(dnn_file, chunksize=CHUNK_ROWS, with_work=True):
+    """
+    Stream a layer CSV in chunks.
+
+    Yields:
+        tuple: (layer type codes, work per layer or None) per chunk.
+    """
+    import pandas as pd  # only needed for DNN model files
+    columns = ["Layer name"] + (SHAPE_COLUMNS if with_work else [])
+    with pd.read_csv(dnn_file, usecols=lambda column: column in columns, chunksize=chunksize) as reader:
+        for chunk in reader:
+            missing = [column for column in columns if column not in chunk.columns]
+            if missing:
+                raise ValueError("DNN model file {} has no column(s) {}.".format(dnn_file, ", ".join(missing)))
+            codes = classify_layers(chunk["Layer name"].to_numpy())
+            yield codes, get_layer_work(codes, chunk) if with_work else None
+
+
+def load_energy_table(perf_file):
+    """
+    Energy table of an accelerator, as {"models", "energy_per_mac", "energy_per_op"}.
+
+    Parsed once per process and re-read only when the file changes.
+    """
+    path = os.path.abspath(perf_file)
+    st = os.stat(path)
+    with _lock:
+        cached = _energy_tables.get(path)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+    with open(path, 'r') as json_file:
+        table = normalize_energy_table(json.load(json_file), perf_file)
+    with _lock:
+        _energy_tables[path] = (st.st_mtime_ns, st.st_size, table)
+    return table
+
+
+def normalize_energy_table(table, source="energy table"):
+    if not isinstance(table, dict):
+        raise ValueError("{} must be a JSON object.".format(source))
+    if not any(key in table for key in ("models", "energy_per_mac", "energy_per_op")):
+        table = {"models": table}   # original format: model -> energy per inference
+    table = {"models": dict(table.get("models", {})), "energy_per_mac": dict(table.get("energy_per_mac", {})),
+             "energy_per_op": dict(table.get("energy_per_op", {}))}
+    for section, values in table.items():
+        for key, value in values.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                raise ValueError("{} has invalid {} value {!r} for '{}'.".format(source, section, value, key))
+    return table
+
+
+def get_layer_energy_coefficients(table):
+    # J per unit of work for each of LAYER_TYPES (NaN where the table has none)
+    coefficients = [table["energy_per_mac"].get("fc"), table["energy_per_mac"].get("conv"),
+                    table["energy_per_op"].get("nonlinear")]
+    return np.array([np.nan if c is None else c for c in coefficients], dtype=np.float64)
+
+
+def find_models(models):
+    # {name: csv path} from a dict, a list of files, a directory or a glob pattern
+    if isinstance(models, dict):
+        return dict(models)
+    if isinstance(models, str):
+        pattern = os.path.join(models, "*.csv") if os.path.isdir(models) else models
+        models = sorted(glob.glob(pattern))
+        if not models:
+            raise ValueError("No DNN model files match '{}'.".format(pattern))
+    names = [os.path.splitext(os.path.basename(path))[0] for path in models]
+    if len(set(names)) != len(names):
+        raise ValueError("DNN model file names must be unique (a model is named after its file).")
+    return dict(zip(names, models))
+
+
+def evaluate_model_zoo(models, energy_table, context=None, per_layer=False, chunksize=CHUNK_ROWS):
+    """
+    Energy per inference and OCF of many DNN models in one pass.
+
+    Parameters:
+        models (str, list or dict): Directory or glob of layer CSVs, list of CSVs, or {name: csv}.
+        energy_table (str or dict): Accelerator energy table (JSON file or dict, see above).
+        context (EvalContext): ci_op, num_inf_per_day and lifetime_days of the OCF.
+        per_layer (bool): Also return the energy and OCF of every layer.
+        chunksize (int): Layers read per chunk.
+
+    Returns:
+        ModelZooResult: Per-model layer counts, energy per inference (J) and OCF (g).
+    """
+    if context is None:
+        context = EvalContext()
+    models = find_models(models)
+    table = load_energy_table(energy_table) if isinstance(energy_table, str) else normalize_energy_table(energy_table)
+    coefficients = get_layer_energy_coefficients(table)
+
+    names = list(models)
+    layer_counts = np.zeros((len(names), len(LAYER_TYPES)), dtype=np.int64)
+    work = np.zeros((len(names), len(LAYER_TYPES)))
+    layer_work, layer_codes = [], []
+    for i, name in enumerate(names):
+        # models with a known total need no layer shapes unless their layers are reported
+        with_work = per_layer or name not in table["models"]
+        chunks = []
+        for codes, chunk_work in read_layers(models[name], chunksize=chunksize, with_work=with_work):
+            layer_counts[i] += np.bincount(codes, minlength=len(LAYER_TYPES))
+            if with_work:
+                work[i] += np.bincount(codes, weights=chunk_work, minlength=len(LAYER_TYPES))
+            if per_layer:
+                chunks.append((codes, chunk_work))
+        if per_layer:
+            layer_codes.append(np.concatenate([c for c, _ in chunks]) if chunks else np.zeros(0, dtype=np.int8))
+            layer_work.append(np.concatenate([w for _, w in chunks]) if chunks else np.zeros(0))
+
+    # energy per inference: table totals, else work x coefficient per layer type
+    known = np.array([name in table["models"] for name in names], dtype=bool)
+    used = work > 0
+    missing = used[~known] & np.isnan(coefficients)
+    if np.any(missing):
+        row, column = np.argwhere(missing)[0]
+        raise ValueError("Energy table has no entry for model '{}' and no coefficient for its {} layers.".format(
+            np.array(names)[~known][row], LAYER_TYPES[column]))
+    energy = np.where(known, [table["models"].get(name, 0.0) for name in names],
+                      np.sum(work * np.nan_to_num(coefficients), axis=1))
+    ocf = get_operational_terms(energy, context.ci_op, context.num_inf_per_day, context.lifetime_days)[-1]
+
+    num_layers = layer_counts.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        perc_nonlinear = layer_counts[:, NONLINEAR] / num_layers * 100
+
+    layer_energy, layer_ocf, offsets = None, None, None
+    if per_layer:
+        offsets = np.concatenate([[0], np.cumsum(num_layers)])
+        layer_energy = np.empty(offsets[-1])
+        for i in range(len(names)):
+            codes, w = layer_codes[i], layer_work[i]
+            if known[i]:
+                # the model total, split in proportion to the work of each layer
+                total_work = w.sum()
+                values = w * (energy[i] / total_work) if total_work > 0 else np.full(len(w), energy[i] / max(1, len(w)))
+            else:
+                values = w * np.nan_to_num(coefficients)[codes]
+            layer_energy[offsets[i]:offsets[i + 1]] = values
+        layer_ocf = get_operational_terms(layer_energy, context.ci_op, context.num_inf_per_day, context.lifetime_days)[-1]
+
+    return ModelZooResult(tuple(names), num_layers, layer_counts, perc_nonlinear, energy, ocf,
+                          layer_offsets=offsets, layer_energy=layer_energy, layer_ocf=layer_ocf)
@@ -0,0 +1,105 @@
+import json
+
+from context import EvalContext
+from chiplet import group_chiplets
+from data_store import load_tables
+from results import ChipletGroupResult, EmbodiedResult, OperationalResult, FootprintResult
+from timing import NULL_TIMER
+
+
+# ------------------------ Carbon evaluation ----------------------------
+# Model-level evaluation shared by epicarbon.py and the bulk engines (sweep,
+# batch CLI, ...). All scenario parameters come from an explicit EvalContext
+# and models are evaluated without side effects, so these functions are safe
+# to call concurrently from threads or worker processes.
+
+
+def evaluate_embodied_groups(chiplet_groups, packager, context, verbose=False, timer=NULL_TIMER):
+    # ECF per chiplet type plus packaging, in grams CO2; chiplet_groups is
+    # [(chiplet, count)] and each unique chiplet is evaluated once
+    ecf_breakdown = {}
+    group_results = []
+    with timer.stage("chiplets"):
+        for chiplet, count in chiplet_groups:
+            result = chiplet.evaluate(context, verbose=verbose)
+            group_results.append(ChipletGroupResult(result, count, result.ecf * count))
+            ecf_breakdown[chiplet.chiplet_type] = ecf_breakdown.get(chiplet.chiplet_type, 0) + result.ecf * count
+
+    with timer.stage("packaging"):
+        packaging = packager.evaluate(chiplet_groups, context, verbose=verbose, timer=timer)
+    ecf_breakdown["package"] = packaging.carbon
+    return EmbodiedResult(sum(ecf_breakdown.values()), ecf_breakdown, tuple(group_results), packaging,
+                          timings=dict(timer.seconds))
+
+
+def evaluate_embodied(chiplets, packager, context, verbose=False, timer=NULL_TIMER):
+    # same as evaluate_embodied_groups, for a flat chiplet list (see parse_arch_file)
+    return evaluate_embodied_groups(group_chiplets(chiplets), packager, context, verbose=verbose, timer=timer)
+
+
+def get_embodied_breakdown(chiplets, packager, context, verbose=False):
+    return evaluate_embodied(chiplets, packager, context, verbose=verbose).breakdown
+
+
+def get_operational_terms(energy_per_inf, ci_op, num_inf_per_day=1e9, lifetime_days=5*365):
+    # returns (energy per inference in kWh, OCF per inference, per day, total) in grams CO2
+    energy_per_inf_kWh = energy_per_inf / (1000 * 3600)  # J -> kWh
+    ocf_per_inf = energy_per_inf_kWh * ci_op
+    ocf_per_day = ocf_per_inf * num_inf_per_day
+    ocf_total = ocf_per_day * lifetime_days
+    return energy_per_inf_kWh, ocf_per_inf, ocf_per_day, ocf_total
+
+
+def evaluate_operational(energy_per_inf, context):
+    return get_operational_terms(energy_per_inf, context.ci_op, context.num_inf_per_day, context.lifetime_days)[-1]
+
+
+def get_operational_result(energy_per_inf, ci_op, num_inf_per_day=1e9, lifetime_days=5*365):
+    energy_per_inf_kWh, ocf_per_inf, ocf_per_day, ocf_total = get_operational_terms(
+        energy_per_inf, ci_op, num_inf_per_day=num_inf_per_day, lifetime_days=lifetime_days)
+    return OperationalResult(ocf_total, energy_per_inf, energy_per_inf_kWh, ocf_per_inf, ocf_per_day,
+                             num_inf_per_day, lifetime_days)
+
+
+# ------------------------ Architecture-level API ----------------------------
+
+def load_arch(arch):
+    # arch is a path to an architecture JSON file or an already loaded dict
+    if isinstance(arch, dict):
+        return arch
+    with open(arch, 'r') as json_file:
+        return json.load(json_file)
+
+
+def evaluate_arch(arch, context=None, verbose=False, timer=NULL_TIMER):
+    if context is None:
+        context = EvalContext()
+    from utils import parse_arch_groups  # imports the chiplet models (and NumPy) on first use
+    with timer.stage("parse"):
+        chiplet_groups, packager, _ = parse_arch_groups(load_arch(arch), verbose=verbose)
+    with timer.stage("data"):
+        load_tables()
+    return evaluate_embodied_groups(chiplet_groups, packager, context, verbose=verbose, timer=timer)
+
+
+def _evaluate_pair(pair):
+    arch, context = pair
+    return evaluate_arch(arch, context)
+
+
+def evaluate_many(pairs, jobs=None, use_processes=False):
+    """
+    Evaluate the ECF of many (arch, context) pairs concurrently.
+
+    Parameters:
+        pairs (iterable): (architecture path or dict, EvalContext) pairs.
+        jobs (int): Pool size (default: executor default).
+        use_processes (bool): Use a process pool instead of a thread pool.
+
+    Returns:
+        list: EmbodiedResult per pair, in input order.
+    """
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor  # multiprocessing is slow to import
+    executor = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor(max_workers=jobs) as pool:
+        return list(pool.map(_evaluate_pair, pairs))
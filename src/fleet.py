@@ -0,0 +1,244 @@
+import csv
+import json
+import os
+
+import numpy as np
+
+from chiplet_models.dram_chiplet import DRAM_chiplet
+from chiplet_models.storage_device import Storage_device
+from context import EvalContext
+from data_store import get_table
+from evaluate import evaluate_arch
+from results import FleetResult
+
+
+# ------------------------ Fleet model ----------------------------
+# Embodied and operational carbon of a fleet of devices. An inventory is a
+# list of rows (component spec, count, region):
+#   {"component": {"type": "ssd", "model": "nand_tlc_1z", "size-gb": 3840, "power_w": 6},
+#    "count": 200000, "region": "usa"}
+# Component types:
+#   - "arch":   accelerator, {"arch": "archs/adept.json"} (path or dict), ECF from evaluate_arch()
+#   - "dram":   {"dram-type": "ddr4_10nm", "size-gb": 64}       (DRAM_chiplet)
+#   - "ssd":    {"model": "nand_tlc_1z", "size-gb": 3840}       (per-GB tables in src/data/ssd)
+#   - "hdd":    {"model": "Exosx16", "size-gb": 16000}          (per-GB tables in src/data/hdd)
+#   - "server": {"components": [{..., "count": 8}, ...]}, each component counted
+#               count x the server count
+# Operational carbon per device comes from "power_w" (average W, 24 h/day) or,
+# for accelerators, "energy_per_inf" (J) x "num_inf_per_day"; components with
+# neither have no OCF. "lifetime_days" overrides the context lifetime. The
+# region is a key of carbon_intensity/location.json or a CI value in gCO2/kWh
+# (default: the context's ci_op). An optional "name" labels the component.
+#
+# Inventory files are JSON (a list of rows, or {"rows": [...]}), JSONL (one
+# row per line) or CSV with a count and region column plus the component
+# fields as columns (type, arch, model, dram-type, size-gb, power_w, ...).
+#
+# Every distinct component spec is evaluated once; rows only hold an index
+# into the distinct specs and regions, and all totals are weighted sums over
+# the rows (np.bincount), so the model work grows with the number of distinct
+# specs, not with the number of devices.
+
+COMPONENT_TYPES = ["arch", "dram", "ssd", "hdd", "server"]
+OPERATIONAL_FIELDS = ["power_w", "energy_per_inf", "num_inf_per_day", "lifetime_days"]
+NUMERIC_FIELDS = ["size-gb", "count"] + OPERATIONAL_FIELDS
+
+
+def _parse_csv_value(key, value):
+    if key in NUMERIC_FIELDS:
+        return float(value)
+    return value
+
+
+def _read_csv(inventory_file):
+    rows = []
+    with open(inventory_file, 'r', newline='') as csv_file:
+        for record in csv.DictReader(csv_file):
+            component = {k: _parse_csv_value(k, v.strip()) for k, v in record.items()
+                         if k not in ("count", "region") and v is not None and v.strip()}
+            rows.append({"component": component, "count": float(record.get("count") or 1),
+                         "region": (record.get("region") or "").strip() or None})
+    return rows
+
+
+def load_inventory(inventory_file):
+    """
+    Read an inventory file (JSON, JSONL or CSV) into a list of rows.
+
+    Relative arch paths are resolved against the current directory, then the
+    inventory's directory.
+    """
+    inventory_dir = os.path.dirname(os.path.abspath(inventory_file))
+    if inventory_file.endswith(".csv"):
+        rows = _read_csv(inventory_file)
+    elif inventory_file.endswith(".jsonl"):
+        with open(inventory_file, 'r') as f:
+            rows = [json.loads(line) for line in f if line.strip() and not line.lstrip().startswith("#")]
+    else:
+        with open(inventory_file, 'r') as json_file:
+            rows = json.load(json_file)
+        rows = rows["rows"] if isinstance(rows, dict) else rows
+
+    def resolve(component):
+        arch = component.get("arch")
+        if isinstance(arch, str) and not os.path.isabs(arch) and not os.path.exists(arch):
+            component["arch"] = os.path.join(inventory_dir, arch)
+        for sub_component in component.get("components", []):
+            resolve(sub_component)
+    for row in rows:
+        resolve(row.get("component", {}))
+    return rows
+
+
+def _expand(rows):
+    # (component, count, region) per row, servers replaced by their components
+    for i, row in enumerate(rows):
+        if "component" not in row:
+            raise ValueError("Inventory row {} has no 'component'.".format(i))
+        component, count, region = row["component"], row.get("count", 1), row.get("region")
+        if component.get("type") == "server":
+            for sub_component in component.get("components", []):
+                sub_component = dict(sub_component)
+                sub_count = sub_component.pop("count", 1)
+                yield _check(sub_component, i), count * sub_count, region
+        else:
+            yield _check(component, i), count, region
+
+
+def _check(component, i):
+    if component.get("type") not in COMPONENT_TYPES or component["type"] == "server":
+        raise ValueError("Inventory row {} has unsupported component type {!r} (use {}).".format(
+            i, component.get("type"), ", ".join(COMPONENT_TYPES)))
+    return component
+
+
+def get_component_label(component):
+    if "name" in component:
+        return component["name"]
+    if component["type"] == "arch":
+        arch = component["arch"]
+        return "arch " + (os.path.basename(arch) if isinstance(arch, str) else arch.get("name", "inline"))
+    model = component.get("dram-type", component.get("model"))
+    return "{} {} {:g}GB".format(component["type"], model, component.get("size-gb", 0))
+
+
+def get_component_ecf(component, context):
+    # embodied carbon of one device (grams CO2)
+    component_type = component["type"]
+    if component_type == "arch":
+        return evaluate_arch(component["arch"], context).total
+    if component_type == "dram":
+        device = DRAM_chiplet("dram", -1, component["dram-type"], component["size-gb"])
+    else:
+        device = Storage_device(component_type, component["model"], component["size-gb"])
+    return device.evaluate(context).ecf
+
+
+def get_component_energy(component, context):
+    # operational energy of one device per day (kWh)
+    if "power_w" in component:
+        return component["power_w"] * 24 / 1000
+    if "energy_per_inf" in component:
+        return component["energy_per_inf"] / (1000 * 3600) * component.get("num_inf_per_day", context.num_inf_per_day)
+    return 0.0
+
+
+def get_region_ci(region, context):
+    # operational CI (gCO2/kWh) of a region name or value
+    if region is None:
+        return context.ci_op
+    if isinstance(region, (int, float)):
+        return float(region)
+    locations = get_table("ci_location")
+    if region.lower() not in locations:
+        try:
+            return float(region)
+        except ValueError:
+            raise ValueError("Unknown region '{}' (use {} or a CI value in gCO2/kWh).".format(
+                region, ", ".join(locations))) from None
+    return locations[region.lower()]
+
+
+def _group_sums(index, weights, labels):
+    sums = np.bincount(index, weights=weights, minlength=len(labels))
+    return {label: float(value) for label, value in zip(labels, sums)}
+
+
+def evaluate_fleet(inventory, context=None):
+    """
+    Embodied and operational carbon of a fleet.
+
+    Parameters:
+        inventory (str or list): Inventory file, or a list of rows (see above).
+        context (EvalContext): Scenario for the model evaluation (ci_fab, lifetime_days,
+            default CI of rows without a region, ...).
+
+    Returns:
+        FleetResult: Fleet ECF/OCF and their totals per component type, region and component.
+    """
+    if context is None:
+        context = EvalContext()
+    rows = load_inventory(inventory) if isinstance(inventory, str) else inventory
+
+    # distinct specs and regions; rows become indices into them
+    spec_index, region_index = {}, {}
+    specs, regions = [], []
+    spec_of_row, region_of_row, counts = [], [], []
+    locations = get_table("ci_location")
+    for component, count, region in _expand(rows):
+        key = json.dumps(component, sort_keys=True)
+        if key not in spec_index:
+            spec_index[key] = len(specs)
+            specs.append(component)
+        if isinstance(region, str) and region.lower() in locations:
+            region = region.lower()     # region names are case-insensitive, as in get_region_ci()
+        region_key = region if region is not None else ""
+        if region_key not in region_index:
+            region_index[region_key] = len(regions)
+            regions.append(region)
+        spec_of_row.append(spec_index[key])
+        region_of_row.append(region_index[region_key])
+        counts.append(count)
+
+    # one model evaluation per distinct spec (arch files shared between specs load once)
+    arch_ecf = {}
+    ecf_per_device = np.empty(len(specs))
+    for i, component in enumerate(specs):
+        arch = component.get("arch")
+        if isinstance(arch, str):
+            if arch not in arch_ecf:
+                arch_ecf[arch] = get_component_ecf(component, context)
+            ecf_per_device[i] = arch_ecf[arch]
+        else:
+            ecf_per_device[i] = get_component_ecf(component, context)
+    energy_per_device = np.array([get_component_energy(c, context) * c.get("lifetime_days", context.lifetime_days)
+                                  for c in specs])
+    region_ci = np.array([get_region_ci(r, context) for r in regions])
+
+    # weighted sums over the rows
+    spec_of_row = np.array(spec_of_row, dtype=np.int64)
+    region_of_row = np.array(region_of_row, dtype=np.int64)
+    counts = np.array(counts, dtype=np.float64)
+    if np.any(counts < 0):
+        raise ValueError("Inventory counts must not be negative.")
+    row_ecf = ecf_per_device[spec_of_row] * counts
+    row_ocf = energy_per_device[spec_of_row] * region_ci[region_of_row] * counts
+
+    types = sorted({c["type"] for c in specs})
+    type_of_spec = np.array([types.index(c["type"]) for c in specs], dtype=np.int64)
+    type_of_row = type_of_spec[spec_of_row]
+    labels = [get_component_label(c) for c in specs]
+    region_labels = [str(r) if r is not None else "default" for r in regions]
+    # labels of distinct specs may coincide (e.g. same device with two power values)
+    label_index = {label: i for i, label in enumerate(dict.fromkeys(labels))}
+    label_of_row = np.array([label_index[label] for label in labels], dtype=np.int64)[spec_of_row]
+    region_label_index = {label: i for i, label in enumerate(dict.fromkeys(region_labels))}
+    region_label_of_row = np.array([region_label_index[label] for label in region_labels], dtype=np.int64)[region_of_row]
+
+    def grouped(index, names):
+        devices, ecf, ocf = (_group_sums(index, w, names) for w in (counts, row_ecf, row_ocf))
+        return {name: {"devices": devices[name], "ecf": ecf[name], "ocf": ocf[name]} for name in names}
+
+    return FleetResult(float(row_ecf.sum()), float(row_ocf.sum()), float(counts.sum()), len(specs),
+                       grouped(type_of_row, types), grouped(region_label_of_row, list(region_label_index)),
+                       grouped(label_of_row, list(label_index)))
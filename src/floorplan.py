@@ -0,0 +1,182 @@
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+
+
+# ------------------------ Interposer floorplanning ----------------------------
+# Iterative, memoized equivalent of recursive_split() in packager.py (from
+# ECO-CHIP). The chiplet set is bipartitioned greedily (areas in ascending
+# order, each placed into the lighter half, ties to the first half), halves are
+# split again along the alternate axis, and sizes are combined bottom-up with a
+# 0.5 mm gap and one EMIB interface per emib_pitch mm of overlapping edge.
+#
+# Each sub-problem depends only on the sorted area multiset and the axis, so
+# results are memoized on that key: packages made of many identical chiplets
+# collapse to a handful of distinct sub-problems. The tree is walked with an
+# explicit stack, so there is no recursion depth limit, and halves stay sorted
+# so no node re-sorts its areas.
+
+GAP_MM = 0.5
+FLOORPLAN_CACHE_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class Floorplan:
+    width: float        # mm, along axis 0
+    height: float       # mm, along axis 1
+    num_if: int         # EMIB interfaces between neighbouring chiplets
+
+    @property
+    def area_mm2(self):
+        return self.width * self.height
+
+    @property
+    def area_cm2(self):
+        return self.width * self.height / 100
+
+
+def _bipartition(areas):
+    # greedy split of an ascending area tuple; both halves stay ascending
+    blocks = ([], [])
+    sums = [0.0, 0.0]
+    for area in areas:
+        i = 0 if sums[0] <= sums[1] else 1
+        blocks[i].append(area)
+        sums[i] += area
+    return tuple(blocks[0]), tuple(blocks[1])
+
+
+def _leaf(areas, axis):
+    v = (sum(areas)/2)**0.5
+    size = (v + v*((axis+1)%2), v + axis*v)
+    return size, 0
+
+
+def _split_sorted(areas, axis, emib_pitch, memo=None):
+    # returns ((width, height), num_if) for an ascending area tuple; memo
+    # ({(areas, axis): result}, for one emib_pitch) may be shared across calls
+    if memo is None:
+        memo = {}
+    children = {}
+    stack = [(areas, axis)]
+    while stack:
+        key = stack[-1]
+        if key in memo:
+            stack.pop()
+            continue
+        node_areas, node_axis = key
+        if len(node_areas) <= 1:
+            memo[key] = _leaf(node_areas, node_axis)
+            stack.pop()
+            continue
+
+        if key not in children:
+            other = (node_axis+1)%2
+            left_areas, right_areas = _bipartition(node_areas)
+            children[key] = ((left_areas, other), (right_areas, other))
+        left_key, right_key = children[key]
+        if left_key not in memo or right_key not in memo:
+            stack.extend(k for k in (left_key, right_key) if k not in memo)
+            continue
+
+        (left, l_if), (right, r_if) = memo[left_key], memo[right_key]
+        other = (node_axis+1)%2
+        sizes = [0.0, 0.0]
+        sizes[node_axis] = left[node_axis] + right[node_axis] + GAP_MM
+        sizes[other] = max(left[other], right[other])
+        t_if = l_if + r_if
+        t_if += float(math.ceil(min(left[other], right[other])/emib_pitch)) # for overlap 1 interface per emib_pitch mm
+        memo[key] = (tuple(sizes), t_if)
+        stack.pop()
+    return memo[(areas, axis)]
+
+
+@lru_cache(maxsize=FLOORPLAN_CACHE_SIZE)
+def _floorplan_cached(sorted_areas, emib_pitch):
+    size, num_if = _split_sorted(sorted_areas, 0, emib_pitch)
+    return Floorplan(size[0], size[1], int(math.ceil(num_if)))
+
+
+def floorplan_interposer(areas_mm2, emib_pitch=10):
+    """
+    Interposer size and EMIB interface count for a set of chiplet areas.
+
+    Produces the same floorplan as recursive_split(areas_mm2) and scales to
+    thousands of chiplets.
+
+    Parameters:
+        areas_mm2 (iterable of float): Chiplet areas in mm2, one per chiplet.
+        emib_pitch (float): Edge length per EMIB interface in mm.
+
+    Returns:
+        Floorplan: width/height (mm), area_cm2 and num_if.
+    """
+    return _floorplan_cached(tuple(sorted(float(a) for a in areas_mm2)), emib_pitch)
+
+
+def floorplan_interposer_groups(area_counts_mm2, emib_pitch=10, memo=None):
+    # same as floorplan_interposer, for [(area_mm2, count)] groups; a memo dict
+    # kept by the caller lets successive, similar floorplans share sub-problems
+    areas = [a for a, count in area_counts_mm2 for _ in range(count)]
+    if memo is None:
+        return floorplan_interposer(areas, emib_pitch)
+    size, num_if = _split_sorted(tuple(sorted(float(a) for a in areas)), 0, emib_pitch, memo)
+    return Floorplan(size[0], size[1], int(math.ceil(num_if)))
+
+
+# ------------------------ Floorplan gradient ----------------------------
+# Width and height are piecewise smooth in the chiplet areas: a leaf of area a
+# is sqrt(a/2) x 2*sqrt(a/2), sizes add along the split axis and take the max
+# across it. The derivatives below hold the tree (greedy partition, which side
+# is larger) fixed, i.e. they are exact wherever a small change of the areas
+# does not reorder the areas or flip a partition or max decision. The EMIB
+# interface count is a step function (ceil) and has zero derivative; the
+# distance of the nearest overlap edge to its next step is returned instead.
+
+def floorplan_gradient(area_counts_mm2, emib_pitch=10):
+    """
+    Floorplan plus the derivatives of its width and height w.r.t. the chiplet areas.
+
+    Derivatives are per area value: moving all chiplets of area a (mm2) by the
+    same amount changes the width by gradient[a][0] * da (mm per mm2).
+
+    Parameters:
+        area_counts_mm2 (list): [(area_mm2, count)] groups, as floorplan_interposer_groups().
+        emib_pitch (float): Edge length per EMIB interface in mm.
+
+    Returns:
+        tuple: (Floorplan, {area_mm2: (d width, d height)}, EMIB step margin in mm).
+    """
+    areas = tuple(sorted(float(a) for a, count in area_counts_mm2 for _ in range(count)))
+    memo = {}
+    size, num_if = _split_sorted(areas, 0, emib_pitch, memo)
+    floorplan = Floorplan(size[0], size[1], int(math.ceil(num_if)))
+
+    # children have fewer areas than their parent, so ascending length is bottom-up
+    gradients, margin = {}, math.inf
+    for key in sorted(memo, key=lambda k: len(k[0])):
+        node_areas, axis = key
+        if len(node_areas) <= 1:
+            v = memo[key][0][(axis+1)%2]
+            dv = 0.25/v if v > 0 else math.inf     # v = sqrt(a/2)
+            gradients[key] = {a: (dv + dv*((axis+1)%2), dv + axis*dv) for a in node_areas}
+            continue
+
+        other = (axis+1)%2
+        left_areas, right_areas = _bipartition(node_areas)
+        left_key, right_key = (left_areas, other), (right_areas, other)
+        left, right = memo[left_key][0], memo[right_key][0]
+        wider = gradients[left_key] if left[other] >= right[other] else gradients[right_key]
+        gradient = {}
+        for side in (gradients[left_key], gradients[right_key]):
+            for a, d in side.items():
+                g = gradient.setdefault(a, [0.0, 0.0])
+                g[axis] += d[axis]
+        for a in gradient:
+            gradient[a][other] = wider.get(a, (0.0, 0.0))[other]
+        gradients[key] = {a: tuple(g) for a, g in gradient.items()}
+
+        overlap = min(left[other], right[other]) % emib_pitch
+        margin = min(margin, overlap, emib_pitch - overlap)
+
+    return floorplan, gradients[(areas, 0)], margin
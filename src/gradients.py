@@ -0,0 +1,218 @@
+import math
+
+import numpy as np
+
+from batch import get_manufacturing_carbon_gradient_batch
+from context import EvalContext
+from data_store import get_table, node_key
+from evaluate import load_arch, evaluate_arch, get_operational_terms
+from floorplan import floorplan_gradient
+from packager import (INTERPOSER_NODE, INTERPOSER_TYPE, TSV_PITCH, ROUTER_AREA, RDL_LAYERS, NUM_BEOL, EMIB_AREA,
+                      EMIB_NODE, get_3d_area)
+from results import GradientResult
+
+
+# ------------------------ Analytic gradients ----------------------------
+# Exact partial derivatives of ECF, OCF and CF = ECF + OCF with respect to
+#   - the area of every chiplet entry of the architecture (cm2),
+#   - ci_fab, defect_rate, interposer_defect_rate, bonding_yield (ECF),
+#   - ci_op, energy_per_inf, num_inf_per_day, lifetime_days (OCF),
+# from the closed forms of the models instead of finite differences. The
+# chiplet-level terms of all designs go through one vectorized call
+# (batch.get_manufacturing_carbon_gradient_batch), so many designs are
+# differentiated at once.
+#
+# Discontinuities. The packaging model contains integer counts:
+#   - 3D:   TSVs per chiplet edge, floor(sqrt(area)/TSV_PITCH),
+#   - EMIB: interfaces per overlapping edge, ceil(edge/emib_pitch),
+# and the interposer floorplan makes discrete choices (greedy partition,
+# larger side of each split). All of them are held fixed: the derivatives
+# are those of the smooth piece the design sits on, so a count step
+# contributes zero. This is exact anywhere but on the step itself, where the
+# ECF jumps. margins["tsv"] (cm2, smallest area change that steps a TSV
+# count) and margins["emib"] (mm, smallest overlap change that steps an
+# EMIB count) tell how far the nearest step is; an optimizer should not take
+# steps larger than the margin on the strength of the gradient alone.
+#
+# Chiplet entries that share an area value sit at interchangeable leaves of
+# the floorplan; the interposer-area derivative of such a value is split
+# between them in proportion to their chiplet counts.
+
+LOGIC_TYPES = ["cmos-logic", "pic-logic"]
+INTERPOSER_PACKAGES = ["2.5D-passive", "2.5D-active", "RDL"]
+ECF_PARAMS = ["ci_fab", "defect_rate", "interposer_defect_rate", "bonding_yield"]
+OCF_PARAMS = ["ci_op", "energy_per_inf", "num_inf_per_day", "lifetime_days"]
+
+
+def get_operational_gradient(energy_per_inf, context):
+    # (OCF, {parameter: dOCF/dparameter}); OCF is a product of its parameters
+    energy_per_inf_kWh, _, ocf_per_day, ocf_total = get_operational_terms(
+        energy_per_inf, context.ci_op, context.num_inf_per_day, context.lifetime_days)
+    per_inf_day = context.num_inf_per_day * context.lifetime_days
+    return ocf_total, {"ci_op": energy_per_inf_kWh * per_inf_day,
+                       "energy_per_inf": context.ci_op / (1000 * 3600) * per_inf_day,
+                       "num_inf_per_day": energy_per_inf_kWh * context.ci_op * context.lifetime_days,
+                       "lifetime_days": ocf_per_day}
+
+
+def get_tsv_margin(area):
+    # area change (cm2) to the nearest step of the TSV count of a 3D-stacked chiplet
+    num_tsv_1d = math.floor(math.sqrt(area)/TSV_PITCH)
+    return max(0.0, min(area - (num_tsv_1d*TSV_PITCH)**2, ((num_tsv_1d+1)*TSV_PITCH)**2 - area))
+
+
+class _Rows:
+    # chiplet rows of all designs, differentiated in one vectorized call
+    def __init__(self):
+        self.columns = ([], [], [], [], [], [], [], [])
+
+    def add(self, chiplet_type, tech_node, area, actuation_type, context, defect_rate, cpa_scaling=1.0):
+        for column, value in zip(self.columns, (chiplet_type, tech_node, area, actuation_type, context.ci_fab,
+                                                context.ghg_abatement, defect_rate, cpa_scaling)):
+            column.append(value)
+        return len(self.columns[0]) - 1
+
+    def add_chiplet(self, chiplet_info, area, context):
+        return self.add(chiplet_info["type"], chiplet_info.get("tech", -1), area,
+                        chiplet_info.get("actuation_type", "default"), context, context.defect_rate)
+
+    def evaluate(self):
+        chiplet_types, tech_nodes, areas, actuation_types, ci_fab, ghg_abatement, defect_rate, cpa_scaling = self.columns
+        # tech is ignored for pic-logic rows; keep the column integer
+        tech_nodes = [t if t is not None else -1 for t in tech_nodes]
+        return get_manufacturing_carbon_gradient_batch(
+            np.array(chiplet_types, dtype=object), np.array(tech_nodes, dtype=np.int64), np.array(areas, dtype=np.float64),
+            np.array(actuation_types, dtype=object), np.array(ci_fab, dtype=np.float64), np.array(ghg_abatement),
+            np.array(defect_rate, dtype=np.float64), np.array(cpa_scaling, dtype=np.float64))
+
+
+def _broadcast(value, n, name):
+    if isinstance(value, (list, tuple)):
+        if len(value) != n:
+            raise ValueError("Expected {} values of {}, got {}.".format(n, name, len(value)))
+        return list(value)
+    return [value] * n
+
+
+def get_gradients_batch(archs, contexts=None, energy_per_inf=0):
+    """
+    ECF/OCF/CF and their partial derivatives for many designs at once.
+
+    Parameters:
+        archs (list): Architecture JSON files or dicts.
+        contexts (EvalContext or list): Scenario per design (default: EvalContext()).
+        energy_per_inf (float or list): Energy per inference in joules, per design.
+
+    Returns:
+        list: GradientResult per design, in input order.
+    """
+    archs = [load_arch(arch) for arch in archs]
+    contexts = [c if c is not None else EvalContext() for c in _broadcast(contexts, len(archs), "contexts")]
+    energies = _broadcast(energy_per_inf, len(archs), "energy_per_inf")
+
+    rows = _Rows()
+    plans = []
+    for arch, context in zip(archs, contexts):
+        result = evaluate_arch(arch, context)
+        logic = [(j, info, info.get("num_chiplets", 1)) for j, info in enumerate(arch["chiplets"])
+                 if info["type"] in LOGIC_TYPES and info.get("num_chiplets", 1) > 0]
+        plan = {"result": result, "logic": logic, "rows_2d": [rows.add_chiplet(info, info["area"], context)
+                                                           for _, info, _ in logic]}
+        package_type = arch["package"]
+        if any("yield" in info for info in arch["chiplets"]):
+            raise ValueError("Gradients are computed for the default Poisson yield (remove 'yield').")
+        if package_type == "3D" and ("stack" in arch or any(info.get("tier", 0) for info in arch["chiplets"])):
+            raise ValueError("Gradients of multi-tier 3D stacks are not supported (remove 'stack'/'tier').")
+        if package_type == "3D":
+            plan["rows_3d"] = [rows.add_chiplet(info, get_3d_area(info["area"]), context) for _, info, _ in logic]
+        elif package_type in INTERPOSER_PACKAGES or package_type == "EMIB":
+            plan["floorplan"] = floorplan_gradient([(info["area"]*100, count) for _, info, count in logic])
+            if package_type != "EMIB":
+                scaling = get_table("beol_feol_scaling")[node_key(INTERPOSER_NODE)]
+                plan["row_interposer"] = rows.add(INTERPOSER_TYPE, INTERPOSER_NODE, result.packaging.interposer_area,
+                                                  "default", context, context.interposer_defect_rate, scaling)
+        plans.append(plan)
+
+    gradients = rows.evaluate()
+    results = []
+    for arch, context, energy, plan in zip(archs, contexts, energies, plans):
+        d_ecf = _get_embodied_gradient(arch, context, plan, gradients)
+        ocf, d_ocf = get_operational_gradient(energy, context)
+        results.append(GradientResult(plan["result"].total, ocf, d_ecf, d_ocf, plan.get("margins", {})))
+    return results
+
+
+def get_gradients(arch, context=None, energy_per_inf=0):
+    """GradientResult of one design (see get_gradients_batch())."""
+    return get_gradients_batch([arch], [context], [energy_per_inf])[0]
+
+
+def _get_embodied_gradient(arch, context, plan, g):
+    d_area = np.zeros(len(arch["chiplets"]))
+    d = dict.fromkeys(ECF_PARAMS, 0.0)
+    logic, rows_2d = plan["logic"], plan["rows_2d"]
+
+    # chiplets: count x ECF of one chiplet
+    for (j, _, count), r in zip(logic, rows_2d):
+        d_area[j] += count * g["d_area"][r]
+        d["ci_fab"] += count * g["d_ci_fab"][r]
+        d["defect_rate"] += count * g["d_defect_rate"][r]
+
+    # packaging
+    package_type = arch["package"]
+    packaging = plan["result"].packaging
+    bonding_yield = context.bonding_yield
+    if package_type == "3D":
+        # sum of count x (ECF with TSVs - ECF) / bonding_yield**N; d area_3d / d area = 1 between TSV steps
+        num_chiplets = sum(count for _, _, count in logic)
+        scale = 1 / bonding_yield**num_chiplets
+        for (j, _, count), r2, r3 in zip(logic, rows_2d, plan["rows_3d"]):
+            d_area[j] += count * (g["d_area"][r3] - g["d_area"][r2]) * scale
+            d["ci_fab"] += count * (g["d_ci_fab"][r3] - g["d_ci_fab"][r2]) * scale
+            d["defect_rate"] += count * (g["d_defect_rate"][r3] - g["d_defect_rate"][r2]) * scale
+        d["bonding_yield"] = -num_chiplets * packaging.carbon / bonding_yield
+        plan["margins"] = {"tsv": min((get_tsv_margin(info["area"]) for _, info, _ in logic), default=math.inf)}
+
+    elif package_type in INTERPOSER_PACKAGES:
+        r = plan["row_interposer"]
+        interposer_area, interposer_carbon = packaging.interposer_area, packaging.interposer_carbon
+        if package_type == "2.5D-active":
+            # (carbon - carbon * router_area / area) / bonding_yield
+            # no logic chiplets: no interposer and no routers
+            router_area = ROUTER_AREA * sum(count for _, _, count in logic) if interposer_area > 0 else 0.0
+            area = interposer_area if interposer_area > 0 else 1.0
+            factor = (1 - router_area / area) / bonding_yield
+            d_interposer_area = g["d_area"][r] * factor + interposer_carbon * router_area / area**2 / bonding_yield
+        else:
+            factor = (RDL_LAYERS / NUM_BEOL if package_type == "RDL" else 1) / bonding_yield
+            d_interposer_area = g["d_area"][r] * factor
+        d["ci_fab"] += g["d_ci_fab"][r] * factor
+        d["interposer_defect_rate"] = g["d_defect_rate"][r] * factor
+        d["bonding_yield"] = -packaging.carbon / bonding_yield
+        _add_floorplan_gradient(d_area, logic, plan["floorplan"], d_interposer_area)
+        plan["margins"] = {}
+
+    elif package_type == "EMIB":
+        # num_if EMIB bridges, each of ECF = carbon/area * EMIB_AREA / bonding_yield; total / bonding_yield
+        scaling = get_table("beol_feol_scaling")[node_key(EMIB_NODE)]
+        epa = get_table("cmos_epa")[node_key(EMIB_NODE)]
+        d["ci_fab"] += epa * scaling * EMIB_AREA / bonding_yield * packaging.num_if / bonding_yield
+        d["bonding_yield"] = -2 * packaging.carbon / bonding_yield
+        plan["margins"] = {"emib": plan["floorplan"][2]}
+
+    d = {k: float(v) for k, v in d.items()}
+    d["area"] = d_area
+    return d
+
+
+def _add_floorplan_gradient(d_area, logic, floorplan, d_interposer_area):
+    # chain rule through the interposer area (cm2) = width * height (mm2) / 100
+    floorplan, size_gradient, _ = floorplan
+    totals = {}
+    for _, info, count in logic:
+        totals[info["area"]*100] = totals.get(info["area"]*100, 0) + count
+    for j, info, count in logic:
+        d_width, d_height = size_gradient[info["area"]*100]
+        # per cm2 of chiplet area: (height * d_width + width * d_height) / 100 * 100
+        d_area_value = floorplan.height * d_width + floorplan.width * d_height
+        d_area[j] += d_interposer_area * d_area_value * count / totals[info["area"]*100]
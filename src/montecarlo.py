@@ -0,0 +1,263 @@
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from data_store import get_table, get_gpa_table, node_key
+from chiplet_models.pic_logic_chiplet import PIC_CMOS_EQUIV_NODE, PIC_SENSITIVE_AREA
+from context import EvalContext
+from evaluate import get_operational_terms, load_arch
+from floorplan import floorplan_interposer_groups
+from streaming_stats import StreamingSummary
+from utils import parse_arch_groups
+import packager as pk
+
+
+# ------------------------ Monte Carlo ECF/OCF ----------------------------
+# Propagates input uncertainty through the ECF/OCF formulas. Samples are drawn
+# in fixed-size blocks; block i always uses the i-th child of SeedSequence(seed),
+# and blocks are merged in order, so results are reproducible for a given seed
+# whatever the number of worker processes. Each block is evaluated as arrays
+# (one value per sample) and folded into streaming summaries, so memory is
+# bounded by the block size rather than the number of samples.
+
+# Relative half-width of a triangular distribution centred on the nominal value.
+# pic_process_energy applies to each step of src/data/pic_logic/epa-data-pic.csv
+# that has no min/max reported; reported min/max are used as the bounds.
+UNCERTAINTY_DEFAULTS = {
+    "defect_rate"             : 0.5,
+    "interposer_defect_rate"  : 0.5,
+    "cmos_epa"                : 0.2,     # drawn independently per process node
+    "pic_process_energy"      : 0.2,
+    "bonding_yield"           : 0.01,    # capped at 1
+    "ci_fab"                  : 0.25,
+    "ci_op"                   : 0.25,
+    "energy_per_inf"          : 0.0,
+}
+MC_METRICS = ["ecf", "ocf", "cf"]
+
+
+def _triangular(rng, nominal, spread, size, upper=None, left=None, right=None):
+    left = nominal * (1 - spread) if left is None else left
+    right = nominal * (1 + spread) if right is None else right
+    if upper is not None:
+        right = min(right, upper)
+    if right <= left:
+        return np.full(size, float(nominal))
+    return rng.triangular(left, nominal, right, size)
+
+
+# ------------------------ Model description ----------------------------
+
+def build_mc_model(arch_file, verbose=False):
+    # plain-data description of an architecture for the array evaluation
+    chiplet_groups, packager, _ = parse_arch_groups(load_arch(arch_file), verbose=verbose)
+
+    if packager.package_type == "3D" and (packager.stack != (pk.StackTier(),) or any(c.tier for c, _ in chiplet_groups)):
+        raise ValueError("Monte Carlo sampling of multi-tier 3D stacks is not supported (remove 'stack'/'tier').")
+    if any(c.yield_model is not None for c, _ in chiplet_groups):
+        raise ValueError("Monte Carlo sampling uses the default Poisson yield (remove 'yield').")
+    model = {"package": packager.package_type, "groups": [], "interposer_area": 0, "num_if": 0}
+    for chiplet, count in chiplet_groups:
+        entry = {"type": chiplet.chiplet_type, "tech": chiplet.tech_node, "count": count}
+        if chiplet.chiplet_type == "dram":
+            entry["ecf"] = chiplet.evaluate(EvalContext()).ecf  # no CI dependence
+        else:
+            entry["area"] = chiplet.area
+            entry["actuation_type"] = getattr(chiplet, "actuation_type", None)
+        model["groups"].append(entry)
+
+    logic_areas_mm2 = [(g["area"]*100, g["count"]) for g in model["groups"] if g["type"] != "dram"]
+    if model["package"] != "monolithic" and len(logic_areas_mm2) > 0:
+        floorplan = floorplan_interposer_groups(logic_areas_mm2)
+        model["interposer_area"] = floorplan.area_cm2
+        model["num_if"] = floorplan.num_if
+    return model
+
+
+def _needed_nodes(model):
+    nodes = {pk.INTERPOSER_NODE, pk.EMIB_NODE}
+    for group in model["groups"]:
+        if group["type"] == "cmos-logic":
+            nodes.add(group["tech"])
+    return sorted(nodes)
+
+
+# ------------------------ Sampling ----------------------------
+
+def draw_samples(rng, size, model, context, energy_per_inf, uncertainty):
+    samples = {
+        "defect_rate"   : _triangular(rng, context.defect_rate, uncertainty["defect_rate"], size),
+        "bonding_yield" : _triangular(rng, context.bonding_yield, uncertainty["bonding_yield"], size, upper=1.0),
+        "ci_fab"        : _triangular(rng, context.ci_fab, uncertainty["ci_fab"], size),
+        "ci_op"         : _triangular(rng, context.ci_op, uncertainty["ci_op"], size),
+        "epa_scale"     : {},
+    }
+    if energy_per_inf is not None:
+        samples["energy_per_inf"] = _triangular(rng, energy_per_inf, uncertainty["energy_per_inf"], size)
+    for node in _needed_nodes(model):
+        samples["epa_scale"][node] = _triangular(rng, 1.0, uncertainty["cmos_epa"], size)
+
+    # PIC EPA scales with the total energy/wafer of the process flow
+    steps = get_table("pic_process_energy")
+    total = np.zeros(size)
+    for step in steps:
+        total += _triangular(rng, step["avg"], uncertainty["pic_process_energy"], size, left=step["min"], right=step["max"])
+    samples["pic_epa_scale"] = total / sum(step["avg"] for step in steps)
+    # drawn last, so the samples above do not depend on it
+    samples["interposer_defect_rate"] = _triangular(rng, context.interposer_defect_rate,
+                                                    uncertainty["interposer_defect_rate"], size)
+    return samples
+
+
+# ------------------------ Array evaluation ----------------------------
+
+def _logic_ecf(chiplet_type, tech_node, actuation_type, area, samples, ghg_abatement=95,
+               cpa_scaling=1, fab_yield=None, defect_rate=None):
+    # array form of CMOS_logic_chiplet / PIC_logic_chiplet.get_manufacturing_carbon
+    gpa_config = get_gpa_table(ghg_abatement)
+    materials_config = get_table("materials")
+    if chiplet_type == "cmos-logic":
+        key = node_key(tech_node)
+        epa = get_table("cmos_epa")[key] * samples["epa_scale"][tech_node]
+        if defect_rate is None:
+            defect_rate = samples["defect_rate"]
+    else:
+        key = node_key(PIC_CMOS_EQUIV_NODE)
+        epa = get_table("pic_epa")[actuation_type] * samples["pic_epa_scale"]
+        defect_rate = samples["defect_rate"] * PIC_SENSITIVE_AREA
+
+    carbon_per_area = (samples["ci_fab"] * epa + gpa_config[key] + materials_config[key]) * cpa_scaling
+    if fab_yield is None:
+        fab_yield = np.exp(-area * defect_rate)
+    return carbon_per_area * area / fab_yield
+
+
+def evaluate_samples(model, samples, context):
+    # returns ECF per sample (array); mirrors Packager.evaluate
+    ghg_abatement = context.ghg_abatement
+    ecf = 0.0
+    logic_groups = []
+    for group in model["groups"]:
+        if group["type"] == "dram":
+            ecf = ecf + group["ecf"] * group["count"]
+        else:
+            ecf = ecf + group["count"] * _logic_ecf(group["type"], group["tech"], group["actuation_type"],
+                                                    group["area"], samples, ghg_abatement)
+            logic_groups.append(group)
+
+    package_type = model["package"]
+    bonding_yield = samples["bonding_yield"]
+    num_chiplets = sum(g["count"] for g in logic_groups)
+    beol_feol_config = get_table("beol_feol_scaling")
+
+    if package_type == "monolithic":
+        return ecf
+
+    interposer_area = model["interposer_area"]
+    interposer_carbon = _logic_ecf(pk.INTERPOSER_TYPE, pk.INTERPOSER_NODE, None, interposer_area, samples,
+                                   cpa_scaling=beol_feol_config[node_key(pk.INTERPOSER_NODE)],
+                                   ghg_abatement=ghg_abatement,
+                                   defect_rate=samples["interposer_defect_rate"])
+    if package_type == "3D":
+        packaging_carbon = 0.0
+        for g in logic_groups:
+            area_3d = pk.get_3d_area(g["area"])
+            carbon_2d = _logic_ecf(g["type"], g["tech"], g["actuation_type"], g["area"], samples, ghg_abatement)
+            carbon_3d = _logic_ecf(g["type"], g["tech"], g["actuation_type"], area_3d, samples, ghg_abatement)
+            packaging_carbon = packaging_carbon + g["count"] * (carbon_3d - carbon_2d)
+        packaging_carbon = packaging_carbon / bonding_yield**num_chiplets
+    elif package_type == "2.5D-passive":
+        packaging_carbon = interposer_carbon / bonding_yield
+    elif package_type == "2.5D-active":
+        router_carbon = interposer_carbon * (pk.ROUTER_AREA * num_chiplets) / np.where(interposer_area > 0, interposer_area, 1.0)
+        packaging_carbon = (interposer_carbon - router_carbon) / bonding_yield
+    elif package_type == "RDL":
+        packaging_carbon = interposer_carbon * pk.RDL_LAYERS / pk.NUM_BEOL / bonding_yield
+    elif package_type == "EMIB":
+        emib_carbon = _logic_ecf("cmos-logic", pk.EMIB_NODE, None, pk.EMIB_AREA, samples, ghg_abatement,
+                                 cpa_scaling=beol_feol_config[node_key(pk.EMIB_NODE)], fab_yield=bonding_yield)
+        packaging_carbon = emib_carbon * model["num_if"] / bonding_yield
+    else:
+        packaging_carbon = pk.DEFAULT_PACKAGING_CARBON
+    return ecf + packaging_carbon
+
+
+def run_block(model, seed_seq, size, context, energy_per_inf, uncertainty):
+    rng = np.random.default_rng(seed_seq)
+    samples = draw_samples(rng, size, model, context, energy_per_inf, uncertainty)
+    ecf = np.broadcast_to(evaluate_samples(model, samples, context), (size,))
+
+    summaries = {m: StreamingSummary() for m in MC_METRICS}
+    summaries["ecf"].add(ecf)
+    if energy_per_inf is not None:
+        ocf = get_operational_terms(samples["energy_per_inf"], samples["ci_op"],
+                                    context.num_inf_per_day, context.lifetime_days)[-1]
+        summaries["ocf"].add(ocf)
+        summaries["cf"].add(ecf + ocf)
+    return summaries
+
+
+# ------------------------ Driver ----------------------------
+
+def run_monte_carlo(arch_file, energy_per_inf=None, num_samples=1000000, seed=0, jobs=1, block_size=100000,
+                    context=None, uncertainty=None, verbose=False):
+    """
+    Monte Carlo estimate of ECF (and OCF/CF when energy_per_inf is given).
+
+    Parameters:
+        arch_file (str): Path to architecture JSON file.
+        energy_per_inf (float): Nominal energy per inference in joules (None: ECF only).
+        num_samples (int): Number of samples.
+        seed (int): Seed for reproducible sampling.
+        jobs (int): Worker processes; blocks of samples are spread over them.
+        block_size (int): Samples evaluated together as one array.
+        context (EvalContext): Nominal scenario (CI values, defect rate, bonding yield, lifetime).
+        uncertainty (dict): Overrides of UNCERTAINTY_DEFAULTS (relative half-widths).
+        verbose (bool): Print progress.
+
+    Returns:
+        dict: Per metric ("ecf", "ocf", "cf") StreamingSummary, plus "seconds".
+    """
+    log_key = "montecarlo"
+    if context is None:
+        context = EvalContext()
+    spreads = dict(UNCERTAINTY_DEFAULTS)
+    if uncertainty:
+        unknown = set(uncertainty) - set(UNCERTAINTY_DEFAULTS)
+        if unknown:
+            raise ValueError("Unknown uncertain inputs {} (use {}).".format(sorted(unknown), list(UNCERTAINTY_DEFAULTS)))
+        spreads.update(uncertainty)
+
+    model = build_mc_model(arch_file)
+    num_blocks = (num_samples + block_size - 1) // block_size
+    seed_seqs = np.random.SeedSequence(seed).spawn(num_blocks)
+    block_args = [(model, seed_seqs[i], min(block_size, num_samples - i*block_size), context,
+                   energy_per_inf, spreads) for i in range(num_blocks)]
+
+    if verbose:
+        print("INFO {} \t {} samples in {} block(s) on {} worker(s)...".format(log_key, num_samples, num_blocks, jobs))
+
+    start = time.perf_counter()
+    results = {m: StreamingSummary() for m in MC_METRICS}
+    if jobs == 1:
+        for args in block_args:
+            for m, summary in run_block(*args).items():
+                results[m].merge(summary)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            pending = deque()
+            for args in block_args:
+                pending.append(pool.submit(run_block, *args))
+                if len(pending) >= 2 * jobs:
+                    for m, summary in pending.popleft().result().items():
+                        results[m].merge(summary)
+            while pending:
+                for m, summary in pending.popleft().result().items():
+                    results[m].merge(summary)
+    results["seconds"] = time.perf_counter() - start
+
+    if verbose:
+        print("INFO {} \t done in {:.2f} s ({:.0f} samples/s)".format(log_key, results["seconds"], num_samples / results["seconds"]))
+    return results
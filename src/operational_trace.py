@@ -0,0 +1,197 @@
+import csv
+import itertools
+from array import array
+
+import numpy as np
+
+from context import EvalContext
+from data_store import get_table
+from results import OperationalTraceResult
+
+
+# ------------------------ Time-series OCF ----------------------------
+# OCF = sum over time steps of energy/inference (kWh) x inferences in the step
+# x grid carbon intensity (gCO2/kWh) in the step. Steps are uniform
+# (step_hours, default hourly) and the lifetime is covered by
+# lifetime_days*24/step_hours steps, processed in chunks so that traces of
+# millions of points never need more than chunk_size values in memory.
+#
+# Traces:
+#   - CI trace       gCO2/kWh per step,
+#   - workload trace inferences per step.
+# Both are repeated cyclically when shorter than the lifetime (e.g. one year
+# of hourly CI over a 5-year lifetime). Missing CI values (NaN or empty CSV
+# cells) fall back to the baseline CI: the location's value from
+# carbon_intensity/location.json, or context.ci_op without a location.
+# Without a CI trace the baseline is used throughout; missing workload values
+# fall back to num_inf_per_day spread evenly over the day.
+
+CHUNK_SIZE = 1 << 16
+BINARY_DTYPE = "float64"
+
+
+def load_trace(source, column=None, dtype=BINARY_DTYPE):
+    """
+    Load a trace as a 1-D float array.
+
+    Parameters:
+        source (str or array): Array-like, .csv file, .npy file (memory-mapped)
+            or raw binary file of dtype values (memory-mapped).
+        column (str or int): CSV column name or index (default: last column).
+        dtype (str): Element type of raw binary files.
+
+    Returns:
+        ndarray: Trace values (a read-only memmap for binary files).
+    """
+    if not isinstance(source, str):
+        trace = np.asarray(source, dtype=np.float64)
+    elif source.endswith(".csv"):
+        trace = _load_csv_trace(source, column)
+    elif source.endswith(".npy"):
+        trace = np.load(source, mmap_mode="r")
+    else:
+        trace = np.memmap(source, dtype=dtype, mode="r")
+
+    if trace.ndim != 1 or len(trace) == 0:
+        raise ValueError("Trace {} must be a non-empty 1-D series.".format(source if isinstance(source, str) else ""))
+    return trace
+
+
+def _load_csv_trace(csv_file, column):
+    values = array("d")
+    with open(csv_file, 'r', newline='') as f:
+        reader = csv.reader(f)
+        first = next(reader, None)
+        if first is None:
+            raise ValueError("Trace file {} is empty.".format(csv_file))
+        has_header = not _is_number(first[-1] if column is None or isinstance(column, str) else first[column])
+        if isinstance(column, str):
+            if not has_header or column not in first:
+                raise ValueError("Trace file {} has no column '{}'.".format(csv_file, column))
+            index = first.index(column)
+        else:
+            index = -1 if column is None else column
+        rows = reader if has_header else itertools.chain([first], reader)
+        for row in rows:
+            if not row:
+                continue
+            cell = row[index].strip()
+            values.append(float(cell) if cell else np.nan)
+    return np.frombuffer(values, dtype=np.float64)
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _take(trace, start, stop):
+    # trace[start:stop] with the trace repeated cyclically
+    n = len(trace)
+    start_mod = start % n
+    if start_mod + (stop - start) <= n:
+        return np.asarray(trace[start_mod:start_mod + stop - start], dtype=np.float64)
+    parts = []
+    while start < stop:
+        start_mod = start % n
+        length = min(n - start_mod, stop - start)
+        parts.append(np.asarray(trace[start_mod:start_mod + length], dtype=np.float64))
+        start += length
+    return np.concatenate(parts)
+
+
+def _fill(values, baseline):
+    # missing values (NaN) -> baseline; negative values are rejected
+    if np.isnan(values).any():
+        values = np.where(np.isnan(values), baseline, values)
+    if (values < 0).any():
+        raise ValueError("Traces must not contain negative CI or workload values.")
+    return values
+
+
+def get_baseline_ci(location=None, context=None):
+    # gCO2/kWh used where no CI trace value is available
+    if location is None:
+        return (context if context is not None else EvalContext()).ci_op
+    ci_location = get_table("ci_location")
+    if location not in ci_location:
+        raise ValueError("Unknown location '{}' (use one of {}).".format(location, ", ".join(ci_location)))
+    return ci_location[location]
+
+
+# ------------------------ Integration ----------------------------
+
+def run_operational_trace(energy_per_inf, ci_trace=None, workload_trace=None, location=None, context=None,
+                          lifetime_days=None, num_inf_per_day=None, step_hours=1.0, report_every_hours=24,
+                          chunk_size=CHUNK_SIZE, cumulative_out=None):
+    """
+    Integrate OCF over the lifetime from CI and workload traces.
+
+    Parameters:
+        energy_per_inf (float): Energy per inference in joules.
+        ci_trace (str or array): CI trace in gCO2/kWh per step (see load_trace()).
+        workload_trace (str or array): Inferences per step (see load_trace()).
+        location (str): Baseline CI from carbon_intensity/location.json (default: context.ci_op).
+        context (EvalContext): Scenario (ci_op, num_inf_per_day, lifetime_days defaults).
+        lifetime_days (float): Lifetime (default: context.lifetime_days).
+        num_inf_per_day (float): Constant workload where no workload trace value is available
+            (default: context.num_inf_per_day).
+        step_hours (float): Duration of one trace step in hours.
+        report_every_hours (float): Spacing of the returned cumulative series.
+        chunk_size (int): Steps processed per chunk.
+        cumulative_out (str): Optional .npy file receiving the cumulative OCF of every step.
+
+    Returns:
+        OperationalTraceResult: Total, energy, effective CI and cumulative OCF over time.
+    """
+    if context is None:
+        context = EvalContext()
+    if lifetime_days is None:
+        lifetime_days = context.lifetime_days
+    if num_inf_per_day is None:
+        num_inf_per_day = context.num_inf_per_day
+    if step_hours <= 0 or lifetime_days <= 0:
+        raise ValueError("step_hours and lifetime_days must be positive.")
+
+    num_steps = int(round(lifetime_days * 24 / step_hours))
+    report_every = max(1, int(round(report_every_hours / step_hours)))
+    energy_per_inf_kWh = energy_per_inf / (1000 * 3600)  # J -> kWh
+    baseline_ci = get_baseline_ci(location, context)
+    baseline_inf = num_inf_per_day * step_hours / 24
+    ci = load_trace(ci_trace) if ci_trace is not None else None
+    workload = load_trace(workload_trace) if workload_trace is not None else None
+
+    cumulative_all = None
+    if cumulative_out is not None:
+        cumulative_all = np.lib.format.open_memmap(cumulative_out, mode="w+", dtype=np.float64, shape=(num_steps,))
+
+    total, energy_kWh = 0.0, 0.0
+    reported = []
+    for start in range(0, num_steps, chunk_size):
+        stop = min(start + chunk_size, num_steps)
+        inf = np.full(stop - start, baseline_inf) if workload is None else _fill(_take(workload, start, stop), baseline_inf)
+        ci_chunk = baseline_ci if ci is None else _fill(_take(ci, start, stop), baseline_ci)
+        step_energy = energy_per_inf_kWh * inf
+        step_carbon = step_energy * ci_chunk
+
+        cumulative = total + np.cumsum(step_carbon)
+        reported.append(cumulative[(-start - 1) % report_every::report_every])
+        if cumulative_all is not None:
+            cumulative_all[start:stop] = cumulative
+        total = float(cumulative[-1])
+        energy_kWh += float(np.sum(step_energy))
+
+    if cumulative_all is not None:
+        cumulative_all.flush()
+    cumulative = np.concatenate(reported) if reported else np.zeros(0)
+    cumulative_days = np.arange(1, len(cumulative) + 1) * report_every * step_hours / 24
+    if num_steps % report_every != 0:
+        # always end the series at the end of the lifetime
+        cumulative = np.append(cumulative, total)
+        cumulative_days = np.append(cumulative_days, num_steps * step_hours / 24)
+
+    return OperationalTraceResult(total, energy_kWh, total / energy_kWh if energy_kWh > 0 else baseline_ci,
+                                  num_steps, step_hours, cumulative_days, cumulative)
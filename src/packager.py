@@ -1,17 +1,141 @@
+import math
+from dataclasses import dataclass
+
 import numpy as np
-import json
-import os
+from chiplet import group_chiplets
 from chiplet_models.cmos_logic_chiplet import CMOS_logic_chiplet
+from chiplet_models.pic_logic_chiplet import PIC_CMOS_EQUIV_NODE, PIC_SENSITIVE_AREA
+from context import EvalContext
+from data_store import get_table, node_key
+from floorplan import floorplan_interposer_groups
+from timing import NULL_TIMER
+from results import PackagingResult
+from yields import EDGE_EXCLUSION, NB_CLUSTERING, YieldModel, get_die_ecf, get_yield
+
+
+# packaging model parameters (bonding yield is part of the EvalContext)
+INTERPOSER_NODE = 65
+INTERPOSER_TYPE = "cmos-logic"
+TSV_PITCH = 0.025               # cm
+TSV_SIZE = 0.005                # cm
+ROUTER_AREA = 4.47/100          # cm2 per chiplet, 2.5D-active ## Ask about source of it
+RDL_LAYERS = 6
+NUM_BEOL = 8
+EMIB_AREA = 5*5/100             # cm2
+EMIB_NODE = 20
+DEFAULT_PACKAGING_CARBON = 150  # grams (ACT)
+BONDING_TYPES = ["microbump", "hybrid"]
+HYBRID_BOND_DEFECT_RATE = 0.05  # per cm2 of bonded die area (particles/voids at the Cu-Cu interface)
+
+
+# ------------------------ 3D stacks ----------------------------
+# A 3D package is a stack of tiers. Every logic chiplet sits in a tier
+# ("tier" in its architecture entry, default 0) and carries the TSVs of that
+# tier. The optional "stack" list of the architecture configures the tiers:
+#   "stack": [{"tsv_pitch": 0.025, "tsv_size": 0.005},
+#             {"tsv_pitch": 0.001, "tsv_size": 0.0005, "bonding": "hybrid"}]
+# Fields per tier (cm; all optional):
+#   - tsv_pitch, tsv_size: TSV grid of the tier (tsv_size 0: no TSVs, e.g. the top die)
+#   - bonding: "microbump" (yield bond_yield, default the context's bonding_yield)
+#     or "hybrid" (yield bond_yield x exp(-area x bond_defect_rate) per die)
+# Without a stack, all chiplets share one microbump tier with TSV_PITCH/TSV_SIZE,
+# which is the original single-overhead model.
+
+@dataclass(frozen=True)
+class StackTier:
+    tsv_pitch: float = TSV_PITCH
+    tsv_size: float = TSV_SIZE
+    bonding: str = "microbump"
+    bond_yield: float = None            # None: context.bonding_yield (microbump), 1 (hybrid)
+    bond_defect_rate: float = None      # None: 0 (microbump), HYBRID_BOND_DEFECT_RATE (hybrid)
+
+
+def parse_stack(stack):
+    # tuple of StackTier from the "stack" list of an architecture (None: one default tier)
+    if stack is None:
+        return (StackTier(),)
+    if not isinstance(stack, list) or not stack:
+        raise ValueError("3D 'stack' must be a non-empty list of tiers.")
+    tiers = []
+    for i, tier in enumerate(stack):
+        unknown = set(tier) - set(StackTier.__dataclass_fields__)
+        if unknown:
+            raise ValueError("Unknown field(s) {} in stack tier {}.".format(", ".join(sorted(unknown)), i))
+        tier = StackTier(**tier)
+        if tier.bonding not in BONDING_TYPES:
+            raise ValueError("Unsupported bonding '{}' in stack tier {} (use {}).".format(tier.bonding, i, ", ".join(BONDING_TYPES)))
+        if tier.tsv_pitch <= 0 or tier.tsv_size < 0 or tier.tsv_size > tier.tsv_pitch:
+            raise ValueError("Stack tier {} needs tsv_pitch > 0 and 0 <= tsv_size <= tsv_pitch.".format(i))
+        tiers.append(tier)
+    return tuple(tiers)
+
+
+def get_3d_packaging_carbon(carbon_per_area, areas, counts, defect_rate=0.1, sensitive_area=1.0, tsv_pitch=TSV_PITCH,
+                            tsv_size=TSV_SIZE, bond_yield=0.99, bond_defect_rate=0.0, exact=True, yield_model="poisson",
+                            clustering=NB_CLUSTERING, wafer_diameter=np.nan, edge_exclusion=EDGE_EXCLUSION):
+    """
+    Vectorized packaging carbon of 3D stacks: ECF of the TSV area overhead / stack bonding yield.
+
+    The last axis indexes the chiplet groups of one stack, leading axes index
+    stack configurations; all arguments broadcast against each other. The
+    overhead of a group is ECF(area with TSVs) - ECF(area) from the yield
+    formula of the chiplet models (Poisson: carbon_per_area x a / exp(-a x s x D)),
+    so chiplets are not evaluated a second time. The stack yield is the product
+    over all dies of bond_yield x exp(-area with TSVs x bond_defect_rate).
+
+    Parameters:
+        carbon_per_area (array of float): Carbon per area of each group's chiplet (g/cm2).
+        areas (array of float): Die area without TSVs (cm2).
+        counts (array of int): Chiplets per group.
+        defect_rate (array of float): Defect density per cm2.
+        sensitive_area (array of float): Defect-sensitive fraction of the area (1, or 0.2 for photonics).
+        tsv_pitch, tsv_size (array of float): TSV grid of each group's tier (cm).
+        bond_yield (array of float): Per-die bonding yield without area dependence.
+        bond_defect_rate (array of float): Defects per cm2 of bonded area (hybrid bonding).
+        exact (bool): Match the scalar chiplet models bit for bit (slower exp).
+        yield_model, clustering, wafer_diameter, edge_exclusion: Die yield and wafer
+            model of each group (see yields.py; default Poisson without edge loss).
+
+    Returns:
+        ndarray: Packaging carbon (g) per stack configuration (shape of the leading axes).
+    """
+    carbon_per_area, areas, counts, defect_rate, sensitive_area, tsv_pitch, tsv_size, bond_yield, bond_defect_rate = \
+        np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (
+            carbon_per_area, areas, counts, defect_rate, sensitive_area, tsv_pitch, tsv_size, bond_yield, bond_defect_rate)))
+    exp = _exact_exp if exact else np.exp
+    areas_3d = get_3d_area(areas, tsv_pitch, tsv_size)
+    overhead = np.sum(counts * get_tsv_overhead_ecf(carbon_per_area, areas, defect_rate, sensitive_area, tsv_pitch,
+                                                    tsv_size, exact=exact, yield_model=yield_model, clustering=clustering,
+                                                    wafer_diameter=wafer_diameter, edge_exclusion=edge_exclusion), axis=-1)
+
+    # bonding yield of the stack; a stack of identical bonds is bond_yield**N as in the single-tier model
+    die_yield = bond_yield * exp(-areas_3d * bond_defect_rate)
+    uniform = np.all(die_yield == die_yield[..., :1], axis=-1) if die_yield.shape[-1] else True
+    first = die_yield[..., 0] if die_yield.shape[-1] else 1.0
+    stack_yield = np.where(uniform, first ** np.sum(counts, axis=-1).astype(np.int64), np.prod(die_yield ** counts, axis=-1))
+    return overhead / stack_yield
 
 
-curr_file_path = os.path.realpath(__file__)
-curr_dir = os.path.dirname(curr_file_path)
-data_dir = curr_dir + "/data/"
+def get_tsv_overhead_ecf(carbon_per_area, areas, defect_rate=0.1, sensitive_area=1.0, tsv_pitch=TSV_PITCH,
+                        tsv_size=TSV_SIZE, exact=True, yield_model="poisson", clustering=NB_CLUSTERING,
+                        wafer_diameter=np.nan, edge_exclusion=EDGE_EXCLUSION):
+    # ECF(area with TSVs) - ECF(area) of one die, elementwise (arrays broadcast)
+    areas = np.asarray(areas, dtype=np.float64)
+    areas_3d = get_3d_area(areas, tsv_pitch, tsv_size)
+    ecf = [get_die_ecf(carbon_per_area, a, get_yield(yield_model, a, defect_rate, sensitive_area, clustering, exact),
+                       wafer_diameter, edge_exclusion) for a in (areas, areas_3d)]
+    return ecf[1] - ecf[0]
+
+
+def _exact_exp(x):
+    # math.exp per element keeps the results bit-identical to the scalar chiplet models
+    return np.fromiter(map(math.exp, x.ravel().tolist()), dtype=np.float64, count=x.size).reshape(x.shape)
 
 
 class Packager:
-    def __init__(self, package_type, verbose=False):
+    def __init__(self, package_type, stack=None, verbose=False):
       self.package_type = package_type
+      self.stack = parse_stack(stack)   # tiers of a 3D package
       self.log_key = "packegar"
       
       if verbose:
@@ -22,113 +146,155 @@ class Packager:
     
     
     def get_packaging_carbon(self, _chiplets, ci_fab, verbose=False):
+      return self.evaluate(group_chiplets(_chiplets), EvalContext(ci_fab=ci_fab), verbose=verbose).carbon
+    
+    
+    def evaluate(self, chiplet_groups, context, verbose=False, timer=NULL_TIMER):
+      # chiplet_groups is [(chiplet, count)]; each unique chiplet is evaluated once
+      # and scaled by its count. Side-effect free: chiplets are only read.
+      interposer_area, interposer_carbon, num_if, floorplan = 0, 0, 0, None
       ## TODO -- need to decide on this
       if self.package_type == "monolithic": 
             packaging_carbon = 0
       else:
-          chiplets = []
-          for ch in _chiplets:
-              if ch.chiplet_type != "dram":
-                  chiplets.append(ch)
+          groups = get_logic_groups(chiplet_groups)
+          chiplets = [ch for ch, _ in groups]
+          counts = [count for _, count in groups]
           
-          bonding_yield = 0.99
-          interposer_node = 65
-          interposer_type = "cmos-logic"
+          # calculate interposer area (same floorplan as recursive_split, memoized)
+          with timer.stage("floorplan"):
+              floorplan = floorplan_interposer_groups([(c.area*100, count) for c, count in groups])
+          num_if = floorplan.num_if
+          interposer_area = floorplan.area_cm2
+          interposer_carbon = self.get_interposer_carbon(interposer_area, context)
           
-          num_chiplets = len(chiplets)
-          areas = [c.area for c in chiplets]
-          
-          areas_mm2 = [c.area*100 for c in chiplets]
-          #print(areas_mm2)
-          # calculate interposer area
-          interposer_area, num_if = recursive_split(areas_mm2)
-          num_if = int(np.ceil(num_if))
-          interposer_area = np.prod(interposer_area)/100
-             
-          # get scaling factor of metal layers
-          with open(data_dir+"cmos_logic/beol_feol_scaling.json", 'r') as f:
-              beol_feol_config = json.load(f)      
-          process_node_key = str(interposer_node)+"nm"
-          scaling_factor = beol_feol_config[process_node_key]
+          stack_carbon, emib_carbon = None, None
+          if self.package_type == "3D":
+              stack_carbon = self.get_stack_carbon(groups, [c.evaluate(context) for c in chiplets], context)
+          elif self.package_type == "EMIB":
+              emib_carbon = self.get_emib_carbon(context, verbose=verbose)
           
-          # build an interposer
-          interposer_chip = CMOS_logic_chiplet(interposer_type, interposer_node, interposer_area, is_interposer=True, verbose=False)
-          interposer_chip.set_cpa_scaling_factor(scaling_factor)
-          interposer_carbon = interposer_chip.get_manufacturing_carbon(ci_fab, verbose=False)
+          packaging_carbon = self.combine(context, counts, interposer_area, interposer_carbon, num_if,
+                                          stack_carbon=stack_carbon, emib_carbon=emib_carbon, verbose=verbose)
+      
+      if verbose:
+          print()
+          print("INFO", self.log_key, "\t", "Packaging carbon:", round(packaging_carbon, 2), "g")
+      return PackagingResult(self.package_type, packaging_carbon, interposer_area=interposer_area,
+                             interposer_carbon=interposer_carbon, num_if=num_if, floorplan=floorplan) # grams
     
-              
-          if self.package_type == "3D":
-              tsv_pitch=0.025
-              tsv_size=0.005
-              dims = np.sqrt(np.array(areas, dtype=np.float64))
-              num_tsv_1d = np.floor(dims/tsv_pitch)
-              overhead_3d = (num_tsv_1d**2) * (tsv_size**2)
-              areas_3d = areas + overhead_3d
-              
-              carbon_2d = [c.get_manufacturing_carbon(ci_fab) for c in chiplets]
-              
-              for i in range (num_chiplets):
-                  chiplets[i].set_area(areas_3d[i])
-                               
-              carbon_3d = [c.get_manufacturing_carbon(ci_fab) for c in chiplets]
-              
-              # set back the original area
-              for i in range (num_chiplets):
-                  chiplets[i].set_area(areas[i])
     
-              packaging_carbon = np.sum(np.array(carbon_3d)-np.array(carbon_2d)) 
-              packaging_carbon /= (bonding_yield**num_chiplets)
+    # The steps of evaluate(), also used on their own by the incremental
+    # evaluation in design.py.
+    
+    def get_interposer_carbon(self, interposer_area, context):
+      # get scaling factor of metal layers
+      beol_feol_config = get_table("beol_feol_scaling")
+      scaling_factor = beol_feol_config[node_key(INTERPOSER_NODE)]
+      
+      # build an interposer
+      interposer_chip = CMOS_logic_chiplet(INTERPOSER_TYPE, INTERPOSER_NODE, interposer_area, is_interposer=True, verbose=False)
+      interposer_chip.set_cpa_scaling_factor(scaling_factor)
+      return interposer_chip.evaluate(context, verbose=False).ecf
+    
+    
+    def get_stack_carbon(self, logic_groups, results, context):
+      # 3D packaging carbon of the logic (chiplet, count) groups from their 2D
+      # ChipletResults (closed form, see get_3d_packaging_carbon())
+      tiers = []
+      for chiplet, _ in logic_groups:
+          if not 0 <= chiplet.tier < len(self.stack):
+              raise ValueError("{} is in tier {}, but the stack has {} tier(s).".format(chiplet, chiplet.tier, len(self.stack)))
+          tiers.append(self.stack[chiplet.tier])
+      hybrid = [t.bonding == "hybrid" for t in tiers]
+      yield_args = {"defect_rate": context.defect_rate}
+      if any(c.yield_model is not None for c, _ in logic_groups):
+          yield_models = [c.yield_model or YieldModel() for c, _ in logic_groups]
+          yield_args = {
+              "defect_rate": [m.get_defect_rate(PIC_CMOS_EQUIV_NODE if c.chiplet_type == "pic-logic" else c.tech_node, context)
+                              for m, (c, _) in zip(yield_models, logic_groups)],
+              "yield_model": [m.model for m in yield_models], "clustering": [m.clustering for m in yield_models],
+              "wafer_diameter": [np.nan if m.wafer_diameter is None else m.wafer_diameter for m in yield_models],
+              "edge_exclusion": [m.edge_exclusion for m in yield_models]}
+      return float(get_3d_packaging_carbon(
+          [r.carbon_per_area for r in results], [c.area for c, _ in logic_groups], [n for _, n in logic_groups],
+          sensitive_area=[PIC_SENSITIVE_AREA if c.chiplet_type == "pic-logic" else 1.0 for c, _ in logic_groups],
+          tsv_pitch=[t.tsv_pitch for t in tiers], tsv_size=[t.tsv_size for t in tiers],
+          bond_yield=[t.bond_yield if t.bond_yield is not None else 1.0 if h else context.bonding_yield
+                      for t, h in zip(tiers, hybrid)],
+          bond_defect_rate=[t.bond_defect_rate if t.bond_defect_rate is not None else HYBRID_BOND_DEFECT_RATE if h else 0.0
+                            for t, h in zip(tiers, hybrid)], **yield_args))
+    
+    
+    def get_emib_carbon(self, context, verbose=False):
+      # carbon of one EMIB bridge
+      emib_chip = CMOS_logic_chiplet("cmos-logic", EMIB_NODE, EMIB_AREA, verbose=False)
+      scaling_factor = get_table("beol_feol_scaling")[node_key(EMIB_NODE)]
+      emib_chip.set_cpa_scaling_factor(scaling_factor)
+      return emib_chip.evaluate(context, _yield=context.bonding_yield, verbose=verbose).ecf
+    
+    
+    def combine(self, context, counts, interposer_area, interposer_carbon, num_if, stack_carbon=None,
+                emib_carbon=None, verbose=False):
+      # packaging carbon of a non-monolithic package; counts follow get_logic_groups(),
+      # stack_carbon is the 3D packaging carbon from get_stack_carbon()
+      bonding_yield = context.bonding_yield
+      num_chiplets = int(np.sum(counts))
+      
+      if self.package_type == "3D":
+          packaging_carbon = stack_carbon
+        
+      
+      elif self.package_type == "2.5D-passive":
+          packaging_carbon = interposer_carbon
+          
+         # router_areas = [0.33/100] * num_chiplets
+          packaging_carbon /= bonding_yield
+          if verbose:
+              print("Interposer area {:.2f} cm2, carbon: {:.2f} g".format(interposer_area, interposer_carbon))
+            
             
+      elif self.package_type == "2.5D-active":
+          router_area = ROUTER_AREA * num_chiplets
           
-          elif self.package_type == "2.5D-passive":
-              packaging_carbon = interposer_carbon
+          # no logic chiplets: no interposer and no routers
+          router_carbon = interposer_carbon * router_area / interposer_area if interposer_area > 0 else 0.0
+          packaging_carbon = interposer_carbon-router_carbon
+          packaging_carbon /= bonding_yield
+          if verbose:
+              print("Interposer area {:.2f} cm2, carbon: {:.2f} g".format(interposer_area, interposer_carbon))
               
-             # router_areas = [0.33/100] * num_chiplets
-              packaging_carbon /= bonding_yield
-              if verbose:
-                  print("Interposer area {:.2f} cm2, carbon: {:.2f} g".format(interposer_area, interposer_carbon))
-                
-                
-          elif self.package_type == "2.5D-active":
-              router_area = 4.47/100 * num_chiplets ## Ask about source of it
               
-              router_carbon = interposer_carbon * router_area / interposer_area          
-              packaging_carbon = interposer_carbon-router_carbon
-              packaging_carbon /= bonding_yield
-              if verbose:
-                  print("Interposer area {:.2f} cm2, carbon: {:.2f} g".format(interposer_area, interposer_carbon))
-                  
-                  
-          elif self.package_type == "RDL": 
-              RDLLayers = 6
-              numBEOL = 8
-              packaging_carbon = interposer_carbon * RDLLayers/numBEOL
-              packaging_carbon /= bonding_yield
-              
-          elif self.package_type == "EMIB":
-              emib_area =  5*5/100
-              emib_chip = CMOS_logic_chiplet("cmos-logic", 20, emib_area, verbose=False)
-              
-              process_node_key = str(20)+"nm"
-              scaling_factor = beol_feol_config[process_node_key]
-              emib_chip.set_cpa_scaling_factor(scaling_factor)
-              
-              emib_carbon = emib_chip.get_manufacturing_carbon(ci_fab, _yield=bonding_yield, verbose=verbose)
-              packaging_carbon = emib_carbon * num_if
-              packaging_carbon /= bonding_yield
-             
-          else:
-              packaging_carbon = 150 # grams (ACT)
-      
-      if verbose:
-          print()
-          print("INFO", self.log_key, "\t", "Packaging carbon:", round(packaging_carbon, 2), "g")
-      return packaging_carbon # grams
+      elif self.package_type == "RDL": 
+          RDLLayers = RDL_LAYERS
+          numBEOL = NUM_BEOL
+          packaging_carbon = interposer_carbon * RDLLayers/numBEOL
+          packaging_carbon /= bonding_yield
+          
+      elif self.package_type == "EMIB":
+          packaging_carbon = emib_carbon * num_if
+          packaging_carbon /= bonding_yield
+         
+      else:
+          packaging_carbon = DEFAULT_PACKAGING_CARBON
+      return packaging_carbon
+
+
+def get_logic_groups(chiplet_groups):
+    # the (chiplet, count) groups placed on the interposer (DRAM is off-package)
+    return [(ch, count) for ch, count in chiplet_groups if ch.chiplet_type != "dram"]
+
+
+def get_3d_area(area, tsv_pitch=TSV_PITCH, tsv_size=TSV_SIZE):
+    # chiplet area (cm2) including the TSV overhead of 3D stacking (vectorized)
+    num_tsv_1d = np.floor(np.sqrt(np.float64(area))/tsv_pitch)
+    return area + (num_tsv_1d**2) * (tsv_size**2)
   
     
   
     
 ## from ECO-CHIP https://github.com/ASU-VDA-Lab/ECO-CHIP/blob/main/src/CO2_func.py #####
+## Reference implementation; the packager uses the equivalent floorplan_interposer() in floorplan.py
 
 def recursive_split(areas, axis=0, emib_pitch=10):
     sorted_areas = np.sort(areas[::-1])
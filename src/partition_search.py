@@ -0,0 +1,412 @@
+import json
+import math
+import os
+import time
+from collections import deque
+from dataclasses import fields
+
+from chiplet_models.cmos_logic_chiplet import CMOS_logic_chiplet
+from chiplet_models.pic_logic_chiplet import PIC_logic_chiplet
+from context import EvalContext
+from evaluate import evaluate_arch, get_operational_terms
+from floorplan import floorplan_interposer
+from packager import Packager, ROUTER_AREA, RDL_LAYERS, NUM_BEOL, DEFAULT_PACKAGING_CARBON, get_3d_area
+
+
+# ------------------------ Search spec ----------------------------
+# A search spec is a JSON object:
+#   {
+#     "logic_area": 8.0,                  (CMOS logic area to partition, cm2)
+#     "tech": {"7": 1.0, "14": 1.9},      (candidate nodes -> area factor; a list means factor 1)
+#     "area_step": 1.0,                   (split granularity in cm2; null: equal splits only)
+#     "max_chiplets": 8,                  (logic chiplets)
+#     "photonic_area": 2.0, "pic_chiplets": [1, 2], "actuation_type": "default",
+#     "packages": ["monolithic", "3D", "2.5D-passive", "2.5D-active", "RDL", "EMIB"],
+#     "min_chiplet_area": 0.1, "max_chiplet_area": 8.58,   (physical area limits, cm2)
+#     "max_ecf": null, "max_cf": null,
+#     "energy_per_inf": 1e-3,
+#     "energy_overhead": {"per_chiplet": 0.01, "package": {"2.5D-passive": 0.02}},
+#     "ci_fab": 820, ...                  (any EvalContext field)
+#   }
+# A candidate splits the logic area into k chiplets (equal parts, or parts in
+# multiples of area_step), assigns a node to each part, splits the photonic
+# area into equal PIC chiplets and picks a package. Monolithic candidates have
+# one logic die (and at most one photonic die). The energy per inference of a
+# candidate is energy_per_inf x (1 + per_chiplet x (chiplets - 1) + package
+# overhead); without energy_per_inf, CF = ECF.
+#
+# The result is the Pareto front of (ECF, CF, number of chiplets).
+#
+# Search. Candidates are grouped by (package, logic chiplets, PIC chiplets).
+# Inside a group the OCF and the chiplet count are fixed, so only the
+# candidate of lowest ECF can be on the front: each group is a single-objective
+# branch and bound, and groups are searched in parallel.
+#   - Group bound: the logic ECF is at least min(carbon/area) x area x
+#     exp(defect_rate x area / k) (the ECF of a die is convex in its area, so
+#     equal parts are cheapest), and the packaging carbon at least that of an
+#     interposer as large as the total chiplet area (a floorplan never covers
+#     less), of n-1 EMIB bridges, or 0 (3D).
+#   - Inside a group, parts (size and node) are chosen one by one; a partial
+#     candidate is bounded by the exact ECF of its parts (for 3D including
+#     their TSV overhead), the group bound for the remaining area and the
+#     packaging bound.
+# A group or partial candidate is dropped once its bound reaches the best ECF
+# found in the group, or the ECF at which the current front would dominate
+# it. The front is seeded with the first (most balanced) candidate of every
+# group, so the thresholds do not depend on the order groups finish in.
+# Complete candidates are costed from cached chiplet and packaging terms;
+# the winner of each group is re-evaluated with evaluate_arch().
+
+PACKAGE_TYPES = ["monolithic", "3D", "2.5D-passive", "2.5D-active", "RDL", "EMIB"]
+CONTEXT_FIELDS = [f.name for f in fields(EvalContext)]
+SEARCH_DEFAULTS = {"tech": [7], "area_step": None, "max_chiplets": 8, "photonic_area": 0.0, "pic_chiplets": [1],
+                   "actuation_type": "default", "packages": PACKAGE_TYPES, "min_chiplet_area": 0.0,
+                   "max_chiplet_area": None, "max_ecf": None, "max_cf": None, "energy_per_inf": None,
+                   "energy_overhead": {}}
+
+
+def load_search_spec(spec_file):
+    with open(spec_file, 'r') as json_file:
+        return normalize_search_spec(json.load(json_file))
+
+
+def normalize_search_spec(spec):
+    spec = dict(spec)
+    if "logic_area" not in spec or spec["logic_area"] <= 0:
+        raise ValueError("Search spec needs a positive logic_area (cm2).")
+    unknown = set(spec) - set(SEARCH_DEFAULTS) - set(CONTEXT_FIELDS) - {"logic_area"}
+    if unknown:
+        raise ValueError("Unknown search spec field(s): {}.".format(", ".join(sorted(unknown))))
+    for key, value in SEARCH_DEFAULTS.items():
+        spec.setdefault(key, value)
+
+    tech = spec["tech"]
+    spec["tech"] = {int(t): float(f) for t, f in tech.items()} if isinstance(tech, dict) else {int(t): 1.0 for t in tech}
+    unsupported = set(spec["packages"]) - set(PACKAGE_TYPES)
+    if unsupported:
+        raise ValueError("Unsupported package(s) {} (use {}).".format(", ".join(sorted(unsupported)), ", ".join(PACKAGE_TYPES)))
+    if spec["area_step"] is not None:
+        units = spec["logic_area"] / spec["area_step"]
+        if abs(units - round(units)) > 1e-9 * units:
+            raise ValueError("logic_area must be a multiple of area_step.")
+    if spec["photonic_area"] <= 0:
+        spec["pic_chiplets"] = [0]
+    return spec
+
+
+def get_search_context(spec, context=None):
+    base = context if context is not None else EvalContext()
+    return base.replace(**{k: spec[k] for k in CONTEXT_FIELDS if k in spec})
+
+
+# ------------------------ Candidate enumeration ----------------------------
+
+def _area_ok(spec, area):
+    return area >= spec["min_chiplet_area"] and (spec["max_chiplet_area"] is None or area <= spec["max_chiplet_area"])
+
+
+def iter_groups(spec):
+    for package in spec["packages"]:
+        for k in range(1, spec["max_chiplets"] + 1):
+            for m in spec["pic_chiplets"]:
+                if package == "monolithic" and (k > 1 or m > 1):
+                    continue
+                if m > 0 and not _area_ok(spec, spec["photonic_area"] / m):
+                    continue
+                yield package, k, m
+
+
+def build_candidate_arch(spec, package, parts, num_pic):
+    # parts is ((physical area, tech), ...) per logic chiplet
+    counts = {}
+    for area, tech in parts:
+        counts[(area, tech)] = counts.get((area, tech), 0) + 1
+    chiplets = [{"type": "cmos-logic", "tech": tech, "area": area, "num_chiplets": count}
+                for (area, tech), count in counts.items()]
+    if num_pic > 0:
+        chiplets.append({"type": "pic-logic", "tech": -1, "area": spec["photonic_area"] / num_pic,
+                         "actuation_type": spec["actuation_type"], "num_chiplets": num_pic})
+    return {"name": "search", "type": "search", "chiplets": chiplets, "package": package}
+
+
+# ------------------------ Bounds ----------------------------
+
+class _Bounds:
+    # closed-form and cached model terms shared by the candidates of one search
+    def __init__(self, spec, context):
+        self.spec, self.context = spec, context
+        self._ecf = {}
+        self._options = {}
+        self._packaging = {}
+        self._packagers = {p: Packager(p) for p in spec["packages"]}
+        # yield-free carbon per reference area of each node, and per interposer area
+        self.cpa = {t: CMOS_logic_chiplet("cmos-logic", t, 1.0).evaluate(context.replace(defect_rate=0)).ecf * f
+                    for t, f in spec["tech"].items()}
+        self.interposer_cpa = Packager("2.5D-passive").get_interposer_carbon(1.0, context.replace(interposer_defect_rate=0))
+        self.emib_ecf = Packager("EMIB").get_emib_carbon(context)
+
+    def chiplet_ecf(self, area, tech):
+        if (area, tech) not in self._ecf:
+            self._ecf[(area, tech)] = CMOS_logic_chiplet("cmos-logic", tech, area).evaluate(self.context).ecf
+        return self._ecf[(area, tech)]
+
+    def options(self, area, package, num_chiplets):
+        # [(ECF, physical area, tech)] of one part on each allowed node, cheapest first; for 3D
+        # the ECF includes the part's TSV overhead, which the packager adds per chiplet
+        key = (area, package, num_chiplets)
+        if key not in self._options:
+            options = []
+            for t, f in self.spec["tech"].items():
+                if not _area_ok(self.spec, area * f):
+                    continue
+                ecf = self.chiplet_ecf(area * f, t)
+                if package == "3D":
+                    ecf += (self.chiplet_ecf(get_3d_area(area * f), t) - ecf) / self.context.bonding_yield**num_chiplets
+                options.append((ecf, area * f, t))
+            self._options[key] = sorted(options)
+        return self._options[key]
+
+    def pic_ecf(self, num_pic):
+        if num_pic == 0:
+            return 0.0
+        if ("pic", num_pic) not in self._ecf:
+            chiplet = PIC_logic_chiplet("pic-logic", -1, self.spec["photonic_area"] / num_pic, act_type=self.spec["actuation_type"])
+            self._ecf[("pic", num_pic)] = chiplet.evaluate(self.context).ecf * num_pic
+        return self._ecf[("pic", num_pic)]
+
+    def pic_areas(self, num_pic):
+        return (self.spec["photonic_area"] / num_pic,) * num_pic if num_pic > 0 else ()
+
+    def interposer_ecf(self, area):
+        return self.interposer_cpa * area * math.exp(self.context.interposer_defect_rate * area)
+
+    def packaging(self, package, total_area, num_chiplets):
+        # lower bound of the packaging carbon for num_chiplets chiplets covering total_area cm2
+        # (3D: 0, the TSV overhead is part of the chiplet options)
+        bonding_yield = self.context.bonding_yield
+        if package in ("monolithic", "3D"):
+            return 0.0
+        if package == "EMIB":
+            return self.emib_ecf * (num_chiplets - 1) / bonding_yield
+        if package == "2.5D-active":
+            # (carbon - carbon * router area / area) grows with the area beyond router area - 1/defect rate
+            # (everywhere for an ideal interposer yield, defect rate 0)
+            router_area = ROUTER_AREA * num_chiplets
+            defect_rate = self.context.interposer_defect_rate
+            area = max(total_area, router_area - 1 / defect_rate) if defect_rate > 0 else total_area
+            carbon = self.interposer_ecf(area)
+            return (carbon - carbon * router_area / area) / bonding_yield
+        if package in ("2.5D-passive", "RDL"):
+            carbon = self.interposer_ecf(total_area) / bonding_yield
+            return carbon * RDL_LAYERS / NUM_BEOL if package == "RDL" else carbon
+        return DEFAULT_PACKAGING_CARBON
+
+    def packaging_exact(self, package, areas):
+        # packaging carbon of chiplets of the given areas (cm2); only the area multiset matters
+        if package in ("monolithic", "3D"):
+            return 0.0
+        key = (package, tuple(sorted(areas)))
+        if key not in self._packaging:
+            packager = self._packagers[package]
+            floorplan = floorplan_interposer([a*100 for a in key[1]])
+            interposer_carbon = packager.get_interposer_carbon(floorplan.area_cm2, self.context)
+            self._packaging[key] = packager.combine(self.context, [len(areas)], floorplan.area_cm2, interposer_carbon,
+                                                    floorplan.num_if, emib_carbon=self.emib_ecf)
+        return self._packaging[key]
+
+    def ocf(self, package, num_chiplets):
+        if self.spec["energy_per_inf"] is None:
+            return 0.0
+        overhead = self.spec["energy_overhead"]
+        energy = self.spec["energy_per_inf"] * (1 + overhead.get("per_chiplet", 0) * (num_chiplets - 1)
+                                                + overhead.get("package", {}).get(package, 0))
+        return get_operational_terms(energy, self.context.ci_op, self.context.num_inf_per_day, self.context.lifetime_days)[-1]
+
+    def group(self, package, k, num_pic):
+        # lower bound of the ECF of any candidate in the group
+        area = self.spec["logic_area"]
+        scale_min = min(self.spec["tech"].values())
+        logic = min(self.cpa.values()) * area * math.exp(self.context.defect_rate * scale_min * area / k)
+        total_area = scale_min * area + (self.spec["photonic_area"] if num_pic > 0 else 0)
+        return _slack(logic + self.pic_ecf(num_pic) + self.packaging(package, total_area, k + num_pic))
+
+
+def _slack(value):
+    # bounds are compared against evaluated values computed in a different order
+    return value * (1 - 1e-9)
+
+
+# ------------------------ Pareto front ----------------------------
+
+class ParetoFront:
+    # non-dominated (ECF, CF, chiplets) points
+    def __init__(self):
+        self.points = []    # [(objectives, payload)]
+
+    def dominates(self, objectives):
+        # True if some point is at least as good in every objective
+        return any(all(q <= o for q, o in zip(p, objectives)) for p, _ in self.points)
+
+    def threshold(self, ocf, num_chiplets):
+        # ECF from which a design with this OCF and chiplet count is dominated
+        return min((max(p[0], p[1] - ocf) for p, _ in self.points if p[2] <= num_chiplets), default=math.inf)
+
+    def add(self, objectives, payload):
+        if self.dominates(objectives):
+            return False
+        self.points = [(p, d) for p, d in self.points if not all(o <= q for o, q in zip(objectives, p))]
+        self.points.append((objectives, payload))
+        return True
+
+
+# ------------------------ Group search ----------------------------
+
+def search_group(spec, context, group, threshold=math.inf, greedy=False):
+    """
+    Branch and bound for the lowest-ECF candidate of one (package, logic chiplets, PIC chiplets) group.
+
+    Parts are chosen in non-increasing size (most balanced size first), each
+    with a node; equal parts take nodes in non-decreasing order, so every
+    candidate is visited once. greedy=True stops at the first candidate below
+    threshold (the most balanced split on the cheapest nodes).
+
+    Returns:
+        tuple: ((arch, breakdown, ECF) or None if no candidate is below threshold, stats dict).
+    """
+    package, k, num_pic = group
+    bounds = _Bounds(spec, context)
+    fixed_ecf = bounds.pic_ecf(num_pic)
+    pic_areas = list(bounds.pic_areas(num_pic))
+    pic_area = spec["photonic_area"] if num_pic > 0 else 0
+    if spec["area_step"] is None:
+        units, unit_area = k, spec["logic_area"] / k     # k equal parts
+    else:
+        units, unit_area = int(round(spec["logic_area"] / spec["area_step"])), spec["area_step"]
+    cpa_min, scale_min = min(bounds.cpa.values()), min(spec["tech"].values())
+    stats = {"nodes": 0, "evaluated": 0}
+    best = {"ecf": threshold, "parts": None}
+
+    def bound(ecf, area, rest_units, rest_parts):
+        # remaining parts: cheapest node, split evenly (see group bound)
+        rest = rest_units * unit_area
+        rest_ecf = cpa_min * rest * math.exp(context.defect_rate * scale_min * rest / rest_parts) if rest_parts else 0.0
+        packaging = bounds.packaging(package, area + scale_min * rest + pic_area, k + num_pic)
+        return _slack(ecf + rest_ecf + fixed_ecf + packaging)
+
+    def visit(j, rest_units, prev_units, prev_index, ecf, area, parts):
+        stats["nodes"] += 1
+        if greedy and best["parts"] is not None:
+            return
+        if bound(ecf, area, rest_units, k - j) >= best["ecf"]:
+            return
+        if j == k:
+            # exact ECF from the cached chiplet and packaging terms
+            stats["evaluated"] += 1
+            total = ecf + fixed_ecf + bounds.packaging_exact(package, [a for a, _ in parts] + pic_areas)
+            if total < best["ecf"]:
+                best["ecf"], best["parts"] = total, parts
+            return
+        rest_parts = k - j
+        for part_units in range(-(-rest_units // rest_parts), min(prev_units, rest_units - rest_parts + 1) + 1):
+            options = bounds.options(part_units * unit_area, package, k + num_pic)
+            for index in range(prev_index if part_units == prev_units else 0, len(options)):
+                part_ecf, part_area, tech = options[index]
+                visit(j + 1, rest_units - part_units, part_units, index, ecf + part_ecf, area + part_area,
+                      parts + ((part_area, tech),))
+
+    visit(0, units, units, 0, 0.0, 0.0, ())
+    if best["parts"] is None:
+        return None, stats
+    # report the model's own evaluation of the winner
+    arch = build_candidate_arch(spec, package, best["parts"], num_pic)
+    result = evaluate_arch(arch, context)
+    return (arch, result.breakdown, result.total), stats
+
+
+# ------------------------ Search driver ----------------------------
+
+def run_partition_search(spec, jobs=1, context=None, verbose=False):
+    """
+    Search chiplet partitions, node assignments and package types for the Pareto front of ECF, CF and chiplet count.
+
+    Parameters:
+        spec (dict or str): Search spec, or path to a search spec JSON file (see above).
+        jobs (int): Worker processes; groups are searched in parallel (1: in-process).
+        context (EvalContext): Base scenario; EvalContext fields of the spec override it.
+        verbose (bool): Print progress.
+
+    Returns:
+        dict: "front", a list of {"package", "num_chiplets", "ecf", "ocf", "cf", "breakdown", "arch"}
+        sorted by chiplet count and ECF, and "stats" (groups searched and pruned, branch and bound
+        nodes, exact evaluations, seconds).
+    """
+    log_key = "search"
+    spec = load_search_spec(spec) if isinstance(spec, str) else normalize_search_spec(spec)
+    context = get_search_context(spec, context)
+    bounds = _Bounds(spec, context)
+    jobs = jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+    stats = {"groups": 0, "groups_pruned": 0, "nodes": 0, "evaluated": 0}
+    front = ParetoFront()
+
+    def threshold(package, k, num_pic):
+        ocf = bounds.ocf(package, k + num_pic)
+        limit = front.threshold(ocf, k + num_pic)
+        if spec["max_ecf"] is not None:
+            limit = min(limit, math.nextafter(spec["max_ecf"], math.inf))
+        if spec["max_cf"] is not None:
+            limit = min(limit, math.nextafter(spec["max_cf"] - ocf, math.inf))
+        return limit
+
+    def collect(group, found, group_stats):
+        for key, value in group_stats.items():
+            stats[key] += value
+        if found is None:
+            return
+        (package, k, num_pic), (arch, breakdown, ecf) = group, found
+        ocf = bounds.ocf(package, k + num_pic)
+        front.add((ecf, ecf + ocf, k + num_pic), {"package": package, "num_chiplets": k + num_pic, "ecf": ecf,
+                                                   "ocf": ocf, "cf": ecf + ocf, "breakdown": breakdown, "arch": arch})
+
+    # cheapest group bound first, so the front tightens early
+    groups = sorted(iter_groups(spec), key=lambda g: bounds.group(*g))
+    stats["groups"] = len(groups)
+    if verbose:
+        print("INFO {} \t Searching {} group(s) on {} worker(s)...".format(log_key, len(groups), jobs))
+
+    # seed the front with one greedy candidate per group: the thresholds are
+    # close to final before any full group search starts, in any order
+    for group in groups:
+        collect(group, *search_group(spec, context, group, threshold(*group), greedy=True))
+
+    if jobs == 1:
+        for group in groups:
+            limit = threshold(*group)
+            if bounds.group(*group) >= limit:
+                stats["groups_pruned"] += 1
+                continue
+            collect(group, *search_group(spec, context, group, limit))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            in_flight = deque()
+            for group in groups:
+                limit = threshold(*group)
+                if bounds.group(*group) >= limit:
+                    stats["groups_pruned"] += 1
+                    continue
+                in_flight.append((group, pool.submit(search_group, spec, context, group, limit)))
+                if len(in_flight) >= 2 * jobs:
+                    group, future = in_flight.popleft()
+                    collect(group, *future.result())
+            while in_flight:
+                group, future = in_flight.popleft()
+                collect(group, *future.result())
+
+    stats["seconds"] = time.perf_counter() - start
+    result = sorted((payload for _, payload in front.points), key=lambda p: (p["num_chiplets"], p["ecf"]))
+    if verbose:
+        print("INFO {} \t {} group(s) ({} pruned), {} node(s), {} evaluated in {:.2f} s".format(
+            log_key, stats["groups"], stats["groups_pruned"], stats["nodes"], stats["evaluated"], stats["seconds"]))
+        print("INFO {} \t Pareto front: {} design(s)".format(log_key, len(result)))
+    return {"front": result, "stats": stats}
@@ -0,0 +1,261 @@
+import builtins
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+
+# ------------------------ Profiling ----------------------------
+# A Profiler wraps the model entry points while it is active and records
+#   - wall time per function: calls, inclusive and self (exclusive) time,
+#   - file opens (per path) and JSON parses, data table loads,
+#   - chiplet evaluations per unique chiplet spec (type, node, area, ...),
+#   - peak Python allocations (tracemalloc; slows the run, memory=False skips it),
+#   - one event per call for a Chrome trace (chrome://tracing, Perfetto).
+#
+# Functions are wrapped in every loaded module that binds them, so both
+# `utils.build_chiplet` and names imported with `from utils import ...` (also
+# through the `src.` package used by epicarbon.py) are seen. Wrappers stay in
+# modules imported during the profile but only record while a profiler is
+# active, on the thread that started it. Worker processes (sweeps, batches,
+# Monte Carlo) are not profiled.
+
+PROFILED_FUNCTIONS = {
+    "evaluate": ["load_arch", "evaluate_arch", "get_operational_result"],
+    "utils": ["parse_arch_file", "parse_arch_config", "parse_arch_groups", "build_chiplet", "parse_dnn_model"],
+    "data_store": ["load_tables", "_load_table", "_load_process_energy_table"],
+    "floorplan": ["floorplan_interposer", "floorplan_interposer_groups"],
+    "packager": ["recursive_split"],
+    "dnn": ["evaluate_model_zoo", "load_energy_table"],
+}
+PROFILED_METHODS = {
+    "chiplet_models.cmos_logic_chiplet": ("CMOS_logic_chiplet", ["evaluate", "get_manufacturing_carbon"]),
+    "chiplet_models.pic_logic_chiplet": ("PIC_logic_chiplet", ["evaluate", "get_manufacturing_carbon"]),
+    "chiplet_models.dram_chiplet": ("DRAM_chiplet", ["evaluate", "get_manufacturing_carbon"]),
+    "chiplet_models.storage_device": ("Storage_device", ["evaluate", "get_manufacturing_carbon"]),
+    "packager": ("Packager", ["evaluate", "get_packaging_carbon", "get_interposer_carbon", "get_stack_carbon",
+                                   "get_emib_carbon", "combine"]),
+}
+CHIPLET_EVALUATE = ["CMOS_logic_chiplet.evaluate", "PIC_logic_chiplet.evaluate", "DRAM_chiplet.evaluate",
+                    "Storage_device.evaluate"]
+MAX_TRACE_EVENTS = 1000000
+
+_active = None      # the recording Profiler
+
+
+def _chiplet_spec(chiplet, kwargs):
+    # label of the spec a chiplet evaluation was made for
+    spec = [chiplet.chiplet_type]
+    if chiplet.tech_node != -1:
+        spec.append("{}nm".format(chiplet.tech_node))
+    area = kwargs.get("area") or getattr(chiplet, "area", None)
+    if area is not None:
+        spec.append("{:.6g}cm2".format(area))
+    for attr in ["actuation_type", "dram_type", "model", "size_gb"]:
+        if hasattr(chiplet, attr):
+            spec.append("{}={}".format(attr, getattr(chiplet, attr)))
+    if getattr(chiplet, "is_interposer", False) or chiplet.cpa_scaling_factor != 1:
+        spec.append("interposer/bridge")
+    return " ".join(spec)
+
+
+def _wrap(function, name):
+    def wrapper(*args, **kwargs):
+        profiler = _active
+        if profiler is None or threading.get_ident() != profiler.thread_id:
+            return function(*args, **kwargs)
+        if name in CHIPLET_EVALUATE:
+            spec = _chiplet_spec(args[0], kwargs)
+            profiler.chiplet_evaluations[spec] = profiler.chiplet_evaluations.get(spec, 0) + 1
+        profiler._enter(name)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler._exit(name)
+    wrapper.__wrapped__ = function
+    wrapper.__name__ = getattr(function, "__name__", name)
+    wrapper.__doc__ = function.__doc__
+    return wrapper
+
+
+class Profiler:
+    """
+    Context manager recording per-function timings, file/JSON/data-table activity,
+    chiplet evaluations per spec and peak allocations of the code it wraps.
+
+    Parameters:
+        cold (bool): Drop the in-memory data tables and floorplan cache first, so
+            data loads and floorplans of the profiled code are counted.
+        memory (bool): Record peak allocations with tracemalloc (slows the run).
+    """
+    def __init__(self, cold=False, memory=True):
+        self.cold, self.memory = cold, memory
+        self.functions = {}             # name -> {"calls", "total_s", "self_s"}
+        self.file_opens = {}            # path -> count
+        self.json_parses = 0
+        self.chiplet_evaluations = {}   # spec -> count
+        self.peak_alloc_kb = None
+        self.wall_s = 0.0
+        self.events = []                # (name, start_s, duration_s)
+        self.thread_id = None
+        self._stack = []                # [start, time in callees, name]
+        self._patched = []              # (owner, attribute, original)
+        self._start = None
+
+    # ------------------------ Recording ----------------------------
+
+    def _enter(self, name):
+        self._stack.append([time.perf_counter(), 0.0, name])
+
+    def _exit(self, name):
+        start, inner, _ = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        stats = self.functions.setdefault(name, {"calls": 0, "total_s": 0.0, "self_s": 0.0})
+        stats["calls"] += 1
+        stats["self_s"] += elapsed - inner
+        # recursive calls count once in the inclusive time
+        if not any(n == name for _, _, n in self._stack):
+            stats["total_s"] += elapsed
+        if self._stack:
+            self._stack[-1][1] += elapsed
+        if len(self.events) < MAX_TRACE_EVENTS:
+            self.events.append((name, start - self._start, elapsed))
+
+    def _patch(self):
+        # also the src. copies when running under epicarbon.py, whose functions import them lazily
+        prefixes = ["", "src."] if "src" in sys.modules else [""]
+        for module_name in list(PROFILED_FUNCTIONS) + list(PROFILED_METHODS):
+            for prefix in prefixes:
+                importlib.import_module(prefix + module_name)
+
+        # module functions: wrap the object wherever it is bound
+        wrappers = {}
+        for module_name, names in PROFILED_FUNCTIONS.items():
+            for prefix in ["", "src."]:
+                module = sys.modules.get(prefix + module_name)
+                for name in names if module is not None else []:
+                    function = getattr(module, name)
+                    if id(function) not in wrappers:
+                        wrappers[id(function)] = (function, _wrap(function, name))
+        for module in list(sys.modules.values()):
+            namespace = getattr(module, "__dict__", None)
+            if not namespace or module is sys.modules[__name__]:
+                continue
+            for attribute, value in list(namespace.items()):
+                if callable(value) and id(value) in wrappers and wrappers[id(value)][0] is value:
+                    self._patched.append((module, attribute, value))
+                    setattr(module, attribute, wrappers[id(value)][1])
+
+        # methods, on every loaded copy of the class
+        for module_name, (class_name, methods) in PROFILED_METHODS.items():
+            for prefix in ["", "src."]:
+                module = sys.modules.get(prefix + module_name)
+                cls = getattr(module, class_name, None)
+                for method in methods if cls is not None else []:
+                    original = cls.__dict__[method]
+                    self._patched.append((cls, method, original))
+                    setattr(cls, method, _wrap(original, "{}.{}".format(class_name, method)))
+
+        # file opens and JSON parses (json.load parses through json.loads)
+        open_, json_loads = builtins.open, json.loads
+
+        def counted_open(file, *args, **kwargs):
+            if _active is self and threading.get_ident() == self.thread_id and isinstance(file, (str, bytes, os.PathLike)):
+                path = os.path.relpath(os.fsdecode(file))
+                self.file_opens[path] = self.file_opens.get(path, 0) + 1
+            return open_(file, *args, **kwargs)
+
+        def counted_loads(*args, **kwargs):
+            if _active is self and threading.get_ident() == self.thread_id:
+                self.json_parses += 1
+            return json_loads(*args, **kwargs)
+        for owner, attribute, replacement in [(builtins, "open", counted_open), (json, "loads", counted_loads)]:
+            self._patched.append((owner, attribute, getattr(owner, attribute)))
+            setattr(owner, attribute, replacement)
+
+    def _unpatch(self):
+        for owner, attribute, original in reversed(self._patched):
+            setattr(owner, attribute, original)
+        self._patched = []
+
+    def __enter__(self):
+        global _active
+        if _active is not None:
+            raise ValueError("A profiler is already active.")
+        self._patch()
+        if self.cold:
+            sys.modules["data_store"].invalidate_tables()
+            sys.modules["floorplan"]._floorplan_cached.cache_clear()
+        self.thread_id = threading.get_ident()
+        if self.memory:
+            self._tracing = tracemalloc.is_tracing()
+            if not self._tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+        _active = self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = None
+        self.wall_s = time.perf_counter() - self._start
+        if self.memory:
+            self.peak_alloc_kb = tracemalloc.get_traced_memory()[1] / 1024
+            if not self._tracing:
+                tracemalloc.stop()
+        self._unpatch()
+        return False
+
+    # ------------------------ Output ----------------------------
+
+    @property
+    def data_table_loads(self):
+        return self.functions.get("_load_table", {}).get("calls", 0) + \
+            self.functions.get("_load_process_energy_table", {}).get("calls", 0)
+
+    def to_dict(self):
+        return {"wall_s": self.wall_s, "peak_alloc_kb": self.peak_alloc_kb,
+                "functions": self.functions,
+                "counters": {"file_opens": sum(self.file_opens.values()), "json_parses": self.json_parses,
+                             "data_table_loads": self.data_table_loads,
+                             "chiplet_evaluations": sum(self.chiplet_evaluations.values()),
+                             "unique_chiplet_specs": len(self.chiplet_evaluations)},
+                "file_opens": self.file_opens,
+                "chiplet_evaluations": self.chiplet_evaluations}
+
+    def write_json(self, path):
+        with open(path, 'w') as json_file:
+            json.dump(self.to_dict(), json_file, indent=2)
+
+    def write_chrome_trace(self, path):
+        # Trace Event Format: one complete ("X") event per call, in microseconds
+        pid = os.getpid()
+        events = [{"name": name, "cat": "epicarbon", "ph": "X", "ts": start * 1e6, "dur": duration * 1e6,
+                   "pid": pid, "tid": 0} for name, start, duration in self.events]
+        with open(path, 'w') as json_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": self.to_dict()["counters"]},
+                      json_file)
+
+    def format_table(self, top=10):
+        lines = ["{:40s} {:>8} {:>12} {:>12}".format("function", "calls", "total_ms", "self_ms")]
+        for name, stats in sorted(self.functions.items(), key=lambda kv: -kv[1]["total_s"]):
+            lines.append("{:40s} {:>8} {:>12.3f} {:>12.3f}".format(name, stats["calls"], stats["total_s"] * 1e3,
+                                                                   stats["self_s"] * 1e3))
+        lines.append("")
+        lines.append("Wall time                   : {:.3f} ms".format(self.wall_s * 1e3))
+        if self.peak_alloc_kb is not None:
+            lines.append("Peak allocations            : {:.1f} kB".format(self.peak_alloc_kb))
+        lines.append("File opens                  : {}".format(sum(self.file_opens.values())))
+        lines.append("JSON parses                 : {}".format(self.json_parses))
+        lines.append("Data table loads            : {}".format(self.data_table_loads))
+        lines.append("Chiplet evaluations         : {} ({} unique spec(s))".format(
+            sum(self.chiplet_evaluations.values()), len(self.chiplet_evaluations)))
+        for spec, count in sorted(self.chiplet_evaluations.items(), key=lambda kv: -kv[1])[:top]:
+            lines.append("    {:6d}  {}".format(count, spec))
+        if len(self.chiplet_evaluations) > top:
+            lines.append("    ... {} more".format(len(self.chiplet_evaluations) - top))
+        return "\n".join(lines)
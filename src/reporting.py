@@ -0,0 +1,283 @@
+import sys
+
+
+# ------------------------ Reporters ----------------------------
+# Evaluation functions never print their results themselves; they hand the
+# result objects (results.py) to a reporter, if one is attached. Subclass
+# Reporter and override the hooks you need. The start_* hooks run before the
+# evaluation, the report_* hooks after it; verbose is the flag the caller
+# passed (the chiplet models print their own detailed logs when it is set).
+
+class Reporter:
+    def start_embodied(self, arch_file, context, verbose=False):
+        pass
+
+    def report_embodied(self, arch_file, context, result, verbose=False):
+        pass
+
+    def start_operational(self, energy_per_inf, num_inf_per_day, lifetime_days, verbose=False):
+        pass
+
+    def report_operational(self, context, result, verbose=False):
+        pass
+
+    def report_operational_trace(self, context, result, verbose=False):
+        pass
+
+    def report_footprint(self, context, result, verbose=False):
+        pass
+
+    def report_fleet(self, context, result, verbose=False):
+        pass
+
+    def report_corpus_written(self, out_dir, num_archs, verbose=False):
+        pass
+
+    def report_corpus(self, context, result, seconds, out_path=None, verbose=False):
+        pass
+
+    def report_scenarios(self, context, result, seconds, out_path=None, verbose=False):
+        pass
+
+    def report_breakeven(self, context, result, seconds, out_path=None, verbose=False):
+        pass
+
+    def report_pareto(self, context, result, out_path=None, verbose=False):
+        pass
+
+    def report_batch(self, context, stats, out_path="-", verbose=False):
+        pass
+
+    def report_uncertainty(self, context, summary, num_samples, seed, verbose=False):
+        pass
+
+    def report_operational_zoo(self, context, result, verbose=False):
+        pass
+
+
+class ConsoleReporter(Reporter):
+    # the classic epicarbon.py console output; timings=True adds per-stage timing
+    def __init__(self, timings=False):
+        self.timings = timings
+
+    def start_embodied(self, arch_file, context, verbose=False):
+        if verbose:
+            print(f"\n[Embodied Carbon Footprint Calculation]")
+            print(f"Architecture file          : {arch_file}")
+            print(f"Fabrication CI              : {context.ci_fab} g/kWh")
+            print("--------------------------------------------------")
+            print("Building chip model...")
+
+    def report_embodied(self, arch_file, context, result, verbose=False):
+        if verbose and result.cached:
+            print("--------------------------------------------------")
+            print("Breakdown from the result cache (no per-chiplet results)")
+        elif verbose:
+            print("--------------------------------------------------")
+            for group in result.groups:
+                print(f"{group.chiplet.chiplet_type:15s} x {group.count:<5d}\t    : {group.ecf:.2f} gCO2")
+        print("--------------------------------------------------")
+        print(f"Total ECF                   = {result.total:.2f} gCO2")
+        for comp, value in result.breakdown.items():
+            print(f"{comp:15s}\t\t    : {value:.2f} gCO2")
+        if self.timings and result.timings:
+            print("--------------------------------------------------")
+            for stage, seconds in result.timings.items():
+                print(f"{stage:15s}\t\t    : {seconds * 1000:.3f} ms")
+
+    def start_operational(self, energy_per_inf, num_inf_per_day, lifetime_days, verbose=False):
+        if verbose:
+            print("\n[Operational Carbon Footprint Calculation]")
+            print(f"Energy per inference       : {energy_per_inf:.2e} J")
+            print(f"Inferences per day         : {num_inf_per_day:.0e}")
+            print(f"Lifetime                   : {lifetime_days} days ({lifetime_days / 365:.1f} years)")
+            print("--------------------------------------------------")
+
+    def report_operational(self, context, result, verbose=False):
+        if verbose:
+            print(f"Energy per inference (kWh) : {result.energy_per_inf_kWh:.2e} kWh")
+            print(f"Carbon per inference       : {result.per_inf:.2e} gCO2")
+            print(f"Carbon per day             : {result.per_day:.2e} gCO2")
+        print("--------------------------------------------------")
+        print(f"Total OCF                  = {result.total:.2e} gCO2")
+
+    def report_operational_trace(self, context, result, verbose=False):
+        if verbose:
+            print("\n[Operational Carbon Footprint Calculation (time series)]")
+            print(f"Time steps                 : {result.num_steps} x {result.step_hours:g} h")
+            print(f"Energy over lifetime       : {result.energy_kWh:.2e} kWh")
+            print(f"Effective CI               : {result.effective_ci:.2f} gCO2/kWh")
+            print("--------------------------------------------------")
+            # cumulative OCF at the end of each year (and of the lifetime)
+            for day, value in zip(result.cumulative_days, result.cumulative):
+                if day % 365 == 0 or day == result.cumulative_days[-1]:
+                    print(f"Cumulative OCF, day {day:<7g}: {value:.2e} gCO2")
+        print("--------------------------------------------------")
+        print(f"Total OCF                  = {result.total:.2e} gCO2")
+
+    def report_footprint(self, context, result, verbose=False):
+        print("--------------------------------------------------")
+        print(f"Total CF                    = {result.total:.2f} gCO2")
+        print(f"  - Operational (OCF)       : {result.operational.total:.2f} gCO2")
+        print(f"  - Embodied (ECF)          : {result.embodied.total:.2f} gCO2")
+
+    def report_fleet(self, context, result, verbose=False):
+        print("--------------------------------------------------")
+        print(f"Devices                     = {result.devices:.0f} ({result.distinct_specs} distinct spec(s))")
+        for title, groups in [("type", result.by_type), ("region", result.by_region)]:
+            print(f"{'by ' + title:>22} {'devices':>12} {'ECF (tCO2)':>14} {'OCF (tCO2)':>14}")
+            for name, group in groups.items():
+                print(f"{name:>22} {group['devices']:>12.0f} {group['ecf'] / 1e6:>14.2f} {group['ocf'] / 1e6:>14.2f}")
+        print(f"Fleet ECF                   : {result.ecf / 1e6:.2f} tCO2")
+        print(f"Fleet OCF                   : {result.ocf / 1e6:.2f} tCO2")
+        print(f"Fleet CF                    : {result.total / 1e6:.2f} tCO2")
+
+    def report_corpus_written(self, out_dir, num_archs, verbose=False):
+        print(f"Corpus architectures        = {num_archs} ({out_dir})")
+
+    def report_corpus(self, context, result, seconds, out_path=None, verbose=False):
+        print("--------------------------------------------------")
+        print(f"Corpus architectures        = {len(result.names)} ({result.num_fallback} via the object model)")
+        for key, values in result.breakdown.items():
+            print(f"{'ECF ' + key:28s}: {values.sum() / 1e6:.4f} tCO2")
+        if len(result.names):
+            print(f"ECF per arch                : mean {result.ecf.mean():.2f}, max {result.ecf.max():.2f} gCO2")
+        print(f"Corpus ECF                  : {result.total / 1e6:.4f} tCO2")
+        print(f"Elapsed                     : {seconds:.2f} s")
+        if out_path is not None:
+            print(f"Results                     : {out_path}")
+
+    def report_scenarios(self, context, result, seconds, out_path=None, verbose=False):
+        print("--------------------------------------------------")
+        print(f"Scenarios                   = {len(result.archs)} arch(s) x {len(result.fab)} fab x {len(result.op)} deployment")
+        print(f"{'arch':>22} {'lowest CF (fab / deployment)':>34} {'gCO2':>12} {'highest gCO2':>14}")
+        for i, arch in enumerate(result.archs[:20]):
+            fab_label, op_label, cf = result.best(arch)
+            site = fab_label + " / " + (op_label if result.energy_per_inf is not None else "-")
+            print(f"{arch:>22} {site:>34} {cf:>12.2f} {result.cf[i].max():>14.2f}")
+        if len(result.archs) > 20:
+            print(f"{'...':>22} ({len(result.archs) - 20} more)")
+        print(f"Elapsed                     : {seconds * 1000:.1f} ms")
+        if out_path is not None:
+            print(f"Results                     : {out_path}")
+
+    def report_breakeven(self, context, result, seconds, out_path=None, verbose=False):
+        print("--------------------------------------------------")
+        print(f"Break-even                  = {len(result.names)} arch(s)" +
+              (f" vs {result.reference} ({result.reference_energy:g} J/inference)" if result.reference is not None else ""))
+        header = f"{'arch':>22} {'ECF (gCO2)':>14} {'crossover (days)':>17}"
+        if result.reference is not None:
+            header += f" {'break-even (J)':>15} {'payback (days)':>15}"
+        print(header)
+        for i, name in enumerate(result.names[:20]):
+            line = f"{name:>22} {result.ecf[i]:>14.2f} {result.crossover_days[i]:>17.1f}"
+            if result.reference is not None:
+                line += f" {result.break_even_energy[i]:>15.4g} {result.payback_days[i]:>15.1f}"
+            print(line)
+        if len(result.names) > 20:
+            print(f"{'...':>22} ({len(result.names) - 20} more)")
+        print(f"Elapsed                     : {seconds * 1000:.1f} ms")
+        if out_path is not None:
+            print(f"Results                     : {out_path}")
+
+    def report_pareto(self, context, result, out_path=None, verbose=False):
+        stats = result["stats"]
+        print("--------------------------------------------------")
+        print(f"Groups searched             = {stats['groups'] - stats['groups_pruned']} of {stats['groups']}")
+        print(f"Designs evaluated           : {stats['evaluated']} ({stats['nodes']} branch and bound nodes)")
+        print(f"Elapsed                     : {stats['seconds']:.2f} s")
+        print(f"{'package':>13} {'chiplets':>8} {'ECF (gCO2)':>14} {'CF (gCO2)':>14}  logic chiplets (area cm2 @ nm)")
+        for design in result["front"]:
+            logic = ", ".join("{}x {:g}@{}".format(c["num_chiplets"], c["area"], c["tech"])
+                              for c in design["arch"]["chiplets"] if c["type"] == "cmos-logic")
+            print(f"{design['package']:>13} {design['num_chiplets']:>8} {design['ecf']:>14.2f} {design['cf']:>14.2f}  {logic}")
+        if out_path is not None:
+            print(f"Results                     : {out_path}")
+
+    def report_batch(self, context, stats, out_path="-", verbose=False):
+        # keep stdout clean for the records when they are written there
+        log = sys.stderr if out_path == "-" else sys.stdout
+        latency = stats["latency_ms"]
+        print("--------------------------------------------------", file=log)
+        print(f"Batch jobs                  = {stats['jobs']} ({stats['errors']} error(s))", file=log)
+        print(f"Elapsed                     : {stats['seconds']:.2f} s ({stats['jobs_per_sec']:.0f} jobs/s)", file=log)
+        print(f"Latency mean                : {latency['mean']:.2f} ms", file=log)
+        print(f"Latency p50/p95/p99         : {latency['percentiles'][50]:.2f} / {latency['percentiles'][95]:.2f} / "
+              f"{latency['percentiles'][99]:.2f} ms", file=log)
+        print(f"Latency max                 : {latency['max']:.2f} ms", file=log)
+
+    def report_uncertainty(self, context, summary, num_samples, seed, verbose=False):
+        print("--------------------------------------------------")
+        print(f"Monte Carlo samples         = {num_samples} (seed {seed})")
+        for m, s in summary.items():
+            print(f"{m.upper():4s} mean                    : {s['mean']:.2f} gCO2 (std {s['std']:.2f})")
+            print(f"{m.upper():4s} 95% interval            : [{s['percentiles'][2.5]:.2f}, {s['percentiles'][97.5]:.2f}] gCO2")
+
+    def report_operational_zoo(self, context, result, verbose=False):
+        print("--------------------------------------------------")
+        print(f"{'model':>24} {'layers':>9} {'nonlinear':>10} {'energy/inf (J)':>15} {'OCF (gCO2)':>12}")
+        for name, layers, perc, energy, ocf in zip(result.models, result.num_layers, result.perc_nonlinear,
+                                                   result.energy_per_inf, result.ocf):
+            print(f"{name:>24} {layers:>9} {perc:>9.1f}% {energy:>15.3e} {ocf:>12.3e}")
+        print(f"Models                      = {len(result.models)}")
+        print(f"Total OCF                   = {result.total:.2e} gCO2")
+
+
+class LoggingReporter(Reporter):
+    # one log record per result through the logging module (default: INFO on the "epicarbon" logger)
+    def __init__(self, logger=None, level=None):
+        import logging
+        self.logger = logger if logger is not None else logging.getLogger("epicarbon")
+        self.level = level if level is not None else logging.INFO
+
+    def report_embodied(self, arch_file, context, result, verbose=False):
+        self.logger.log(self.level, "ECF %s: %.2f gCO2 %s (ci_fab %s, timings %s%s)", arch_file, result.total,
+                        {k: round(v, 2) for k, v in result.breakdown.items()}, context.ci_fab,
+                        {k: round(v * 1000, 3) for k, v in result.timings.items()}, ", cached" if result.cached else "")
+
+    def report_operational(self, context, result, verbose=False):
+        self.logger.log(self.level, "OCF %.2e J/inference: %.2e gCO2 (ci_op %s)", result.energy_per_inf,
+                        result.total, context.ci_op)
+
+    def report_operational_trace(self, context, result, verbose=False):
+        self.logger.log(self.level, "OCF time series (%d steps): %.2e gCO2 (effective CI %.2f gCO2/kWh)",
+                        result.num_steps, result.total, result.effective_ci)
+
+    def report_footprint(self, context, result, verbose=False):
+        self.logger.log(self.level, "CF %.2f gCO2 (ECF %.2f, OCF %.2f)", result.total, result.embodied.total,
+                        result.operational.total)
+
+    def report_fleet(self, context, result, verbose=False):
+        self.logger.log(self.level, "Fleet of %.0f devices (%d specs): ECF %.2f tCO2, OCF %.2f tCO2", result.devices,
+                        result.distinct_specs, result.ecf / 1e6, result.ocf / 1e6)
+
+    def report_corpus_written(self, out_dir, num_archs, verbose=False):
+        self.logger.log(self.level, "Corpus %s: %d architectures written", out_dir, num_archs)
+
+    def report_corpus(self, context, result, seconds, out_path=None, verbose=False):
+        self.logger.log(self.level, "Corpus of %d architectures: ECF %.4f tCO2 (%d via the object model, %.2f s)",
+                        len(result.names), result.total / 1e6, result.num_fallback, seconds)
+
+    def report_scenarios(self, context, result, seconds, out_path=None, verbose=False):
+        self.logger.log(self.level, "Scenario matrix: %d arch(s) x %d fab x %d deployment (%.1f ms)", len(result.archs),
+                        len(result.fab), len(result.op), seconds * 1000)
+
+    def report_breakeven(self, context, result, seconds, out_path=None, verbose=False):
+        self.logger.log(self.level, "Break-even of %d arch(s)%s (%.1f ms)", len(result.names),
+                        " vs " + result.reference if result.reference is not None else "", seconds * 1000)
+
+    def report_pareto(self, context, result, out_path=None, verbose=False):
+        self.logger.log(self.level, "Partition search: %d Pareto design(s) of %d evaluated (%.2f s)", len(result["front"]),
+                        result["stats"]["evaluated"], result["stats"]["seconds"])
+
+    def report_batch(self, context, stats, out_path="-", verbose=False):
+        self.logger.log(self.level, "Batch of %d job(s): %d error(s), %.2f s (%.0f jobs/s)", stats["jobs"],
+                        stats["errors"], stats["seconds"], stats["jobs_per_sec"])
+
+    def report_uncertainty(self, context, summary, num_samples, seed, verbose=False):
+        self.logger.log(self.level, "Monte Carlo (%d samples, seed %d): %s", num_samples, seed,
+                        {m: (round(s["percentiles"][2.5], 2), round(s["percentiles"][97.5], 2)) for m, s in summary.items()})
+
+    def report_operational_zoo(self, context, result, verbose=False):
+        self.logger.log(self.level, "OCF of %d models: %.2e gCO2 (ci_op %s)", len(result.models), result.total,
+                        context.ci_op)
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from data_store import data_tables_hash
+from evaluate import evaluate_arch
+from results import EmbodiedResult
+from timing import NULL_TIMER
+
+
+# ------------------------ Result cache ----------------------------
+# Content-addressed cache of ECF breakdowns. The key is the SHA-256 of
+#   - the canonical architecture JSON (sorted keys, "_comment" fields dropped),
+#   - the context fields the ECF depends on (ECF_CONTEXT_FIELDS); deployment
+#     parameters (ci_op, num_inf_per_day, lifetime_days) do not change it, so
+#     OCF/CF runs that vary only those share cache entries,
+#   - the hash of the data tables under src/data/ (see data_tables_hash()),
+#   - CACHE_VERSION, bumped whenever the models change their results.
+# Entries live in a bounded in-process LRU and, optionally, in a SQLite file
+# shared across runs. Editing any data file changes every key, and entries of
+# older data versions are dropped from the SQLite file when it is opened.
+
+CACHE_VERSION = 2
+DEFAULT_CACHE_SIZE = 4096
+COMMENT_KEY = "_comment"
+ECF_CONTEXT_FIELDS = ("ci_fab", "ghg_abatement", "defect_rate", "interposer_defect_rate", "bonding_yield")
+
+
+def canonical_arch(arch):
+    # architecture dict without comment fields, as a canonical JSON string
+    def strip(value):
+        if isinstance(value, dict):
+            return {k: strip(v) for k, v in value.items() if not k.startswith(COMMENT_KEY)}
+        if isinstance(value, list):
+            return [strip(v) for v in value]
+        return value
+    return json.dumps(strip(arch), sort_keys=True, separators=(",", ":"))
+
+
+def get_cache_key(arch, context, data_hash=None):
+    if data_hash is None:
+        data_hash = data_tables_hash()
+    payload = json.dumps({"arch": canonical_arch(arch), "context": {f: getattr(context, f) for f in ECF_CONTEXT_FIELDS},
+                          "data": data_hash, "version": CACHE_VERSION}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-level (in-process LRU, then SQLite) cache of ECF breakdowns.
+
+    Parameters:
+        path (str): SQLite file (None keeps the cache in memory only).
+        max_entries (int): Size limit of the in-process LRU.
+    """
+    def __init__(self, path=None, max_entries=DEFAULT_CACHE_SIZE):
+        if max_entries < 1:
+            raise ValueError("Result cache size must be at least 1 (got {}).".format(max_entries))
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+        self._db = None
+        if path is not None:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS results "
+                             "(key TEXT PRIMARY KEY, data_hash TEXT, value TEXT, created REAL)")
+            self._db.execute("DELETE FROM results WHERE data_hash != ?", (data_tables_hash(),))
+            self._db.commit()
+
+    def get(self, key):
+        # cached value for key, or None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["memory_hits"] += 1
+                return self._entries[key]
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return value
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key, value, data_hash=None):
+        with self._lock:
+            self._remember(key, value)
+            self.stats["stores"] += 1
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                                 (key, data_hash or data_tables_hash(), json.dumps(value), time.time()))
+                self._db.commit()
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def evaluate_embodied_cached(arch, context, cache, timer=NULL_TIMER):
+    """
+    EmbodiedResult of an architecture dict, and whether it was a cache hit.
+
+    A miss evaluates the full result (groups, packaging, timings) and caches its
+    breakdown. A hit only has the breakdown: the result has cached=True, no
+    groups or packaging, and its timings hold the "cache" lookup stage.
+    """
+    data_hash = data_tables_hash()
+    with timer.stage("cache"):
+        key = get_cache_key(arch, context, data_hash)
+        breakdown = cache.get(key)
+    if breakdown is not None:
+        return EmbodiedResult(sum(breakdown.values()), dict(breakdown), timings=dict(timer.seconds), cached=True), True
+    result = evaluate_arch(arch, context, timer=timer)
+    cache.put(key, dict(result.breakdown), data_hash)
+    return result, False
+
+
+def evaluate_arch_cached(arch, context, cache):
+    # returns (ECF breakdown, cache hit) for an architecture dict
+    result, hit = evaluate_embodied_cached(arch, context, cache)
+    return dict(result.breakdown), hit
@@ -0,0 +1,216 @@
+from dataclasses import dataclass, field
+
+
+# ------------------------ Result objects ----------------------------
+# Returned by the side-effect-free evaluate() methods of the chiplet models,
+# the packager and src/evaluate.py. All carbon values are in grams CO2.
+
+@dataclass(frozen=True)
+class ChipletResult:
+    chiplet_type: str
+    ecf: float
+    fab_yield: float
+    carbon_per_area: float = None   # g/cm2 (None for DRAM, which is per GB)
+    area: float = None              # cm2, as evaluated
+    details: dict = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ChipletGroupResult:
+    chiplet: ChipletResult          # one chiplet of the group
+    count: int
+    ecf: float                      # chiplet.ecf * count
+
+
+@dataclass(frozen=True)
+class PackagingResult:
+    package_type: str
+    carbon: float
+    interposer_area: float = 0      # cm2
+    interposer_carbon: float = 0
+    num_if: int = 0                 # EMIB interfaces
+    floorplan: object = None        # floorplan.Floorplan of the interposer (None for monolithic)
+
+
+@dataclass(frozen=True)
+class EmbodiedResult:
+    total: float
+    breakdown: dict                 # ECF per chiplet type, plus "package"
+    groups: tuple = ()              # ChipletGroupResult per unique chiplet spec
+    packaging: PackagingResult = None
+    timings: dict = field(default_factory=dict)     # seconds per stage (see timing.py), if timed
+    cached: bool = False            # breakdown served by a ResultCache: no groups or packaging
+
+    @property
+    def yields(self):
+        # fab yield per chiplet (one entry per unique chiplet spec)
+        return [g.chiplet.fab_yield for g in self.groups]
+
+    @property
+    def interposer_area(self):
+        return self.packaging.interposer_area if self.packaging is not None else 0
+
+
+@dataclass(frozen=True)
+class OperationalResult:
+    total: float                    # OCF over the lifetime
+    energy_per_inf: float           # J
+    energy_per_inf_kWh: float
+    per_inf: float
+    per_day: float
+    num_inf_per_day: float
+    lifetime_days: float
+
+
+@dataclass(frozen=True)
+class OperationalTraceResult:
+    total: float                    # OCF over the lifetime
+    energy_kWh: float               # energy over the lifetime
+    effective_ci: float             # gCO2/kWh, energy-weighted mean CI
+    num_steps: int
+    step_hours: float
+    cumulative_days: object         # ndarray, days since deployment
+    cumulative: object              # ndarray, OCF accumulated up to cumulative_days
+
+
+@dataclass(frozen=True)
+class FootprintResult:
+    total: float                    # ECF + OCF
+    embodied: EmbodiedResult
+    operational: OperationalResult
+
+
+@dataclass(frozen=True)
+class GradientResult:
+    # CF = ECF + OCF with partial derivatives (see gradients.py)
+    ecf: float
+    ocf: float
+    d_ecf: dict                     # parameter -> dECF/dparameter; "area": ndarray, g/cm2 per chiplet entry
+    d_ocf: dict                     # parameter -> dOCF/dparameter
+    margins: dict                   # distance to the nearest TSV (cm2) / EMIB (mm) count step; 0 = on a step
+
+    @property
+    def total(self):
+        return self.ecf + self.ocf
+
+    @property
+    def d_cf(self):
+        # ECF and OCF depend on disjoint parameters
+        return {**self.d_ecf, **self.d_ocf}
+
+    @property
+    def on_step(self):
+        # True if a TSV/EMIB count steps exactly here (the ECF jumps on one side)
+        return any(m == 0 for m in self.margins.values())
+
+
+@dataclass(frozen=True)
+class FleetResult:
+    ecf: float                      # embodied carbon of all devices
+    ocf: float                      # operational carbon over the device lifetimes
+    devices: float
+    distinct_specs: int             # component specs evaluated
+    by_type: dict                   # component type -> {"devices", "ecf", "ocf"}
+    by_region: dict                 # region -> {"devices", "ecf", "ocf"}
+    by_component: dict              # component label -> {"devices", "ecf", "ocf"}
+
+    @property
+    def total(self):
+        return self.ecf + self.ocf
+
+
+@dataclass(frozen=True)
+class ModelZooResult:
+    # per-model arrays follow models; per-layer arrays (per_layer=True) hold all layers,
+    # model i at layer_offsets[i]:layer_offsets[i+1]
+    models: tuple                   # model names
+    num_layers: object              # ndarray
+    layer_counts: object            # ndarray (models x LAYER_TYPES: fc, conv, nonlinear)
+    perc_nonlinear: object          # ndarray, % of layers
+    energy_per_inf: object          # ndarray, J
+    ocf: object                     # ndarray, OCF over the lifetime
+    layer_offsets: object = None
+    layer_energy: object = None     # ndarray, J per inference
+    layer_ocf: object = None
+
+    @property
+    def total(self):
+        return float(self.ocf.sum())
+
+    def get_layers(self, model):
+        # (energy, OCF) arrays of one model's layers
+        i = self.models.index(model)
+        if self.layer_energy is None:
+            raise ValueError("Per-layer results were not computed (use per_layer=True).")
+        start, end = self.layer_offsets[i], self.layer_offsets[i + 1]
+        return self.layer_energy[start:end], self.layer_ocf[start:end]
+
+
+@dataclass(frozen=True)
+class CorpusResult:
+    # per-arch arrays follow names (see corpus.evaluate_corpus())
+    names: list                     # architecture names
+    ecf: object                     # ndarray, total ECF per arch
+    breakdown: dict                 # chiplet type / "package" -> ndarray of ECF per arch (0 where absent)
+    interposer_area: object         # ndarray, cm2 (0 for packages without interposer or bridges)
+    num_if: object                  # ndarray, EMIB interfaces
+    num_fallback: int = 0           # archs evaluated through evaluate_arch()
+
+    @property
+    def total(self):
+        return float(self.ecf.sum())
+
+    def get_arch(self, name):
+        # {"total", "breakdown"} of one architecture
+        i = self.names.index(name)
+        return {"total": float(self.ecf[i]),
+                "breakdown": {key: float(values[i]) for key, values in self.breakdown.items()
+                              if values[i] != 0 or key == "package"}}
+
+
+@dataclass(frozen=True)
+class ScenarioMatrixResult:
+    # arrays are indexed [arch, fab scenario, deployment scenario] (see scenarios.py)
+    archs: list                     # architecture names
+    fab: list                       # fab region / source labels
+    op: list                        # deployment region / source labels
+    ci_fab: object                  # ndarray, gCO2/kWh per fab scenario
+    ci_op: object                   # ndarray, gCO2/kWh per deployment scenario
+    ecf: object                     # ndarray (archs x fab)
+    ocf: object                     # ndarray (archs x op)
+    cf: object                      # ndarray (archs x fab x op)
+    ecf_fixed: object               # ndarray, CI-independent ECF per arch
+    ecf_per_ci: object              # ndarray, ECF per gCO2/kWh of ci_fab per arch
+    energy_per_inf: object = None   # ndarray, J per arch (None: ECF only)
+
+    def get(self, arch, fab, op):
+        # {"ecf", "ocf", "cf"} of one combination of labels
+        i, j, k = self.archs.index(arch), self.fab.index(fab), self.op.index(op)
+        return {"ecf": float(self.ecf[i, j]), "ocf": float(self.ocf[i, k]), "cf": float(self.cf[i, j, k])}
+
+    def best(self, arch):
+        # (fab label, deployment label, CF) of the lowest-CF combination of an arch
+        i = self.archs.index(arch)
+        j, k = divmod(int(self.cf[i].argmin()), len(self.op))
+        return self.fab[j], self.op[k], float(self.cf[i, j, k])
+
+
+@dataclass(frozen=True)
+class BreakEvenResult:
+    # per design; the last three compare each design with a reference design (see breakeven.py)
+    names: list                     # design names
+    ecf: object                     # ndarray, g
+    energy_per_inf: object          # ndarray, J
+    crossover_days: object          # ndarray, days until OCF = ECF (inf: never)
+    reference: str = None           # name of the reference (deployed) design
+    reference_energy: float = None  # J per inference of the reference
+    break_even_energy: object = None    # ndarray, J per inference matching the reference CF (NaN: none)
+    payback_days: object = None     # ndarray, days until replacing the reference pays back (inf: never)
+
+    def get(self, name):
+        # {field: value} of one design
+        i = self.names.index(name)
+        values = {"ecf": self.ecf[i], "energy_per_inf": self.energy_per_inf[i], "crossover_days": self.crossover_days[i]}
+        if self.reference is not None:
+            values.update(break_even_energy=self.break_even_energy[i], payback_days=self.payback_days[i])
+        return {key: float(value) for key, value in values.items()}
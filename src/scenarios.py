@@ -0,0 +1,166 @@
+import glob
+import os
+
+import numpy as np
+
+from context import EvalContext
+from data_store import get_table, load_tables
+from evaluate import evaluate_arch, get_operational_terms, load_arch
+from results import ScenarioMatrixResult
+
+
+# ------------------------ Scenario matrix ----------------------------
+# ECF, OCF and CF of every (fab CI) x (deployment CI) x architecture
+# combination, e.g. for siting a design.
+#
+# CI values are given as region names (src/data/carbon_intensity/location.json),
+# energy sources (source.json) or numbers in gCO2/kWh. By default both axes
+# hold every region and source.
+#
+# The ECF of an architecture is affine in ci_fab: ci_fab only scales the
+# energy term of the carbon per area of each die, interposer and bridge,
+# while yields, gases, materials and DRAM do not depend on it. Each
+# architecture is therefore evaluated twice (ci_fab 0 and REFERENCE_CI),
+#   ECF(ci_fab) = ecf_fixed + ecf_per_ci x ci_fab,
+# and the OCF is linear in ci_op. The whole matrix is then one outer product:
+#   cf[arch, fab, op] = ecf[arch, fab] + ocf[arch, op]
+
+REFERENCE_CI = 1000.0       # gCO2/kWh, second evaluation point of the ECF line
+
+
+def get_ci_labels():
+    # every region and energy source, regions first
+    return list(get_table("ci_location")) + list(get_table("ci_source"))
+
+
+def resolve_ci(values=None):
+    """
+    CI values (gCO2/kWh) and labels of one axis of the matrix.
+
+    Parameters:
+        values (list): Region names, energy source names or numbers (default: all
+            regions and sources). A string "a,b,c" is split.
+
+    Returns:
+        tuple: (labels, ndarray of CI values).
+    """
+    if values is None:
+        values = get_ci_labels()
+    elif isinstance(values, str):
+        values = [v.strip() for v in values.split(",") if v.strip()]
+    elif isinstance(values, (int, float)):
+        values = [values]
+    if len(values) == 0:
+        raise ValueError("A scenario axis needs at least one region, source or CI value.")
+    locations, sources = get_table("ci_location"), get_table("ci_source")
+    labels, ci = [], []
+    for value in values:
+        if isinstance(value, str) and value.lower() in locations:
+            labels.append(value.lower())
+            ci.append(locations[value.lower()])
+        elif isinstance(value, str) and value.lower() in sources:
+            labels.append(value.lower())
+            ci.append(sources[value.lower()])
+        else:
+            try:
+                ci.append(float(value))
+            except (TypeError, ValueError):
+                raise ValueError("Unknown region or energy source '{}' (use one of {} or a CI value in gCO2/kWh).".format(
+                    value, ", ".join(get_ci_labels()))) from None
+            labels.append(str(value))
+    return labels, np.array(ci, dtype=np.float64)
+
+
+def _load_archs(archs):
+    # (names, arch dicts or paths, corpus) from a corpus directory, a directory or glob of
+    # JSON files, or a list of files / dicts
+    if isinstance(archs, str) and os.path.isfile(os.path.join(archs, "meta.json")):
+        from corpus import open_corpus  # columnar corpora are evaluated without chiplet objects
+        corpus = open_corpus(archs)
+        return list(corpus.names), None, corpus
+    if isinstance(archs, (str, dict)):
+        if isinstance(archs, str) and (os.path.isdir(archs) or glob.has_magic(archs)):
+            pattern = os.path.join(archs, "*.json") if os.path.isdir(archs) else archs
+            archs = sorted(glob.glob(pattern))
+            if not archs:
+                raise ValueError("No architecture files match '{}'.".format(pattern))
+        else:
+            archs = [archs]
+    names = []
+    for i, arch in enumerate(archs):
+        if isinstance(arch, str):
+            names.append(os.path.splitext(os.path.basename(arch))[0])
+        else:
+            names.append(arch.get("name", str(i)))
+    return names, list(archs), None
+
+
+def get_ecf(archs, contexts):
+    """
+    ECF of each architecture under each scenario.
+
+    Parameters:
+        archs: As evaluate_scenario_matrix().
+        contexts (list of EvalContext): Scenarios; the architectures are loaded once.
+
+    Returns:
+        tuple: (names, [ndarray of ECF in g per scenario]).
+    """
+    names, archs, corpus = _load_archs(archs)
+    load_tables()
+    if corpus is not None:
+        from corpus import evaluate_corpus
+        return names, [evaluate_corpus(corpus, context).ecf for context in contexts]
+    archs = [load_arch(arch) for arch in archs]
+    return names, [np.array([evaluate_arch(arch, context).total for arch in archs], dtype=np.float64)
+                   for context in contexts]
+
+
+def get_ecf_lines(archs, context=None):
+    """
+    CI-independent ECF and ECF per unit of ci_fab of each architecture.
+
+    Returns:
+        tuple: (names, ecf_fixed ndarray in g, ecf_per_ci ndarray in g per gCO2/kWh).
+    """
+    if context is None:
+        context = EvalContext()
+    names, (ecf_fixed, ecf_high) = get_ecf(archs, [context.replace(ci_fab=0.0), context.replace(ci_fab=REFERENCE_CI)])
+    return names, ecf_fixed, (ecf_high - ecf_fixed) / REFERENCE_CI
+
+
+def evaluate_scenario_matrix(archs, fab=None, op=None, energy_per_inf=None, context=None):
+    """
+    ECF, OCF and CF over fab CI x deployment CI x architecture, by broadcasting.
+
+    Parameters:
+        archs: Architecture file, dict, list of them, directory or glob of JSON files,
+            or a corpus directory (see corpus.py).
+        fab (list): Fab regions / energy sources / CI values (default: all regions and sources).
+        op (list): Deployment regions / energy sources / CI values (default: all).
+        energy_per_inf (float or list): Energy per inference (J), one value or one per
+            architecture; None for ECF only (OCF 0).
+        context (EvalContext): ghg_abatement, yields, num_inf_per_day, lifetime_days, ...
+            (its ci_fab and ci_op are replaced by the axes).
+
+    Returns:
+        ScenarioMatrixResult: ecf (arch x fab), ocf (arch x op) and cf (arch x fab x op).
+    """
+    if context is None:
+        context = EvalContext()
+    fab_labels, ci_fab = resolve_ci(fab)
+    op_labels, ci_op = resolve_ci(op)
+    names, ecf_fixed, ecf_per_ci = get_ecf_lines(archs, context)
+
+    energy = np.asarray(0.0 if energy_per_inf is None else energy_per_inf, dtype=np.float64)
+    if energy.ndim == 0:
+        energy = np.full(len(names), float(energy))
+    elif energy.shape != (len(names),):
+        raise ValueError("Expected one energy per inference or {} (one per architecture), got {}.".format(
+            len(names), energy.size))
+
+    ecf = ecf_fixed[:, None] + ecf_per_ci[:, None] * ci_fab[None, :]
+    ocf = get_operational_terms(energy[:, None], ci_op[None, :], context.num_inf_per_day, context.lifetime_days)[-1]
+    cf = ecf[:, :, None] + ocf[:, None, :]
+    return ScenarioMatrixResult(names, fab_labels, op_labels, ci_fab, ci_op, ecf, ocf, cf, ecf_fixed, ecf_per_ci,
+                                energy_per_inf=None if energy_per_inf is None else energy)
@@ -0,0 +1,395 @@
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from batch import get_manufacturing_carbon_batch
+from client import DEFAULT_ADDRESS, parse_address
+from context import EvalContext, check_context_overrides
+from data_store import data_tables_hash, load_tables
+from evaluate import evaluate_arch, evaluate_operational, load_arch
+from result_cache import ResultCache, get_cache_key
+from streaming_stats import StreamingSummary
+
+
+# ------------------------ Estimation server ----------------------------
+# Long-running asyncio server for tools that request many estimates. It keeps
+#   - the parsed data tables (in the server and in every worker process),
+#   - loaded architecture files (re-read when their mtime/size changes),
+#   - ECF breakdowns of evaluated (architecture, context) pairs (ResultCache,
+#     keyed like the result cache of the CLI, including the data hash)
+# warm across requests. Requests that arrive within batch_window of each other
+# are handled as one batch:
+#   - "chiplets" requests are concatenated into one vectorized
+#     get_manufacturing_carbon_batch() call,
+#   - "embodied"/"footprint" requests are answered from the cache, duplicate
+#     misses (also across batches in flight) are evaluated once, and the
+#     remaining misses are split over the worker processes.
+# Operations: embodied, footprint, operational, chiplets, metrics, ping,
+# shutdown (see client.py for the protocol). Request contexts may override any
+# EvalContext field of the server's base context. A malformed request, or a
+# failure while evaluating it, only fails that request: the client gets
+# {"ok": false, "error": ...} and the server keeps serving.
+
+OPERATIONS = ["embodied", "footprint", "operational", "chiplets", "metrics", "ping", "shutdown"]
+BATCHED_OPERATIONS = ["embodied", "footprint", "chiplets"]
+BATCH_WINDOW_S = 0.002          # time a batch waits for more requests
+MAX_BATCH = 1024                # requests per batch
+INLINE_CHIPLET_ROWS = 4096      # smaller chiplet batches are evaluated in the event loop
+MAX_CACHED_ARCHS = 4096         # loaded architecture files kept
+MAX_LINE_BYTES = 1 << 24        # longest request (inline architectures)
+RECENT_WINDOW_S = 10            # window of the recent request rate
+
+
+def _init_worker():
+    load_tables()
+
+
+def _evaluate_archs(items):
+    # worker: [(arch, context)] -> [(breakdown, error)]; drops stale tables if src/data/ changed
+    data_tables_hash()
+    results = []
+    for arch, context in items:
+        try:
+            results.append((evaluate_arch(arch, context).breakdown, None))
+        except (Exception, SystemExit) as e:
+            results.append((None, "{}: {}".format(type(e).__name__, e)))
+    return results
+
+
+def _evaluate_chiplets(columns):
+    data_tables_hash()
+    return get_manufacturing_carbon_batch(*columns)["ecf"].tolist()
+
+
+class EstimationServer:
+    """
+    Asyncio estimation server with warm caches and request batching.
+
+    Parameters:
+        address (str): "host:port" (localhost) or "unix:/path" to listen on.
+        context (EvalContext): Base scenario; requests override its fields.
+        workers (int): Worker processes for architecture evaluation (0: a thread).
+        cache_size (int): ECF breakdowns kept in memory.
+        batch_window (float): Seconds a batch waits for more requests.
+        verbose (bool): Print connections and batches.
+    """
+    def __init__(self, address=DEFAULT_ADDRESS, context=None, workers=1, cache_size=65536,
+                 batch_window=BATCH_WINDOW_S, max_batch=MAX_BATCH, verbose=False):
+        self.address = address
+        self.context = context if context is not None else EvalContext()
+        self.workers = workers
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.verbose = verbose
+        self.cache = ResultCache(None, max_entries=cache_size)
+        self.log_key = "server"
+
+        self._archs = {}        # path -> (mtime_ns, size, arch dict)
+        self._inflight = {}     # cache key -> future of the breakdown being evaluated
+        self._data_hash = None
+        self._queue = None
+        self._stop = None
+        self._loop = None
+        self._executor = None
+
+        self._start = time.time()
+        self._counts = dict.fromkeys(OPERATIONS, 0)
+        self._stats = {"errors": 0, "batches": 0, "batched_requests": 0, "coalesced": 0, "arch_evaluations": 0,
+                       "chiplet_rows": 0}
+        self._latency = StreamingSummary()
+        self._recent = deque()
+
+    # ------------------------ Lifecycle ----------------------------
+
+    def run(self):
+        # serve until a shutdown request, SIGINT or SIGTERM
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            pass
+
+    async def serve_forever(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(sig, self._stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass    # not supported on this platform / thread
+
+        load_tables()
+        self._data_hash = data_tables_hash()
+        self._executor = self._make_executor()
+
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            if os.path.exists(target):
+                os.unlink(target)   # left over from a server that did not shut down
+            server = await asyncio.start_unix_server(self._handle, path=target, limit=MAX_LINE_BYTES)
+        else:
+            server = await asyncio.start_server(self._handle, host=target[0], port=target[1], limit=MAX_LINE_BYTES)
+        batcher = asyncio.create_task(self._batch_loop())
+        print("INFO {} \t Listening on {} ({} worker(s))".format(self.log_key, self.address, self.workers), flush=True)
+
+        try:
+            async with server:
+                await self._stop.wait()
+        finally:
+            batcher.cancel()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            if kind == "unix" and os.path.exists(target):
+                os.unlink(target)
+            print("INFO {} \t Stopped after {} request(s)".format(self.log_key, sum(self._counts.values())), flush=True)
+
+    def _make_executor(self):
+        if self.workers > 0:
+            return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        return ThreadPoolExecutor(max_workers=1)
+
+    def _worker_failed(self, error, executor):
+        # error for the requests of a failed worker call; a broken process pool is replaced (once)
+        if isinstance(error, BrokenExecutor) and executor is self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._make_executor()
+        return RuntimeError("Worker failed: {}: {}".format(type(error).__name__, error))
+
+    # ------------------------ Connections ----------------------------
+
+    async def _handle(self, reader, writer):
+        # requests of one connection are handled concurrently; responses are written as they complete
+        lock = asyncio.Lock()
+        tasks = set()
+        if self.verbose:
+            print("INFO {} \t Connection from {}".format(self.log_key, writer.get_extra_info("peername") or "socket"))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(self._respond(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError,
+                asyncio.CancelledError):
+            pass    # client went away, sent an over-long line, or the server is stopping
+        finally:
+            writer.close()
+
+    async def _respond(self, line, writer, lock):
+        start = time.perf_counter()
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            response = {"id": request_id, "ok": True, "result": await self._dispatch(request)}
+        except Exception as e:
+            self._stats["errors"] += 1
+            response = {"id": request_id, "ok": False, "error": "{}: {}".format(type(e).__name__, e)}
+
+        now = time.perf_counter()
+        self._latency.add([(now - start) * 1000])
+        self._recent.append(now)
+        async with lock:
+            try:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+            except ConnectionError:
+                pass    # client went away
+
+    async def _dispatch(self, request):
+        op = request.get("op")
+        if op not in OPERATIONS:
+            raise ValueError("Unknown operation {!r} (use {}).".format(op, ", ".join(OPERATIONS)))
+        self._counts[op] += 1
+        if op == "ping":
+            return {"pong": True}
+        if op == "metrics":
+            return self.get_metrics()
+        if op == "shutdown":
+            self._loop.call_soon(self._stop.set)
+            return {"stopping": True}
+
+        context = self._get_context(request.get("context"))
+        if op == "operational":
+            return {"ocf": evaluate_operational(request["energy_per_inf"], context)}
+        future = self._loop.create_future()
+        self._queue.put_nowait((op, request, context, future))
+        return await future
+
+    def _get_context(self, overrides):
+        if not overrides:
+            return self.context
+        check_context_overrides(overrides)
+        return self.context.replace(**overrides)
+
+    # ------------------------ Batching ----------------------------
+
+    async def _batch_loop(self):
+        slots = asyncio.Semaphore(2 * max(1, self.workers))
+        while True:
+            batch = [await self._queue.get()]
+            if self.batch_window > 0:
+                await asyncio.sleep(self.batch_window)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await slots.acquire()
+            task = asyncio.create_task(self._process(batch))
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _process(self, batch):
+        self._stats["batches"] += 1
+        self._stats["batched_requests"] += len(batch)
+        if self.verbose:
+            print("INFO {} \t Batch of {} request(s)".format(self.log_key, len(batch)))
+        data_hash = data_tables_hash()
+        if data_hash != self._data_hash:
+            # src/data/ changed: drop everything computed from the old tables
+            self.cache.clear()
+            self._data_hash = data_hash
+        chiplets = [item for item in batch if item[0] == "chiplets"]
+        archs = [item for item in batch if item[0] != "chiplets"]
+        await asyncio.gather(self._process_chiplets(chiplets), self._process_archs(archs))
+
+    async def _process_chiplets(self, items):
+        # all rows of all requests in one vectorized call
+        columns = ([], [], [], [], [], [], [])
+        spans = []
+        for op, request, context, future in items:
+            start = len(columns[0])
+            try:
+                rows = [(c["type"], c.get("tech") if c.get("tech") is not None else -1, c["area"],
+                         c.get("actuation_type", "default"), context.ci_fab, context.ghg_abatement, context.defect_rate)
+                        for c in request["chiplets"]]
+            except (KeyError, TypeError) as e:
+                future.set_exception(ValueError("Invalid chiplet list: {!r}.".format(e)))
+                continue
+            for column, values in zip(columns, zip(*rows)):
+                column.extend(values)
+            spans.append((future, start, start + len(rows)))
+        if not spans:
+            return
+
+        try:
+            if len(columns[0]) <= INLINE_CHIPLET_ROWS:
+                ecf = _evaluate_chiplets(columns)
+            else:
+                executor = self._executor
+                try:
+                    ecf = await self._loop.run_in_executor(executor, _evaluate_chiplets, columns)
+                except (BrokenExecutor, SystemExit) as e:
+                    raise self._worker_failed(e, executor)
+        except Exception as e:
+            if len(spans) == 1:
+                spans[0][0].set_exception(e)
+                return
+            # find the failing request(s): evaluate each request on its own
+            await asyncio.gather(*(self._process_chiplets([item]) for item in items if not item[3].done()))
+            return
+        self._stats["chiplet_rows"] += len(ecf)
+        for future, start, end in spans:
+            future.set_result({"ecf": ecf[start:end]})
+
+    def _load_arch(self, arch):
+        # architecture dict; files are re-read when they change
+        if isinstance(arch, dict):
+            return arch
+        st = os.stat(arch)
+        cached = self._archs.get(arch)
+        if cached is None or cached[:2] != (st.st_mtime_ns, st.st_size):
+            if len(self._archs) >= MAX_CACHED_ARCHS:
+                self._archs.clear()
+            cached = (st.st_mtime_ns, st.st_size, load_arch(arch))
+            self._archs[arch] = cached
+        return cached[2]
+
+    async def _process_archs(self, items):
+        waiting, misses = [], {}
+        for op, request, context, future in items:
+            try:
+                arch = self._load_arch(request["arch"])
+                key = get_cache_key(arch, context, self._data_hash)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            breakdown = self.cache.get(key)
+            if breakdown is not None:
+                self._finish(op, request, context, future, breakdown, True)
+                continue
+            if key in self._inflight:
+                self._stats["coalesced"] += 1
+            else:
+                self._inflight[key] = self._loop.create_future()
+                misses[key] = (arch, context)
+            waiting.append((op, request, context, future, self._inflight[key]))
+
+        if misses:
+            keys = list(misses)
+            num_chunks = min(len(keys), max(1, self.workers))
+            chunks = [keys[i::num_chunks] for i in range(num_chunks)]
+            executor = self._executor
+            results = await asyncio.gather(*(self._loop.run_in_executor(
+                executor, _evaluate_archs, [misses[k] for k in chunk]) for chunk in chunks), return_exceptions=True)
+            for chunk, chunk_results in zip(chunks, results):
+                if isinstance(chunk_results, BaseException):
+                    chunk_failure = self._worker_failed(chunk_results, executor)
+                for i, key in enumerate(chunk):
+                    evaluation = self._inflight.pop(key)
+                    if isinstance(chunk_results, BaseException):
+                        evaluation.set_exception(chunk_failure)
+                        continue
+                    breakdown, error = chunk_results[i]
+                    self._stats["arch_evaluations"] += 1
+                    if error is not None:
+                        evaluation.set_exception(ValueError(error))
+                    else:
+                        self.cache.put(key, breakdown, self._data_hash)
+                        evaluation.set_result(breakdown)
+
+        for op, request, context, future, evaluation in waiting:
+            try:
+                breakdown = await evaluation
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            self._finish(op, request, context, future, breakdown, False)
+
+    def _finish(self, op, request, context, future, breakdown, cached):
+        try:
+            result = {"ecf": sum(breakdown.values()), "breakdown": breakdown, "cached": cached}
+            if op == "footprint":
+                result["ocf"] = evaluate_operational(request["energy_per_inf"], context)
+                result["cf"] = result["ecf"] + result["ocf"]
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+
+    # ------------------------ Metrics ----------------------------
+
+    def get_metrics(self):
+        now = time.perf_counter()
+        while self._recent and self._recent[0] < now - RECENT_WINDOW_S:
+            self._recent.popleft()
+        uptime = time.time() - self._start
+        latency = self._latency.moments
+        cache = self.cache.stats
+        return {"uptime_s": uptime, "requests": sum(self._counts.values()), "by_op": dict(self._counts),
+                "errors": self._stats["errors"],
+                "requests_per_s": latency.count / uptime if uptime > 0 else 0.0,
+                "recent_requests_per_s": len(self._recent) / RECENT_WINDOW_S,
+                "latency_ms": {"mean": latency.mean, "max": latency.max if latency.count else 0.0,
+                               **{"p{}".format(p): self._latency.percentile(p) if latency.count else 0.0
+                                  for p in (50, 95, 99)}},
+                "batches": self._stats["batches"],
+                "mean_batch_size": self._stats["batched_requests"] / max(1, self._stats["batches"]),
+                "cache": {"hits": cache["hits"], "misses": cache["misses"], "coalesced": self._stats["coalesced"],
+                          "entries": len(self.cache),
+                          "hit_rate": cache["hits"] / max(1, cache["hits"] + cache["misses"])},
+                "arch_evaluations": self._stats["arch_evaluations"], "chiplet_rows": self._stats["chiplet_rows"],
+                "workers": self.workers}
@@ -0,0 +1,122 @@
+import math
+import numpy as np
+
+
+# ------------------------ Streaming statistics ----------------------------
+# Online estimators that take samples chunk by chunk with constant memory and
+# can be merged across worker processes (moments are combined with Chan's
+# formula, histogram counts are summed).
+
+class RunningMoments:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        other = RunningMoments()
+        other.count = values.size
+        other.mean = float(np.mean(values))
+        other.m2 = float(np.sum((values - other.mean) ** 2))
+        other.min = float(np.min(values))
+        other.max = float(np.max(values))
+        self.merge(other)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+class QuantileSketch:
+    # Log-spaced histogram with a fixed bin layout: bin i covers
+    # [min_value * gamma**i, min_value * gamma**(i+1)), gamma = (1+a)/(1-a).
+    # Quantiles are returned within relative error a; memory is fixed by the
+    # value range, not by the number of samples. Values <= 0 are counted
+    # separately (e.g. zero packaging carbon for monolithic dies).
+    def __init__(self, relative_accuracy=1e-3, min_value=1e-6, max_value=1e15):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.num_bins = int(math.ceil(math.log(max_value / min_value) / self.log_gamma)) + 1
+        self.counts = np.zeros(self.num_bins, dtype=np.int64)
+        self.nonpositive_count = 0
+        self.count = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        positive = values[values > 0]
+        self.nonpositive_count += values.size - positive.size
+        index = np.floor(np.log(positive / self.min_value) / self.log_gamma).astype(np.int64)
+        np.clip(index, 0, self.num_bins - 1, out=index)
+        self.counts += np.bincount(index, minlength=self.num_bins)
+        self.count += values.size
+
+    def merge(self, other):
+        if other.num_bins != self.num_bins or other.gamma != self.gamma or other.min_value != self.min_value:
+            raise ValueError("Cannot merge quantile sketches with different bin layouts.")
+        self.counts += other.counts
+        self.nonpositive_count += other.nonpositive_count
+        self.count += other.count
+
+    def _bin_value(self, index):
+        # midpoint (in relative terms) of bin index
+        return self.min_value * self.gamma ** index * 2 / (1 + 1 / self.gamma)
+
+    def quantile(self, q):
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        if rank < self.nonpositive_count:
+            return 0.0
+        cumulative = np.cumsum(self.counts) + self.nonpositive_count
+        index = int(np.searchsorted(cumulative, rank, side="right"))
+        return self._bin_value(min(index, self.num_bins - 1))
+
+    def histogram(self, num_bins=50, value_range=None):
+        # re-bins the sketch onto num_bins linear bins; returns (counts, edges)
+        occupied = np.nonzero(self.counts)[0]
+        values = self._bin_value(occupied.astype(np.float64))
+        weights = self.counts[occupied]
+        if self.nonpositive_count:
+            values = np.append(values, 0.0)
+            weights = np.append(weights, self.nonpositive_count)
+        return np.histogram(values, bins=num_bins, range=value_range, weights=weights)
+
+
+class StreamingSummary:
+    # moments + quantile sketch for one output metric
+    def __init__(self, relative_accuracy=1e-3):
+        self.moments = RunningMoments()
+        self.sketch = QuantileSketch(relative_accuracy=relative_accuracy)
+
+    def add(self, values):
+        self.moments.add(values)
+        self.sketch.add(values)
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+
+    def percentile(self, p):
+        return self.sketch.quantile(p / 100)
+
+    def to_dict(self, percentiles=(2.5, 5, 25, 50, 75, 95, 97.5)):
+        return {"count": self.moments.count, "mean": self.moments.mean, "std": self.moments.std(),
+                "min": self.moments.min, "max": self.moments.max,
+                "percentiles": {p: self.percentile(p) for p in percentiles}}
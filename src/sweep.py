@@ -0,0 +1,250 @@
+import csv
+import itertools
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils import parse_arch_groups
+from context import EvalContext
+from evaluate import evaluate_embodied_groups, evaluate_operational
+
+
+# ------------------------ Sweep spec ----------------------------
+# A sweep spec is a JSON object:
+#   {
+#     "arch": "archs/adept.json",            (path or inline architecture)
+#     "axes": {
+#        "chiplets.0.area": [1.0, 2.0, 4.0],  (chiplets.<index>.<field>)
+#        "chiplets.1.actuation_type": ["fcd", "mems"],
+#        "chiplets.0.yield": ["poisson", "murphy"],   (yield model, see yields.py)
+#        "package": ["3D", "2.5D-passive"],
+#        "ci_fab": [820, 380], "ci_op": [11], "energy_per_inf": [1e-3], "defect_rate": [0.05, 0.1]
+#     },
+#     "ci_fab": 820, "ci_op": 11, "energy_per_inf": null, "defect_rate": 0.1,   (values for non-swept terms)
+#     "num_inf_per_day": 1e9, "lifetime_days": 1825
+#   }
+# Points are the cartesian product of all axes, generated lazily.
+
+CHIPLET_FIELDS = ["area", "tech", "actuation_type", "num_chiplets", "yield"]
+CONTEXT_AXES = ["ci_fab", "ci_op", "energy_per_inf", "defect_rate"]
+SWEEP_DEFAULTS = {"ci_fab": 820, "ci_op": 11, "energy_per_inf": None, "defect_rate": 0.1, "num_inf_per_day": 1e9,
+                  "lifetime_days": 5*365}
+OUTPUT_FORMATS = ["csv", "npz"]
+
+
+def load_sweep_spec(spec_file):
+    with open(spec_file, 'r') as json_file:
+        spec = json.load(json_file)
+    return normalize_sweep_spec(spec)
+
+
+def normalize_sweep_spec(spec):
+    spec = dict(spec)
+    if isinstance(spec["arch"], str):
+        with open(spec["arch"], 'r') as json_file:
+            spec["arch"] = json.load(json_file)
+    for key, value in SWEEP_DEFAULTS.items():
+        spec.setdefault(key, value)
+    spec.setdefault("axes", {})
+
+    num_chiplet_entries = len(spec["arch"]["chiplets"])
+    for axis, values in spec["axes"].items():
+        if len(values) == 0:
+            raise ValueError("Sweep axis '{}' has no values.".format(axis))
+        if axis in CONTEXT_AXES or axis == "package":
+            continue
+        parts = axis.split(".")
+        if len(parts) != 3 or parts[0] != "chiplets" or parts[2] not in CHIPLET_FIELDS:
+            raise ValueError("Unknown sweep axis '{}' (use package, {} or chiplets.<i>.<{}>).".format(
+                axis, ", ".join(CONTEXT_AXES), "|".join(CHIPLET_FIELDS)))
+        if not parts[1].isdigit() or int(parts[1]) >= num_chiplet_entries:
+            raise ValueError("Sweep axis '{}' refers to a chiplet entry that is not in the architecture.".format(axis))
+    return spec
+
+
+def get_num_points(spec):
+    num_points = 1
+    for values in spec["axes"].values():
+        num_points *= len(values)
+    return num_points
+
+
+def iter_points(spec):
+    return itertools.product(*spec["axes"].values())
+
+
+def get_output_columns(spec):
+    chiplet_types = []
+    for chiplet_info in spec["arch"]["chiplets"]:
+        if chiplet_info["type"] not in chiplet_types:
+            chiplet_types.append(chiplet_info["type"])
+    ecf_columns = ["ecf_" + c for c in chiplet_types + ["package"]]
+    return list(spec["axes"].keys()) + ["ecf"] + ecf_columns + ["ocf", "cf"]
+
+
+# ------------------------ Point evaluation ----------------------------
+
+def apply_point(base_arch, axis_names, point):
+    # returns (arch dict, context dict) for one point; base_arch is not modified
+    arch = dict(base_arch)
+    arch["chiplets"] = [dict(c) for c in base_arch["chiplets"]]
+    context = {}
+    for axis, value in zip(axis_names, point):
+        if axis in CONTEXT_AXES:
+            context[axis] = value
+        elif axis == "package":
+            arch["package"] = value
+        else:
+            _, index, field = axis.split(".")
+            arch["chiplets"][int(index)][field] = value
+    return arch, context
+
+
+def evaluate_point(arch, context, energy_per_inf):
+    chiplet_groups, packager, _ = parse_arch_groups(arch)
+    result = evaluate_embodied_groups(chiplet_groups, packager, context)
+    ocf = np.nan
+    if energy_per_inf is not None:
+        ocf = evaluate_operational(energy_per_inf, context)
+    return result.total, result.breakdown, ocf
+
+
+def evaluate_chunk(spec, points):
+    # evaluates a list of points and returns the results as columns
+    axis_names = list(spec["axes"].keys())
+    columns = {c: [] for c in get_output_columns(spec)}
+    ecf_columns = [c for c in columns if c.startswith("ecf_")]
+    for point in points:
+        arch, context = apply_point(spec["arch"], axis_names, point)
+        eval_context = EvalContext(ci_fab=context.get("ci_fab", spec["ci_fab"]), ci_op=context.get("ci_op", spec["ci_op"]),
+                                   defect_rate=context.get("defect_rate", spec["defect_rate"]), num_inf_per_day=spec["num_inf_per_day"], lifetime_days=spec["lifetime_days"])
+        ecf, ecf_breakdown, ocf = evaluate_point(arch, eval_context, context.get("energy_per_inf", spec["energy_per_inf"]))
+
+        for axis, value in zip(axis_names, point):
+            columns[axis].append(value)
+        columns["ecf"].append(ecf)
+        for column in ecf_columns:
+            # chiplet types with no chiplets at this point (e.g. num_chiplets 0) contribute 0
+            columns[column].append(ecf_breakdown.get(column[len("ecf_"):], 0.0))
+        columns["ocf"].append(ocf)
+        columns["cf"].append(ecf + ocf)
+    return columns
+
+
+# ------------------------ Output writers ----------------------------
+
+def check_chunk(chunk, columns):
+    # every column of a chunk must hold one value per point
+    lengths = {c: len(chunk[c]) for c in columns}
+    if len(set(lengths.values())) > 1:
+        raise ValueError("Sweep chunk has columns of different lengths: {}.".format(
+            ", ".join("{} {}".format(c, n) for c, n in lengths.items())))
+
+
+class CSVChunkWriter:
+    # appends each chunk to one CSV file
+    def __init__(self, out_path, columns):
+        self.f = open(out_path, 'w', newline='')
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(columns)
+        self.columns = columns
+
+    def write(self, chunk):
+        check_chunk(chunk, self.columns)
+        self.writer.writerows(zip(*[chunk[c] for c in self.columns]))
+
+    def close(self):
+        self.f.close()
+
+
+class NPZChunkWriter:
+    # writes each chunk as <out_dir>/chunk_<n>.npz with one array per column
+    def __init__(self, out_dir, columns):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.columns = columns
+        self.num_chunks = 0
+
+    def write(self, chunk):
+        check_chunk(chunk, self.columns)
+        path = os.path.join(self.out_dir, "chunk_{:06d}.npz".format(self.num_chunks))
+        np.savez(path, **{c: np.asarray(chunk[c]) for c in self.columns})
+        self.num_chunks += 1
+
+    def close(self):
+        pass
+
+
+def _make_writer(out_path, out_format, columns):
+    if out_format == "csv":
+        return CSVChunkWriter(out_path, columns)
+    elif out_format == "npz":
+        return NPZChunkWriter(out_path, columns)
+    raise ValueError("Unsupported sweep output format '{}' (use one of {}).".format(out_format, OUTPUT_FORMATS))
+
+
+# ------------------------ Sweep driver ----------------------------
+
+def run_sweep(spec, out_path, out_format="csv", jobs=None, chunk_size=1000, verbose=False):
+    """
+    Evaluate every point of a sweep spec and stream the results to disk.
+
+    Points are scheduled in chunks of chunk_size over a pool of jobs worker
+    processes (jobs=1 evaluates in-process). At most 2*jobs chunks are in
+    flight, and results are written in point order as chunks complete, so
+    memory stays bounded regardless of the sweep size.
+
+    Parameters:
+        spec (dict or str): Sweep spec, or path to a sweep spec JSON file.
+        out_path (str): CSV file, or output directory for npz chunks.
+        out_format (str): "csv" or "npz".
+        jobs (int): Number of worker processes (default: CPU count).
+        chunk_size (int): Points per scheduled chunk.
+        verbose (bool): Print progress.
+
+    Returns:
+        dict: Number of points and chunks, elapsed seconds and points per second.
+    """
+    log_key = "sweep"
+    spec = load_sweep_spec(spec) if isinstance(spec, str) else normalize_sweep_spec(spec)
+    jobs = jobs or os.cpu_count() or 1
+    num_points = get_num_points(spec)
+
+    if verbose:
+        print("INFO {} \t Sweeping {} points in chunks of {} on {} worker(s)...".format(log_key, num_points, chunk_size, jobs))
+
+    writer = _make_writer(out_path, out_format, get_output_columns(spec))
+    points = iter_points(spec)
+    chunks = iter(lambda: list(itertools.islice(points, chunk_size)), [])
+
+    start = time.perf_counter()
+    num_chunks = 0
+    try:
+        if jobs == 1:
+            for chunk in chunks:
+                writer.write(evaluate_chunk(spec, chunk))
+                num_chunks += 1
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(evaluate_chunk, spec, chunk))
+                    if len(pending) >= 2 * jobs:
+                        writer.write(pending.popleft().result())
+                        num_chunks += 1
+                while pending:
+                    writer.write(pending.popleft().result())
+                    num_chunks += 1
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+
+    stats = {"points": num_points, "chunks": num_chunks, "seconds": elapsed,
+             "points_per_sec": num_points / elapsed if elapsed > 0 else float("inf")}
+    if verbose:
+        print("INFO {} \t {} points in {:.2f} s ({:.0f} points/s)".format(log_key, num_points, elapsed, stats["points_per_sec"]))
+    return stats
@@ -0,0 +1,44 @@
+import time
+from contextlib import contextmanager, nullcontext
+
+
+# ------------------------ Stage timing ----------------------------
+# Wall-clock time per evaluation stage ("parse", "data", "chiplets",
+# "floorplan", "packaging"). Stage times are exclusive: time spent in a
+# nested stage (e.g. floorplan inside packaging) is only counted once.
+
+class StageTimer:
+    def __init__(self):
+        self.seconds = {}
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+            if self._stack:
+                parent = self._stack[-1]
+                self.seconds[parent] = self.seconds.get(parent, 0.0) - elapsed
+
+    def total(self):
+        return sum(self.seconds.values())
+
+
+class NullTimer:
+    # drop-in StageTimer that records nothing (default for bulk evaluation)
+    seconds = {}
+
+    def stage(self, name):
+        return nullcontext()
+
+    def total(self):
+        return 0.0
+
+
+NULL_TIMER = NullTimer()
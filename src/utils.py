@@ -1,8 +1,9 @@
 import json
-import pandas as pd
 import os
 import sys
 
+import numpy as np
+
 THIS_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(THIS_SCRIPT_DIR)
 
@@ -10,18 +11,18 @@ from packager import Packager
 from chiplet_models.cmos_logic_chiplet import CMOS_logic_chiplet
 from chiplet_models.pic_logic_chiplet import PIC_logic_chiplet
 from chiplet_models.dram_chiplet import DRAM_chiplet
+from data_store import load_tables, reload_tables, invalidate_tables
+from dnn import LAYER_TYPES, NONLINEAR, classify_layers, load_energy_table
+from yields import parse_yield_model
 
 
 
 # ------------------------ DNN utils ----------------------------
-def get_energy_per_inf (perf_file, dnn_name):
-    #perf_file = "src/data/accelerators/" + perf_file
-    print(perf_file, dnn_name)
-    with open(perf_file,'r') as json_file:
-        en_data = json.load(json_file)
-        
-    energy = en_data[dnn_name]
-    print(energy)
+def get_energy_per_inf (perf_file, dnn_name, verbose = False):
+    # energy per inference (J) of a model from an accelerator energy table (parsed once, see dnn.py)
+    energy = load_energy_table(perf_file)["models"][dnn_name]
+    if verbose:
+        print("INFO utils \t Energy per inference of {} ({}): {} J".format(dnn_name, perf_file, energy))
     return energy
     
 
@@ -32,32 +33,17 @@ def parse_dnn_model (dnn_file, verbose = False):
     if verbose:
         print("INFO {} \t Parsing dnn model file...".format(log_key))
     
+    import pandas as pd  # only needed for DNN model files; keeps pandas off the core import path
     # linear_layer_types = ['fc', 'conv', 'linear']
     model = pd.read_csv(dnn_file)
     
-    linear_index = []
-    nonlinear_index = []
-    layer_types = []
+    # check layer type (vectorized over all layers; dnn.evaluate_model_zoo streams large files)
+    codes = classify_layers(model['Layer name'].to_numpy())
+    layer_types = [LAYER_TYPES[code] for code in codes.tolist()]
     
-    # check layer type
     num_layers = len(model['Channels'])
-    for i in range(num_layers):    
-        if model['Layer name'][i].endswith("fc") or model['Layer name'][i].endswith("linear"):
-            layer_types.append("fc")
-            linear_index.append(i)
-        elif model['Layer name'][i].endswith("conv"): 
-            layer_types.append("conv")
-            linear_index.append(i)
-        else:
-            layer_types.append("nonlinear")
-            nonlinear_index.append(i)
-    
-    # create linear and nonlinear layer lists (dataframe) (can be used later)
-    linear_layers = model.loc[linear_index]
-    nonlinear_layers = model.loc[nonlinear_index]
-
-    num_linear_layers = len(linear_layers['Channels'])
-    num_nonlinear_layers = len(nonlinear_layers['Channels'])
+    num_nonlinear_layers = int(np.count_nonzero(codes == NONLINEAR))
+    num_linear_layers = num_layers - num_nonlinear_layers
     perc_nonlinear = num_nonlinear_layers/num_layers * 100
         
     if verbose:
@@ -98,12 +84,19 @@ def parse_arch_file (arch_file, verbose = False):
     
     if verbose:
         print("INFO {} \t Parsing arch file...".format(log_key))
-    
-    chiplets = []
-    packager = None
               
     with open(arch_file,'r') as json_file:
         arch_config_json = json.load(json_file)
+    
+    return parse_arch_config(arch_config_json, verbose=verbose)
+
+
+def parse_arch_config (arch_config_json, verbose = False):
+    # same as parse_arch_file, for an architecture already loaded as a dict
+    log_key = "utils"
+    
+    chiplets = []
+    packager = None
         
     chiplet_info_list = arch_config_json["chiplets"]
     for chiplet_info in chiplet_info_list:
@@ -116,7 +109,7 @@ def parse_arch_file (arch_file, verbose = False):
         for i in range (num_chiplets): chiplets.append(chiplet)    
     
     package_type = arch_config_json["package"]
-    packager = Packager (package_type=package_type, verbose=verbose)
+    packager = Packager (package_type=package_type, stack=arch_config_json.get("stack"), verbose=verbose)
     
     chip_type = arch_config_json["type"]
     if verbose:
@@ -128,6 +121,40 @@ def parse_arch_file (arch_file, verbose = False):
     return chiplets, packager, chip_type
 
 
+def get_chiplet_spec_key (chiplet_info):
+    # identifies chiplet entries that build identical chiplets
+    return (chiplet_info["type"], chiplet_info.get("tech"), chiplet_info.get("area"),
+            chiplet_info.get("actuation_type", "default"), chiplet_info.get("dram-type"), chiplet_info.get("size-gb"),
+            chiplet_info.get("tier", 0), parse_yield_model(chiplet_info.get("yield")))
+
+
+def parse_arch_groups (arch_config_json, verbose = False):
+    # like parse_arch_config, but returns [(chiplet, count)] with one chiplet per
+    # unique spec instead of one list entry per physical chiplet
+    log_key = "utils"
+    
+    groups = {}
+    for chiplet_info in arch_config_json["chiplets"]:
+        num_chiplets = chiplet_info.get("num_chiplets", 1)
+        key = get_chiplet_spec_key(chiplet_info)
+        if key in groups:
+            groups[key][1] += num_chiplets
+        else:
+            groups[key] = [build_chiplet(chiplet_info, verbose=verbose), num_chiplets]
+    chiplet_groups = [(chiplet, count) for chiplet, count in groups.values() if count > 0]
+    
+    packager = Packager (package_type=arch_config_json["package"], stack=arch_config_json.get("stack"), verbose=verbose)
+    
+    chip_type = arch_config_json["type"]
+    if verbose:
+        print ("INFO {} \t {}(type:{}) chip created.".format(log_key, arch_config_json["name"], chip_type))
+        print("---------------------------------------------")
+        print("List of chiplets:")
+        for c, count in chiplet_groups: print(c, "x", count)
+        print("---------------------------------------------")
+    return chiplet_groups, packager, chip_type
+
+
 def build_chiplet (chiplet_info, verbose = False):
     log_key = "utils"
     
@@ -146,5 +173,11 @@ def build_chiplet (chiplet_info, verbose = False):
     else:
         print("ERROR", log_key, "\t", "Chiplet type not supported.")
     
+    if chiplet is not None and "tier" in chiplet_info:
+        chiplet.set_tier(chiplet_info["tier"])
+    if chiplet is not None and "yield" in chiplet_info:
+        if chiplet_type == "dram":
+            raise ValueError("Yield models apply to logic chiplets (DRAM carbon is given per GB).")
+        chiplet.set_yield_model(parse_yield_model(chiplet_info["yield"]))
     return chiplet
 
@@ -0,0 +1,212 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from data_store import get_table, node_key
+
+
+# ------------------------ Yield models ----------------------------
+# Die yield as a function of the expected defects per die, lambda = area x
+# sensitive area share x defect density, for all rows of broadcast arrays:
+#   poisson             exp(-lambda)                    (default of the chiplet models)
+#   negative-binomial   (1 + lambda/alpha)^-alpha       (alpha: defect clustering)
+#   murphy              ((1 - exp(-lambda)) / lambda)^2
+#   seeds               1 / (1 + lambda)
+#
+# Defect densities are either a number (per cm2), the scenario's defect_rate
+# or "node": the per-node table src/data/cmos_logic/defect_density.json. That
+# table holds illustrative defaults, not published foundry data (0.05 per cm2
+# at 65 nm to 0.12 at 3 nm, around the default defect_rate of 0.1); replace it
+# with measured densities.
+#
+# By default the ECF of a die is carbon_per_area x area / yield, i.e. wafer
+# area is fully used. With a wafer diameter the carbon of the whole wafer is
+# shared by its good dies instead, which counts the partial dies lost at the
+# edge (and the edge exclusion ring):
+#   dies per wafer = pi (d/2)^2 / S - pi d / sqrt(2 S),  d = diameter - 2 x edge exclusion
+#   ECF            = carbon_per_area x wafer area / (dies per wafer x yield)
+#
+# A chiplet entry of an architecture file selects its model with "yield":
+#   "yield": "murphy"
+#   "yield": {"model": "negative-binomial", "defect_rate": "node", "clustering": 3, "wafer_diameter": 300}
+
+YIELD_MODELS = ["poisson", "negative-binomial", "murphy", "seeds"]
+POISSON, NEGATIVE_BINOMIAL, MURPHY, SEEDS = range(len(YIELD_MODELS))
+NB_CLUSTERING = 10          # alpha, as in the negative-binomial variant of CMOS_logic_chiplet
+WAFER_DIAMETER = 300        # mm
+EDGE_EXCLUSION = 3          # mm
+YIELD_FIELDS = ["model", "defect_rate", "clustering", "wafer_diameter", "edge_exclusion"]
+
+
+def _exp(x, exact):
+    # math.exp per element keeps the Poisson yield bit-identical to the scalar models
+    if exact:
+        return np.fromiter(map(math.exp, x.ravel().tolist()), dtype=np.float64, count=x.size).reshape(x.shape)
+    return np.exp(x)
+
+
+def get_model_codes(models):
+    # YIELD_MODELS index per row (array of int8) from names or codes
+    if isinstance(models, str) and models in YIELD_MODELS:
+        return np.int8(YIELD_MODELS.index(models))
+    models = np.asarray(models)
+    if models.dtype.kind in "iu":
+        if np.any((models < 0) | (models >= len(YIELD_MODELS))):
+            raise ValueError("Yield model codes must be in [0, {}).".format(len(YIELD_MODELS)))
+        return models.astype(np.int8)
+    uniq, inverse = np.unique(models.astype(str), return_inverse=True)
+    unknown = sorted(set(uniq.tolist()) - set(YIELD_MODELS))
+    if unknown:
+        raise ValueError("Unknown yield model(s) {} (use one of {}).".format(unknown, YIELD_MODELS))
+    codes = np.array([YIELD_MODELS.index(name) for name in uniq.tolist()], dtype=np.int8)
+    return codes[inverse.reshape(models.shape)]
+
+
+def get_yield(models, areas, defect_rates, sensitive_area=1.0, clustering=NB_CLUSTERING, exact=True):
+    """
+    Vectorized die yield.
+
+    All arguments broadcast against each other, e.g. areas[:, None] and
+    defect_rates[None, :] give a die size x defect density grid.
+
+    Parameters:
+        models (array of str or int): Yield model per row (name or YIELD_MODELS index).
+        areas (array of float): Die area in cm2.
+        defect_rates (array of float): Defect density per cm2.
+        sensitive_area (array of float): Share of the area sensitive to defects.
+        clustering (array of float): Clustering parameter alpha of the negative binomial model.
+        exact (bool): Bit-identical Poisson yield to the scalar models (slower exp).
+
+    Returns:
+        ndarray: Yield per row.
+    """
+    codes = get_model_codes(models)
+    faults = np.asarray(areas, dtype=np.float64) * np.asarray(sensitive_area, dtype=np.float64) \
+        * np.asarray(defect_rates, dtype=np.float64)
+    if np.any(faults < 0):
+        raise ValueError("Areas and defect densities must be non-negative.")
+    if codes.ndim == 0 and codes == POISSON:
+        return _exp(-faults, exact)
+    codes, faults, clustering = np.broadcast_arrays(codes, faults, np.asarray(clustering, dtype=np.float64))
+    fab_yield = np.empty(faults.shape)
+
+    rows = codes == POISSON
+    fab_yield[rows] = _exp(-faults[rows], exact)
+    rows = codes == NEGATIVE_BINOMIAL
+    if np.any(rows):
+        if np.any(clustering[rows] <= 0):
+            raise ValueError("The clustering parameter of the negative binomial yield must be positive.")
+        fab_yield[rows] = (1 + faults[rows] / clustering[rows]) ** -clustering[rows]
+    rows = codes == MURPHY
+    if np.any(rows):
+        x = faults[rows]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fab_yield[rows] = np.where(x > 0, ((1 - np.exp(-x)) / x) ** 2, 1.0)
+    rows = codes == SEEDS
+    fab_yield[rows] = 1 / (1 + faults[rows])
+    return fab_yield
+
+
+def get_dies_per_wafer(areas, wafer_diameter=WAFER_DIAMETER, edge_exclusion=EDGE_EXCLUSION):
+    """
+    Vectorized gross dies per wafer, with the partial dies at the edge removed.
+
+    Parameters:
+        areas (array of float): Die area in cm2.
+        wafer_diameter (array of float): Wafer diameter in mm.
+        edge_exclusion (array of float): Unusable ring at the wafer edge in mm.
+
+    Returns:
+        ndarray: Whole dies per wafer (float, 0 where a die does not fit).
+    """
+    areas_mm2 = np.asarray(areas, dtype=np.float64) * 100
+    if np.any(areas_mm2 <= 0):
+        raise ValueError("Die areas must be positive to count dies per wafer.")
+    diameter = np.asarray(wafer_diameter, dtype=np.float64) - 2 * np.asarray(edge_exclusion, dtype=np.float64)
+    dies = np.floor(np.pi * diameter**2 / (4 * areas_mm2) - np.pi * diameter / np.sqrt(2 * areas_mm2))
+    return np.maximum(dies, 0)
+
+
+def get_die_ecf(carbon_per_area, areas, fab_yield, wafer_diameter=np.nan, edge_exclusion=EDGE_EXCLUSION):
+    # ECF per good die (arrays broadcast); wafer_diameter NaN: per-area model without edge loss
+    if np.ndim(wafer_diameter) == 0 and np.isnan(wafer_diameter):
+        return np.asarray(carbon_per_area, dtype=np.float64) * np.asarray(areas, dtype=np.float64) / fab_yield
+    carbon_per_area, areas, fab_yield, wafer_diameter, edge_exclusion = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (carbon_per_area, areas, fab_yield, wafer_diameter, edge_exclusion)))
+    ecf = np.asarray(carbon_per_area * areas / fab_yield)
+    rows = ~np.isnan(wafer_diameter)
+    if np.any(rows):
+        dies = get_dies_per_wafer(areas[rows], wafer_diameter[rows], edge_exclusion[rows])
+        if np.any(dies < 1):
+            raise ValueError("Die of {:.2f} cm2 does not fit on the wafer.".format(areas[rows][dies < 1][0]))
+        wafer_area = np.pi * (wafer_diameter[rows] / 20) ** 2      # cm2
+        ecf[rows] = carbon_per_area[rows] * wafer_area / (dies * fab_yield[rows])
+    return ecf
+
+
+def get_node_defect_rates(tech_nodes):
+    # defect density per cm2 of each process node (array), from the defect_density table
+    table = get_table("defect_density")
+    tech_nodes = np.asarray(tech_nodes)
+    uniq, inverse = np.unique(tech_nodes, return_inverse=True)
+    values = np.empty(len(uniq))
+    for i, node in enumerate(uniq.tolist()):
+        key = node_key(int(node))
+        if key not in table:
+            raise ValueError("No defect density for process node '{}' in data table 'defect_density'.".format(key))
+        values[i] = table[key]
+    return values[inverse.reshape(tech_nodes.shape)]
+
+
+# ------------------------ Per-chiplet selection ----------------------------
+
+@dataclass(frozen=True)
+class YieldModel:
+    # yield model of a chiplet (the "yield" entry of an architecture file)
+    model: str = "poisson"
+    defect_rate: object = None          # per cm2; None: context.defect_rate; "node": per-node table
+    clustering: float = NB_CLUSTERING
+    wafer_diameter: float = None        # mm; None: no edge loss
+    edge_exclusion: float = EDGE_EXCLUSION
+
+    def get_defect_rate(self, tech_node, context):
+        if self.defect_rate is None:
+            return context.defect_rate
+        if self.defect_rate == "node":
+            return float(get_node_defect_rates(tech_node))
+        return self.defect_rate
+
+    def get_yield(self, area, defect_rate, sensitive_area=1.0):
+        return float(get_yield(self.model, area, defect_rate, sensitive_area, self.clustering))
+
+    def get_ecf(self, carbon_per_area, area, fab_yield):
+        wafer_diameter = np.nan if self.wafer_diameter is None else self.wafer_diameter
+        return float(get_die_ecf(carbon_per_area, area, fab_yield, wafer_diameter, self.edge_exclusion))
+
+
+def parse_yield_model(spec):
+    """
+    YieldModel of a "yield" entry: a model name or {"model", "defect_rate", "clustering",
+    "wafer_diameter", "edge_exclusion"}; None for no entry.
+    """
+    if spec is None or isinstance(spec, YieldModel):
+        return spec
+    if isinstance(spec, str):
+        spec = {"model": spec}
+    if not isinstance(spec, dict):
+        raise ValueError("Invalid yield entry {!r} (use a model name or an object).".format(spec))
+    unknown = set(spec) - set(YIELD_FIELDS)
+    if unknown:
+        raise ValueError("Unknown yield field(s) {} (use {}).".format(", ".join(sorted(unknown)), ", ".join(YIELD_FIELDS)))
+    model = YieldModel(**spec)
+    if model.model not in YIELD_MODELS:
+        raise ValueError("Unknown yield model '{}' (use one of {}).".format(model.model, YIELD_MODELS))
+    if model.defect_rate is not None and model.defect_rate != "node" and (
+            isinstance(model.defect_rate, bool) or not isinstance(model.defect_rate, (int, float)) or model.defect_rate < 0):
+        raise ValueError("Invalid defect_rate {!r} (use a density per cm2 or \"node\").".format(model.defect_rate))
+    if model.clustering <= 0:
+        raise ValueError("The clustering parameter of the negative binomial yield must be positive.")
+    if model.wafer_diameter is not None and model.wafer_diameter <= 2 * model.edge_exclusion:
+        raise ValueError("The wafer diameter must exceed twice the edge exclusion.")
+    return model
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the modules in src/ import each other by bare name, like epicarbon.py arranges
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "src"))
@@ -0,0 +1,72 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from batch import get_manufacturing_carbon_batch
+from chiplet_models.cmos_logic_chiplet import CMOS_logic_chiplet
+from chiplet_models.dram_chiplet import DRAM_chiplet
+from chiplet_models.pic_logic_chiplet import PIC_logic_chiplet
+from context import EvalContext
+from data_store import get_table
+
+NODES = [65, 28, 20, 14, 10, 8, 7, 5, 3]
+AREAS = [0.01, 0.56, 1.0, 6.51, 25.0]
+ABATEMENTS = [95, 99]
+CI_FAB = [41, 820]
+
+
+def scalar_ecf(chiplet_type, tech_node, area, actuation_type, context):
+    if chiplet_type == "cmos-logic":
+        chiplet = CMOS_logic_chiplet(chiplet_type, tech_node, area)
+    else:
+        chiplet = PIC_logic_chiplet(chiplet_type, tech_node, area, act_type=actuation_type)
+    result = chiplet.evaluate(context)
+    return result.ecf, result.fab_yield
+
+
+@pytest.mark.parametrize("ghg_abatement", ABATEMENTS)
+@pytest.mark.parametrize("ci_fab", CI_FAB)
+def test_cmos_logic_matches_scalar_model(ghg_abatement, ci_fab):
+    rows = list(itertools.product(NODES, AREAS))
+    nodes, areas = (np.array(column) for column in zip(*rows))
+    batch = get_manufacturing_carbon_batch("cmos-logic", nodes, areas, ci_fab=ci_fab, ghg_abatement=ghg_abatement,
+                                           exact=True)
+    context = EvalContext(ci_fab=ci_fab, ghg_abatement=ghg_abatement)
+    for i, (node, area) in enumerate(rows):
+        ecf, fab_yield = scalar_ecf("cmos-logic", node, area, None, context)
+        assert batch["ecf"][i] == ecf
+        assert batch["yield"][i] == fab_yield
+
+
+@pytest.mark.parametrize("ghg_abatement", ABATEMENTS)
+@pytest.mark.parametrize("ci_fab", CI_FAB)
+def test_pic_logic_matches_scalar_model(ghg_abatement, ci_fab):
+    rows = list(itertools.product(list(get_table("pic_epa")), AREAS))
+    actuation_types, areas = (np.array(column, dtype=dtype) for column, dtype in zip(zip(*rows), (object, np.float64)))
+    batch = get_manufacturing_carbon_batch("pic-logic", -1, areas, actuation_types, ci_fab=ci_fab,
+                                           ghg_abatement=ghg_abatement, exact=True)
+    context = EvalContext(ci_fab=ci_fab, ghg_abatement=ghg_abatement)
+    for i, (actuation_type, area) in enumerate(rows):
+        ecf, fab_yield = scalar_ecf("pic-logic", -1, area, actuation_type, context)
+        assert batch["ecf"][i] == ecf
+        assert batch["yield"][i] == fab_yield
+
+
+def test_mixed_rows_and_defect_rate_match_scalar_models():
+    context = EvalContext(ci_fab=380, ghg_abatement=99, defect_rate=0.05)
+    types = np.array(["cmos-logic", "pic-logic", "cmos-logic", "pic-logic"], dtype=object)
+    nodes = np.array([7, -1, 28, -1])
+    areas = np.array([1.5, 0.56, 4.0, 2.0])
+    actuation_types = np.array(["default", "mems", "default", "both"], dtype=object)
+    batch = get_manufacturing_carbon_batch(types, nodes, areas, actuation_types, ci_fab=context.ci_fab,
+                                           ghg_abatement=context.ghg_abatement, defect_rate=context.defect_rate)
+    for i in range(len(types)):
+        assert batch["ecf"][i] == scalar_ecf(types[i], nodes[i], areas[i], actuation_types[i], context)[0]
+
+
+def test_dram_is_rejected():
+    # DRAM carbon is per GB, not per area; batch mode covers logic chiplets only
+    assert DRAM_chiplet("dram", -1, "ddr4_10nm", 8).evaluate(EvalContext()).ecf > 0
+    with pytest.raises(ValueError, match="not supported in batch mode"):
+        get_manufacturing_carbon_batch(["dram"], [-1], [1.0])
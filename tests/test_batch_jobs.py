@@ -0,0 +1,38 @@
+import json
+import os
+
+import pytest
+
+from batch_jobs import load_jobs, run_batch
+
+ARCHS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "archs")
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    path = tmp_path / "jobs.jsonl"
+    rows = [{"id": "ok", "arch": os.path.join(ARCHS_DIR, "adept.json"), "energy_per_inf": 1e-3},
+            {"id": "bad-abatement", "arch": os.path.join(ARCHS_DIR, "adept.json"), "ghg_abatement": 97},
+            {"id": "bad-ci", "arch": os.path.join(ARCHS_DIR, "lt.json"), "ci_fab": "820"},
+            {"id": "after", "arch": os.path.join(ARCHS_DIR, "lt.json"), "ghg_abatement": 99}]
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(path)
+
+
+def test_load_jobs_flags_invalid_context(manifest):
+    errors = {job["id"]: job["error"] for job in load_jobs(manifest)}
+    assert errors["ok"] is None and errors["after"] is None
+    assert "GHG abatement" in errors["bad-abatement"]
+    assert "ci_fab" in errors["bad-ci"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_bad_job_is_an_error_record(manifest, tmp_path, workers):
+    out_path = str(tmp_path / "out.jsonl")
+    stats = run_batch(manifest, out_path=out_path, workers=workers)
+    with open(out_path) as f:
+        records = [json.loads(line) for line in f]
+    assert [r["id"] for r in records] == ["ok", "bad-abatement", "bad-ci", "after"]
+    assert stats["jobs"] == 4 and stats["errors"] == 2
+    assert records[0]["cf"] > 0 and records[3]["ecf"] > 0
+    assert records[1]["ecf"] is None and records[1]["error"].startswith("ValueError")
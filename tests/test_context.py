@@ -0,0 +1,17 @@
+import pytest
+
+from chiplet_models.cmos_logic_chiplet import CMOS_logic_chiplet
+from context import EvalContext
+
+
+@pytest.mark.parametrize("ghg_abatement", [95, 99])
+def test_supported_ghg_abatement(ghg_abatement):
+    context = EvalContext(ghg_abatement=ghg_abatement)
+    assert CMOS_logic_chiplet("cmos-logic", 7, 1.0).evaluate(context).ecf > 0
+
+
+def test_unsupported_ghg_abatement_is_rejected():
+    with pytest.raises(ValueError, match="GHG abatement"):
+        EvalContext(ghg_abatement=97)
+    with pytest.raises(ValueError, match="GHG abatement"):
+        EvalContext().replace(ghg_abatement=97)
@@ -0,0 +1,37 @@
+import glob
+import json
+import os
+
+import pytest
+
+from corpus import evaluate_corpus, open_corpus, write_corpus
+from evaluate import evaluate_arch
+
+ARCHS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "archs")
+PACKAGES = ["monolithic", "3D", "2.5D-passive", "2.5D-active", "RDL", "EMIB"]
+DRAM = {"type": "dram", "tech": -1, "dram-type": "hbm2", "size-gb": 16}
+
+
+def _archs():
+    archs = []
+    for path in sorted(glob.glob(os.path.join(ARCHS_DIR, "*.json"))):
+        with open(path) as f:
+            arch = json.load(f)
+        for package in PACKAGES:
+            archs.append(dict(arch, name="{}-{}".format(arch["name"], package), package=package))
+    # no logic chiplets, so no interposer
+    for package in PACKAGES[1:]:
+        archs.append({"name": "dram-" + package, "type": "electronic", "package": package, "chiplets": [DRAM]})
+    return archs
+
+
+@pytest.mark.parametrize("exact", [True, False])
+def test_corpus_matches_evaluate_arch(tmp_path, exact):
+    archs = _archs()
+    write_corpus(archs, str(tmp_path / "corpus"))
+    result = evaluate_corpus(open_corpus(str(tmp_path / "corpus")), exact=exact)
+    for i, arch in enumerate(archs):
+        expected = evaluate_arch(arch)
+        assert result.ecf[i] == pytest.approx(expected.total, rel=0 if exact else 1e-12), arch["name"]
+        assert result.breakdown["package"][i] == pytest.approx(expected.breakdown.get("package", 0.0),
+                                                                rel=0 if exact else 1e-12, abs=0), arch["name"]
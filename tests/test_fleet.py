@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from context import EvalContext
+from fleet import evaluate_fleet, get_region_ci
+
+ARCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "archs", "adept.json")
+
+
+def _row(region, count=1):
+    return {"component": {"type": "arch", "arch": ARCH, "power_w": 100}, "count": count, "region": region}
+
+
+def test_region_names_are_case_insensitive():
+    result = evaluate_fleet([_row("usa", 2), _row("USA", 3), _row("Usa")])
+    assert list(result.by_region) == ["usa"]
+    assert result.by_region["usa"]["devices"] == 6
+    expected = evaluate_fleet([_row("usa", 6)])
+    assert result.ocf == pytest.approx(expected.ocf) and result.ecf == pytest.approx(expected.ecf)
+
+
+def test_region_ci():
+    context = EvalContext()
+    assert get_region_ci("USA", context) == get_region_ci("usa", context)
+    assert get_region_ci("41", context) == get_region_ci(41, context) == 41.0
+    assert get_region_ci(None, context) == context.ci_op
+    with pytest.raises(ValueError, match="Unknown region"):
+        get_region_ci("atlantis", context)
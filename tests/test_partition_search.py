@@ -0,0 +1,36 @@
+import itertools
+
+import pytest
+
+from evaluate import evaluate_arch
+from partition_search import (ParetoFront, build_candidate_arch, get_search_context, iter_groups,
+                              normalize_search_spec, run_partition_search)
+
+SPEC = {"logic_area": 4.0, "tech": {"7": 1.0, "14": 1.9}, "area_step": 1.0, "max_chiplets": 4,
+        "photonic_area": 1.0, "pic_chiplets": [1], "energy_per_inf": 1e-3}
+
+
+def brute_force_front(spec):
+    # every candidate of the spec, evaluated with the object model
+    spec = normalize_search_spec(spec)
+    context = get_search_context(spec)
+    units = int(round(spec["logic_area"] / spec["area_step"]))
+    front = ParetoFront()
+    for package, k, num_pic in iter_groups(spec):
+        splits = {tuple(sorted(p, reverse=True)) for p in itertools.product(range(1, units + 1), repeat=k)
+                  if sum(p) == units}
+        for split in splits:
+            for techs in itertools.product(sorted(spec["tech"]), repeat=k):
+                parts = tuple((u * spec["area_step"] * spec["tech"][t], t) for u, t in zip(split, techs))
+                result = evaluate_arch(build_candidate_arch(spec, package, parts, num_pic), context)
+                front.add((result.total, result.total, k + num_pic), None)
+    return sorted(point[0] for point in front.points)
+
+
+@pytest.mark.parametrize("changes", [{}, {"interposer_defect_rate": 0, "packages": ["2.5D-active"]},
+                                     {"interposer_defect_rate": 0, "defect_rate": 0}])
+def test_search_matches_brute_force(changes):
+    spec = dict(SPEC, energy_per_inf=None, **changes)
+    result = run_partition_search(spec)
+    found = sorted((point["ecf"], point["cf"], point["num_chiplets"]) for point in result["front"])
+    assert found == brute_force_front(spec)
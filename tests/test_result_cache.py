@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+import result_cache
+from context import EvalContext
+from evaluate import evaluate_arch
+from result_cache import ResultCache, evaluate_arch_cached, evaluate_embodied_cached
+
+ARCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "archs", "adept.json")
+
+
+@pytest.fixture
+def arch():
+    with open(ARCH) as f:
+        return json.load(f)
+
+
+def test_hit_matches_evaluation(arch):
+    cache, context = ResultCache(), EvalContext()
+    first, hit = evaluate_embodied_cached(arch, context, cache)
+    assert not hit and not first.cached and first.groups
+    second, hit = evaluate_embodied_cached(arch, context, cache)
+    assert hit and second.cached
+    assert second.breakdown == first.breakdown == evaluate_arch(arch, context).breakdown
+    assert second.total == first.total
+    assert evaluate_arch_cached(arch, context, cache) == (first.breakdown, True)
+    assert cache.stats["hits"] == 2 and cache.stats["misses"] == 1
+
+
+@pytest.mark.parametrize("changes", [{"ci_fab": 41}, {"ghg_abatement": 99}, {"defect_rate": 0.2},
+                                     {"interposer_defect_rate": 0.1}, {"bonding_yield": 0.95}])
+def test_ecf_field_change_misses(arch, changes):
+    cache, context = ResultCache(), EvalContext()
+    evaluate_arch_cached(arch, context, cache)
+    breakdown, hit = evaluate_arch_cached(arch, context.replace(**changes), cache)
+    assert not hit
+    assert breakdown == evaluate_arch(arch, context.replace(**changes)).breakdown
+
+
+@pytest.mark.parametrize("changes", [{"ci_op": 41}, {"num_inf_per_day": 1e6}, {"lifetime_days": 365}])
+def test_ocf_field_change_hits(arch, changes):
+    cache, context = ResultCache(), EvalContext()
+    evaluate_arch_cached(arch, context, cache)
+    assert evaluate_arch_cached(arch, context.replace(**changes), cache)[1]
+
+
+def test_arch_comments_and_key_order_hit(arch):
+    cache, context = ResultCache(), EvalContext()
+    evaluate_arch_cached(arch, context, cache)
+    reordered = dict(reversed(list(arch.items())), _comment="edited")
+    assert evaluate_arch_cached(reordered, context, cache)[1]
+    assert not evaluate_arch_cached(dict(arch, package="RDL"), context, cache)[1]
+
+
+def test_data_change_misses(arch, monkeypatch):
+    cache, context = ResultCache(), EvalContext()
+    evaluate_arch_cached(arch, context, cache)
+    monkeypatch.setattr(result_cache, "data_tables_hash", lambda: "edited data")
+    assert not evaluate_arch_cached(arch, context, cache)[1]
+    assert evaluate_arch_cached(arch, context, cache)[1]
+
+
+def test_returned_breakdown_is_a_copy(arch):
+    cache, context = ResultCache(), EvalContext()
+    result, _ = evaluate_embodied_cached(arch, context, cache)
+    result.breakdown.clear()
+    breakdown, hit = evaluate_arch_cached(arch, context, cache)
+    assert hit and breakdown == evaluate_arch(arch, context).breakdown
+
+
+def test_version_change_misses(arch, monkeypatch):
+    cache, context = ResultCache(), EvalContext()
+    evaluate_arch_cached(arch, context, cache)
+    monkeypatch.setattr(result_cache, "CACHE_VERSION", result_cache.CACHE_VERSION + 1)
+    assert not evaluate_arch_cached(arch, context, cache)[1]
@@ -0,0 +1,43 @@
+import os
+import threading
+import time
+
+import pytest
+
+from client import EpicarbonClient, EstimationError
+from server import EstimationServer
+
+ARCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "archs", "adept.json")
+
+
+@pytest.fixture
+def client(tmp_path):
+    address = "unix:" + str(tmp_path / "epicarbon.sock")
+    server = EstimationServer(address, workers=0, batch_window=0)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(500):
+        try:
+            client = EpicarbonClient(address, timeout=30)
+            break
+        except OSError:
+            time.sleep(0.01)
+    else:
+        pytest.fail("Estimation server did not start.")
+    yield client
+    client.shutdown()
+    client.close()
+    thread.join(timeout=30)
+
+
+@pytest.mark.parametrize("context", [{"ghg_abatement": 97}, {"ci_fab": "820"}, {"defect_rate": -0.1},
+                                     {"lifetime": 10}])
+def test_bad_request_does_not_stop_server(client, context):
+    expected = client.embodied(ARCH)["ecf"]
+    with pytest.raises(EstimationError):
+        client.embodied(ARCH, **context)
+    with pytest.raises(EstimationError):
+        client.embodied(ARCH + ".missing")
+    assert client.embodied(ARCH)["ecf"] == expected
+    assert client.embodied(ARCH, ghg_abatement=99)["ecf"] != expected
+    assert client.metrics()["errors"] == 2
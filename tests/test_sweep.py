@@ -0,0 +1,42 @@
+import csv
+import json
+import os
+
+import numpy as np
+
+from sweep import run_sweep
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def make_spec():
+    with open(os.path.join(REPO_DIR, "archs", "adept.json")) as json_file:
+        arch = json.load(json_file)
+    arch["package"] = "2.5D-passive"
+    return {"arch": arch, "axes": {"chiplets.1.num_chiplets": [1, 0, 2], "chiplets.0.area": [2.0, 4.0]}}
+
+
+def test_sweep_csv_count_axis_with_zero(tmp_path):
+    out_path = str(tmp_path / "sweep.csv")
+    stats = run_sweep(make_spec(), out_path, jobs=1, chunk_size=4)
+    with open(out_path, newline='') as csv_file:
+        rows = list(csv.DictReader(csv_file))
+
+    assert stats["points"] == 6
+    assert len(rows) == 6
+    for row in rows:
+        count = int(row["chiplets.1.num_chiplets"])
+        pic = float(row["ecf_pic-logic"])
+        assert (pic == 0.0) == (count == 0)
+        parts = float(row["ecf_cmos-logic"]) + pic + float(row["ecf_package"])
+        assert np.isclose(parts, float(row["ecf"]), rtol=1e-12)
+
+
+def test_sweep_npz_count_axis_with_zero(tmp_path):
+    out_dir = str(tmp_path / "sweep")
+    run_sweep(make_spec(), out_dir, out_format="npz", jobs=1, chunk_size=4)
+    chunks = [np.load(os.path.join(out_dir, name)) for name in sorted(os.listdir(out_dir))]
+    counts = np.concatenate([chunk["chiplets.1.num_chiplets"] for chunk in chunks])
+    pic = np.concatenate([chunk["ecf_pic-logic"] for chunk in chunks])
+    assert len(counts) == len(pic) == 6
+    assert np.array_equal(pic == 0, counts == 0)